@@ -4,7 +4,7 @@ from sindit.api.api import app
 from typing import Annotated
 
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 
@@ -32,6 +32,26 @@ async def get_current_active_user(
     return current_user
 
 
+async def get_websocket_user(websocket: WebSocket, token: str = None) -> User:
+    """Authenticate a WebSocket with the bearer token of the Authorization
+    header, or with the ``token`` query parameter as browsers cannot set
+    headers on WebSockets."""
+    if token is None:
+        authorization = websocket.headers.get("Authorization", "")
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials
+    if not token:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated"
+        )
+
+    try:
+        return await get_current_active_user(authService.verify_token(token))
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+
+
 @app.post("/token", tags=["Vault"])
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
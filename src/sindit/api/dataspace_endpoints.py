@@ -1,10 +1,11 @@
 from typing import Any, List
 
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Response
 from pydantic import BaseModel
 
 from sindit.api.api import app
 from sindit.api.authentication_endpoints import User, get_current_active_user
+from sindit.api.kg_endpoints import _set_next_cursor
 from sindit.common.semantic_knowledge_graph.rdf_model import URIRefNode
 from sindit.dataspace.setup_dataspace import (
     _connector_key,
@@ -63,15 +64,26 @@ async def get_all_dataspace_node_types(
 
 @app.get("/dataspace", tags=["Dataspace"])
 async def get_all_dataspace_nodes(
+    response: Response,
     current_user: User = Depends(_load_dataspaces),
     skip: int = 0,
     limit: int = 10,
+    cursor: str = None,
 ) -> List[DataspaceManagement]:
     """
     Get all dataspace nodes.
+
+    When there are more nodes, the `X-Next-Cursor` response header holds the
+    `cursor` of the next page.
     """
     try:
-        return sindit_kg_connector.get_all_dataspace_nodes(skip=skip, limit=limit)
+        nodes = sindit_kg_connector.get_all_dataspace_nodes(
+            skip=skip, limit=limit, cursor=cursor
+        )
+        _set_next_cursor(response, nodes)
+        return nodes
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting dataspace nodes: {e}")
         raise HTTPException(status_code=404, detail=str(e))
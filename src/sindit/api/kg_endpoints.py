@@ -1,10 +1,42 @@
 import asyncio
+import json
+import tempfile
 from typing import Union, List
-from fastapi import HTTPException, Depends
+from fastapi import (
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    WebSocketException,
+    status,
+)
 from fastapi.responses import StreamingResponse
-from sindit.api.authentication_endpoints import User, get_current_active_user
-from sindit.initialize_kg_connectors import sindit_kg_connector
+from rdflib import Graph
+from sindit.common.semantic_knowledge_graph.rdf_model import RDFModel, URIRefNode
+from sindit.api.authentication_endpoints import (
+    User,
+    get_current_active_user,
+    get_websocket_user,
+)
+from sindit.initialize_kg_connectors import (
+    kg_service,
+    node_cache,
+    property_value_writer,
+    sindit_kg_connector,
+)
+from sindit.connectors.connector_influxdb import (
+    InfluxDBConnector,
+    csv_chunks,
+    flux_time,
+    history_window,
+    iterate_in_thread,
+    record_batches,
+)
 from sindit.connectors.setup_connectors import (
+    connections,
     remove_connection_node,
     remove_property_node,
     update_connection_node,
@@ -25,11 +57,37 @@ from sindit.knowledge_graph.graph_model import (
     StreamingProperty,
     TimeseriesProperty,
     PropertyCollection,
+    NodeURIClassMapping,
 )
+from sindit.knowledge_graph.kg_connector import stored_property_value
+from sindit.knowledge_graph.property_value_hub import property_value_hub
+from sindit.knowledge_graph.query_registry import query_registry
+from sindit.util.environment_and_configuration import get_environment_variable_int
 from sindit.util.log import logger
 
 from sindit.api.api import app
 
+# Largest Turtle/TriG body accepted by the bulk import, which parses the
+# whole graph in memory (NDJSON bodies are not limited)
+BULK_RDF_MAX_SIZE = (
+    get_environment_variable_int("KG_BULK_RDF_MAX_SIZE_MB", optional=True, default=100)
+    * 1024
+    * 1024
+)
+
+
+@app.on_event("shutdown")
+async def close_kg_service():
+    # Close the connections of the asynchronous knowledge graph client
+    await kg_service.aclose()
+
+
+def _set_next_cursor(response: Response, nodes) -> None:
+    # Pages returned by the connector carry the cursor of the next page
+    next_cursor = getattr(nodes, "next_cursor", None)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+
 
 @app.get("/kg/node_types", tags=["Knowledge Graph"])
 async def get_all_node_types(
@@ -39,12 +97,49 @@ async def get_all_node_types(
     Get all node types.
     """
     try:
-        return sindit_kg_connector.get_node_types()
+        return await sindit_kg_connector.get_node_types_async()
     except Exception as e:
         logger.error(f"Error getting node types: {e}")
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@app.get("/kg/metrics", tags=["Knowledge Graph"])
+async def get_kg_metrics(
+    current_user: User = Depends(get_current_active_user),
+) -> dict:
+    """
+    Get the runtime metrics of the knowledge graph access layer.
+
+    - `write_behind`: counters of the property value write-behind queue
+      (pending properties, lag of the oldest pending value in seconds,
+      coalesced samples, flushes, ...). `null` if write-behind is disabled.
+    - `node_cache`: hit/miss counters and size of the node cache used by
+      `/kg/node`, `/kg/stream`, ... `null` if the cache is disabled.
+    - `queries`: number of renders and executions, and execution times in
+      seconds, of each SPARQL query template.
+    - `streams`: subscriptions of the streaming endpoints (`/kg/stream`, ...)
+      and number of values published by the connectors, delivered to the
+      subscriptions, and coalesced for slow clients.
+    - `connectors`: metrics of each connection, by uri, such as the depth
+      and lag of the queue of the MQTT messages waiting for the workers.
+    """
+    return {
+        "write_behind": (
+            property_value_writer.get_metrics()
+            if property_value_writer is not None
+            else None
+        ),
+        "node_cache": node_cache.get_metrics() if node_cache is not None else None,
+        "queries": query_registry.get_metrics(),
+        "streams": property_value_hub.get_metrics(),
+        "connectors": {
+            uri: connector.get_metrics()
+            for uri, connector in list(connections.items())
+            if connector is not None
+        },
+    }
+
+
 @app.get(
     "/kg/node",
     tags=["Knowledge Graph"],
@@ -69,7 +164,7 @@ async def get_node_by_uri(
     Get a node from the knowledge graph by its URI.
     """
     try:
-        return sindit_kg_connector.load_node_by_uri(node_uri, depth=depth)
+        return await sindit_kg_connector.load_node_by_uri_async(node_uri, depth=depth)
     except Exception as e:
         logger.error(f"Error getting node by URI {node_uri}: {e}")
         raise HTTPException(status_code=404, detail=str(e))
@@ -96,19 +191,29 @@ async def get_node_by_uri(
 )
 async def get_nodes_by_type(
     type_uri: str,
+    response: Response,
     depth: int = 1,
     current_user: User = Depends(get_current_active_user),
     skip: int = 0,
     limit: int = 10,
+    cursor: str = None,
 ):
     """
     Get a node from the knowledge graph by its type.
     To get type uri, use the `/kg/node_types` endpoint.
+
+    Pages are ordered by node uri. When there are more nodes, the
+    `X-Next-Cursor` response header holds the `cursor` of the next page, which
+    is faster than `skip` on deep pages.
     """
     try:
-        return sindit_kg_connector.load_nodes_by_class(
-            type_uri, depth=depth, skip=skip, limit=limit
+        nodes = await sindit_kg_connector.load_nodes_by_class_async(
+            type_uri, depth=depth, skip=skip, limit=limit, cursor=cursor
         )
+        _set_next_cursor(response, nodes)
+        return nodes
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting node by type {type_uri}: {e}")
         raise HTTPException(status_code=404, detail=str(e))
@@ -135,21 +240,106 @@ async def get_nodes_by_type(
     ],
 )
 async def get_all_nodes(
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     depth: int = 1,
     skip: int = 0,
     limit: int = 10,
+    cursor: str = None,
 ) -> list:
     """
     Get all nodes from the knowledge graph.
+
+    Pages are ordered by node uri. When there are more nodes, the
+    `X-Next-Cursor` response header holds the `cursor` of the next page, which
+    is faster than `skip` on deep pages.
     """
     try:
-        return sindit_kg_connector.load_all_nodes(depth=depth, skip=skip, limit=limit)
+        nodes = await sindit_kg_connector.load_all_nodes_async(
+            depth=depth, skip=skip, limit=limit, cursor=cursor
+        )
+        _set_next_cursor(response, nodes)
+        return nodes
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting all nodes: {e}")
         raise HTTPException(status_code=404, detail=str(e))
 
 
+# format -> (content type of the knowledge graph, media type of the response)
+EXPORT_FORMATS = {
+    "ntriples": ("application/n-triples", "application/n-triples"),
+    "trig": ("application/x-trig", "application/trig"),
+    "ndjson": (None, "application/x-ndjson"),
+}
+
+
+async def _export_nodes(depth: int, page_size: int, graph_uri: str):
+    async for node in sindit_kg_connector.iter_all_nodes_async(
+        depth=depth, page_size=page_size, graph_uri=graph_uri
+    ):
+        yield node.model_dump_json(exclude_none=True) + "\n"
+
+
+async def _prepend(first_chunk, chunks):
+    yield first_chunk
+    async for chunk in chunks:
+        yield chunk
+
+
+@app.get("/kg/export", tags=["Knowledge Graph"])
+async def export_graph(
+    format: str = "ndjson",
+    depth: int = 1,
+    page_size: int = 500,
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Export the whole current graph as a stream, e.g. to back up or diff a
+    workspace. The memory used does not depend on the size of the graph.
+
+    Parameters:
+    - format (str):
+      - `ndjson` (default): one node per line, as returned by `/kg/nodes`.
+        The nodes are loaded `page_size` at a time, with the given `depth`.
+      - `ntriples` or `trig`: the raw statements of the graph, streamed
+        straight from the knowledge graph.
+
+    Example:
+      ```
+      curl -X 'GET' 'http://localhost:9017/kg/export?format=ntriples' \\
+      -H 'Authorization: Bearer <token>' -o backup.nt
+      ```
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format {format}, use one of "
+            f"{', '.join(EXPORT_FORMATS.keys())}",
+        )
+    accept_content, media_type = EXPORT_FORMATS[format]
+
+    # The whole stream is read from the graph of this request
+    graph_uri = sindit_kg_connector.get_graph_uri()
+    if accept_content is None:
+        chunks = _export_nodes(depth, max(1, page_size), graph_uri)
+    else:
+        chunks = sindit_kg_connector.export_graph_async(accept_content, graph_uri)
+
+    # Get the first chunk before starting the response, so that errors are
+    # reported with a proper status code
+    try:
+        first_chunk = await anext(chunks, None)
+    except Exception as e:
+        logger.error(f"Error exporting the graph: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if first_chunk is None:
+        return StreamingResponse(iter(()), media_type=media_type)
+
+    return StreamingResponse(_prepend(first_chunk, chunks), media_type=media_type)
+
+
 @app.delete("/kg/node", tags=["Knowledge Graph"])
 async def delete_node(
     node_uri: str, current_user: User = Depends(get_current_active_user)
@@ -158,9 +348,9 @@ async def delete_node(
     Delete a node from the knowledge graph by its URI.
     """
     try:
-        node = sindit_kg_connector.load_node_by_uri(node_uri)
+        node = await sindit_kg_connector.load_node_by_uri_async(node_uri)
 
-        result = sindit_kg_connector.delete_node(node_uri)
+        result = await sindit_kg_connector.delete_node_async(node_uri)
 
         if result and node is not None:
             if isinstance(node, Connection):
@@ -193,7 +383,7 @@ async def create_sindit_kg(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         return {"result": result}
 
     except Exception as e:
@@ -215,7 +405,7 @@ async def create_asset(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         return {"result": result}
     except Exception as e:
         logger.error(f"Error saving node {node}: {e}")
@@ -241,7 +431,7 @@ async def create_connection(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Start connection asynchronously
             # (task tracking handled in setup_connectors)
@@ -271,7 +461,7 @@ async def create_asset_property(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Update property asynchronously (task tracking handled in setup_connectors)
             update_property_node(
@@ -299,7 +489,7 @@ async def create_database_property(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Update property asynchronously (task tracking handled in setup_connectors)
             update_property_node(
@@ -327,7 +517,7 @@ async def create_streaming_property(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Update property asynchronously (task tracking handled in setup_connectors)
             update_property_node(
@@ -355,7 +545,7 @@ async def create_timeseries_property(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Update property asynchronously (task tracking handled in setup_connectors)
             update_property_node(
@@ -386,7 +576,7 @@ async def create_file(
     Use S3ObjectProperty instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Update property asynchronously (task tracking handled in setup_connectors)
             update_property_node(
@@ -415,7 +605,7 @@ async def create_s3_object(
     Query the node to get the json-object with the upload url.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Update property asynchronously (task tracking handled in setup_connectors)
             update_property_node(
@@ -442,7 +632,7 @@ async def create_property_collection(
     use the update node endpoint instead.
     """
     try:
-        result = sindit_kg_connector.save_node(node)
+        result = await sindit_kg_connector.save_node_async(node)
         if result:
             # Update all collection properties asynchronously
             # (task tracking handled in setup_connectors)
@@ -460,6 +650,179 @@ async def create_property_collection(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _get_node_class(class_uri: str):
+    """Get the node model from its class uri or its class name."""
+    for uri, node_class in NodeURIClassMapping.items():
+        if class_uri == str(uri) or class_uri == node_class.__name__:
+            return node_class
+    raise ValueError(f"Unknown node class {class_uri}")
+
+
+def _start_bulk_nodes(nodes: list, username: str):
+    """Start the connections and properties of the imported nodes, like the
+    create node endpoints do."""
+    for node in nodes:
+        if isinstance(node, Connection):
+            update_connection_node(
+                node, replace=True, async_start=True, username=username
+            )
+    for node in nodes:
+        properties = []
+        if isinstance(node, AbstractAssetProperty):
+            properties = [node]
+        elif isinstance(node, PropertyCollection) and node.collectionProperties:
+            properties = node.collectionProperties
+        for prop in properties:
+            if isinstance(prop, AbstractAssetProperty):
+                update_property_node(
+                    prop, replace=True, async_start=True, username=username
+                )
+
+
+async def _save_bulk_chunk(chunk: list, chunk_size: int, result: dict):
+    """Save a chunk of (line, node) and record the saved nodes and errors."""
+    nodes = [node for _, node in chunk]
+    errors = await sindit_kg_connector.save_nodes_async(nodes, chunk_size=chunk_size)
+    failed = set()
+    for error in errors:
+        line = chunk[error["index"]][0]
+        failed.add(error["index"])
+        result["errors"].append(
+            {"line": line, "uri": error["uri"], "error": error["error"]}
+        )
+    saved = [node for index, node in enumerate(nodes) if index not in failed]
+    result["saved"] += len(saved)
+    return saved
+
+
+def _parse_bulk_line(line: bytes, line_number: int, result: dict):
+    """Validate a NDJSON line. Returns the node, or None if the line is empty
+    or invalid (the error is then recorded in the result)."""
+    line = line.strip()
+    if not line:
+        return None
+    uri = None
+    try:
+        payload = json.loads(line)
+        uri = payload.get("uri")
+        node_class = _get_node_class(payload.pop("class_uri", None))
+        return node_class(**payload)
+    except Exception as e:
+        result["errors"].append({"line": line_number, "uri": uri, "error": str(e)})
+        return None
+
+
+async def _parse_bulk_graph(request: Request, format: str) -> Graph:
+    """Parse a Turtle/TriG body. The body is spooled to a temporary file
+    rather than held in memory, and rejected if larger than
+    BULK_RDF_MAX_SIZE."""
+    with tempfile.NamedTemporaryFile(suffix=f".{format}") as file:
+        size = 0
+        async for data in request.stream():
+            size += len(data)
+            if size > BULK_RDF_MAX_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=(
+                        f"Turtle/TriG body larger than {BULK_RDF_MAX_SIZE} bytes,"
+                        " use NDJSON to import more nodes"
+                    ),
+                )
+            file.write(data)
+        file.flush()
+        g = Graph()
+        await asyncio.to_thread(g.parse, source=file.name, format=format)
+        return g
+
+
+@app.post("/kg/bulk", tags=["Knowledge Graph"])
+async def bulk_import(
+    request: Request,
+    chunk_size: int = 500,
+    current_user: User = Depends(get_current_active_user),
+) -> dict:
+    """
+    Create or save many nodes at once.
+
+    The body is either:
+
+    - **NDJSON** (default): one node per line, as for the create node
+      endpoints, with a `class_uri` field giving the type of the node (class
+      uri, or class name such as `StreamingProperty`). The body is read and
+      saved progressively, by chunks of `chunk_size` nodes.
+    - **Turtle** or **TriG** (`Content-Type: text/turtle` or
+      `application/trig`): every typed node of the uploaded graph is saved.
+      The whole graph is parsed before the nodes are saved, so the body is
+      limited to `KG_BULK_RDF_MAX_SIZE_MB` (100 MB by default). Only NDJSON
+      bodies are streamed.
+
+    The nodes are validated with the same models as the create node endpoints
+    and saved with one update per chunk. As for these endpoints, **all
+    existing information related to the nodes is replaced**, and the imported
+    connections and properties are started.
+
+    Response:
+    - `saved`: number of saved nodes.
+    - `errors`: the nodes that could not be saved, with the line of the node
+      (NDJSON only), its uri and the reason.
+    """
+    if chunk_size < 1:
+        chunk_size = 1
+    result = {"result": True, "saved": 0, "errors": []}
+    saved_nodes = []
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    try:
+        if content_type in ["text/turtle", "application/trig"]:
+            g = await _parse_bulk_graph(
+                request, "turtle" if content_type == "text/turtle" else "trig"
+            )
+            individuals = RDFModel.deserialize_graph(
+                g, uri_class_mapping=NodeURIClassMapping
+            )
+            nodes = [(None, node) for node in individuals.values()]
+            for start in range(0, len(nodes), chunk_size):
+                saved_nodes.extend(
+                    await _save_bulk_chunk(
+                        nodes[start : start + chunk_size], chunk_size, result
+                    )
+                )
+        else:
+            chunk = []
+            line_number = 0
+            buffer = b""
+            async for data in request.stream():
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    line_number += 1
+                    node = _parse_bulk_line(line, line_number, result)
+                    if node is not None:
+                        chunk.append((line_number, node))
+                    if len(chunk) >= chunk_size:
+                        saved_nodes.extend(
+                            await _save_bulk_chunk(chunk, chunk_size, result)
+                        )
+                        chunk = []
+            line_number += 1
+            node = _parse_bulk_line(buffer, line_number, result)
+            if node is not None:
+                chunk.append((line_number, node))
+            if chunk:
+                saved_nodes.extend(await _save_bulk_chunk(chunk, chunk_size, result))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error importing nodes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    _start_bulk_nodes(saved_nodes, current_user.username)
+
+    result["result"] = len(result["errors"]) == 0
+    return result
+
+
 @app.post("/kg/node", tags=["Knowledge Graph"])
 async def update_node(
     node: dict,
@@ -501,7 +864,7 @@ async def update_node(
     ```
     """
     try:
-        result = sindit_kg_connector.update_node(node, overwrite=overwrite)
+        result = await sindit_kg_connector.update_node_async(node, overwrite=overwrite)
         if result:
             return {"result": result}
     except Exception as e:
@@ -509,26 +872,93 @@ async def update_node(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def get_streaming_property(
-    node_uri: str,
-    refresh_rate: int = 5,
-    current_user: User = Depends(get_current_active_user),
-):
-    if refresh_rate < 1:
-        refresh_rate = 1
-
-    pre_timestamp = None
-
-    while True:
-        node = sindit_kg_connector.load_node_by_uri(node_uri)
-
-        cur_timestamp = node.propertyValueTimestamp
-
-        if cur_timestamp != pre_timestamp:
-            yield node.model_dump_json(indent=4) + "\n"
-            pre_timestamp = cur_timestamp
-
-        await asyncio.sleep(refresh_rate)
+async def _load_streaming_property(node_uri: str):
+    node = await sindit_kg_connector.load_node_by_uri_async(node_uri)
+    if not isinstance(node, StreamingProperty) and not isinstance(
+        node, TimeseriesProperty
+    ):
+        raise ValueError(f"Node {node_uri} is not a streaming or timeseries property")
+    return node
+
+
+def _apply_property_value(node, value, timestamp) -> None:
+    # Convert the value as it would be read back from the knowledge graph
+    data_type = node.propertyDataType
+    if isinstance(data_type, URIRefNode):
+        data_type = data_type.uri
+    node.propertyValue = stored_property_value(value, data_type)
+    node.propertyValueTimestamp = timestamp
+
+
+def _apply_property_values(nodes: dict, values: dict) -> list:
+    """Apply the values received from the property value hub to the nodes
+    (by uri), returns the updated nodes."""
+    updated = []
+    for uri, (value, timestamp) in values.items():
+        node = nodes[uri]
+        _apply_property_value(node, value, timestamp)
+        updated.append(node)
+    return updated
+
+
+async def _property_updates(nodes: dict, timeout: float = None):
+    """Yield the list of the nodes (by uri) first, then the nodes updated by
+    each batch of values published to the property value hub. An empty list
+    is yielded when no value was published for ``timeout`` seconds."""
+    with property_value_hub.subscribe(nodes.keys()) as subscription:
+        yield list(nodes.values())
+        while True:
+            values = await subscription.get(timeout)
+            yield _apply_property_values(nodes, values)
+
+
+async def get_streaming_property(node):
+    async for nodes in _property_updates({str(node.uri): node}):
+        for updated_node in nodes:
+            yield updated_node.model_dump_json(indent=4) + "\n"
+
+
+async def _sse_property_events(nodes: dict, heartbeat: float):
+    async for updated_nodes in _property_updates(nodes, heartbeat):
+        if not updated_nodes:
+            # Comment line, keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+        for node in updated_nodes:
+            yield f"event: value\ndata: {node.model_dump_json()}\n\n"
+
+
+async def _websocket_property_events(websocket: WebSocket, nodes: dict):
+    """Send the nodes and their updates over the WebSocket until the client
+    disconnects."""
+    with property_value_hub.subscribe(nodes.keys()) as subscription:
+        for node in nodes.values():
+            await websocket.send_text(node.model_dump_json())
+
+        # Messages from the client are ignored, but receiving them is the only
+        # way to notice a disconnection while no value is published
+        receive = asyncio.ensure_future(websocket.receive())
+        get = None
+        try:
+            while True:
+                get = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {get, receive}, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if get in done:
+                    for node in _apply_property_values(nodes, get.result()):
+                        await websocket.send_text(node.model_dump_json())
+                else:
+                    get.cancel()
+
+                if receive in done:
+                    if receive.result()["type"] == "websocket.disconnect":
+                        return
+                    receive = asyncio.ensure_future(websocket.receive())
+        finally:
+            receive.cancel()
+            if get is not None:
+                get.cancel()
 
 
 @app.get("/kg/stream", tags=["Knowledge Graph"])
@@ -541,30 +971,33 @@ async def stream_property(
     Streams updates from a streaming or timeseries property node in the knowledge
     graph.
 
-    This endpoint enters an **infinite loop**, continuously checking for updates
-    from a specified node (either a StreamingProperty or TimeseriesProperty) and
-    streaming new data to the client in real time.
+    The current state of the node is sent first, then the node is sent again
+    every time the connector of the property receives a new value. The values
+    are pushed by the connectors running in this server, the knowledge graph
+    is not polled.
 
     **Important**: The client must handle this continuous stream of data, as the
-    loop will not terminate unless the connection is closed by the client or a
-    server error occurs. Each new chunk of data is sent whenever the node's
-    `propertyValueTimestamp` is updated.
+    stream will not terminate unless the connection is closed by the client or a
+    server error occurs. If the client reads slower than the values arrive, it
+    gets the latest value.
+
+    See also `/kg/stream/sse` (Server-Sent Events) and `/kg/stream/ws`
+    (WebSocket).
 
     Parameters:
     - node_uri (str): The URI of the node to stream. Must refer to a
       StreamingProperty or TimeseriesProperty.
-    - refresh_rate (int): The interval in seconds at which the node's state is
-      checked for updates. Defaults to 5 seconds, with a minimum refresh rate of
-      1 second.
+    - refresh_rate (int): Deprecated and ignored, the updates are pushed as soon
+      as they are received.
 
     Response:
     - A JSON stream of updates from the node. Each update is sent as a new chunk
-      of JSON data whenever the node's `propertyValueTimestamp` changes.
+      of JSON data.
 
     Example:
     - To stream updates from a node with a URI of "http://example.org/node", send
       a GET request to:
-      `/kg/stream?node_uri=http://example.org/node&refresh_rate=5`
+      `/kg/stream?node_uri=http://example.org/node`
     - Curl example:
        ```
       curl -X 'GET' \
@@ -575,17 +1008,11 @@ async def stream_property(
     try:
         # Perform a pre-check to verify if the node exists
         # and is valid before starting the streaming response.
-        node = sindit_kg_connector.load_node_by_uri(node_uri)
-        if not isinstance(node, StreamingProperty) and not isinstance(
-            node, TimeseriesProperty
-        ):
-            raise ValueError(
-                f"Node {node_uri} is not a streaming or timeseries property"
-            )
+        node = await _load_streaming_property(node_uri)
 
         # If the pre-check passes, then start the streaming response
         return StreamingResponse(
-            get_streaming_property(node_uri=node_uri, refresh_rate=refresh_rate),
+            get_streaming_property(node),
             media_type="application/json",
         )
 
@@ -596,6 +1023,290 @@ async def stream_property(
         )
 
 
+@app.get("/kg/stream/sse", tags=["Knowledge Graph"])
+async def stream_property_sse(
+    node_uri: str,
+    heartbeat: float = 15,
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Streams updates from a streaming or timeseries property node as
+    Server-Sent Events (`text/event-stream`), e.g. for a browser `EventSource`.
+
+    Each `value` event holds the node as JSON: its current state first, then
+    the node every time a new value is received. A comment line is sent after
+    `heartbeat` seconds without values to keep the connection open.
+    """
+    try:
+        node = await _load_streaming_property(node_uri)
+        return StreamingResponse(
+            _sse_property_events({str(node.uri): node}, heartbeat),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    except Exception as e:
+        logger.error(f"Error streaming node {node_uri}: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Error streaming node {node_uri}: {e}"
+        )
+
+
+@app.websocket("/kg/stream/ws")
+async def stream_property_websocket(
+    websocket: WebSocket,
+    node_uri: str,
+    current_user: User = Depends(get_websocket_user),
+):
+    """
+    Streams updates from a streaming or timeseries property node over a
+    WebSocket: one JSON text message with the current state of the node, then
+    one per new value. Authenticate with the `token` query parameter or the
+    Authorization header.
+    """
+    try:
+        node = await _load_streaming_property(node_uri)
+    except Exception as e:
+        logger.error(f"Error streaming node {node_uri}: {e}")
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+
+    await websocket.accept()
+    try:
+        await _websocket_property_events(websocket, {str(node.uri): node})
+    except WebSocketDisconnect:
+        pass
+
+
+async def _load_streamed_properties(node_uris: list, asset_uri: str) -> dict:
+    """Load the properties to stream, by uri: the given ones and all the
+    properties of the asset."""
+    uris = list(node_uris or [])
+    if asset_uri is not None:
+        asset = await sindit_kg_connector.load_node_by_uri_async(asset_uri)
+        if not isinstance(asset, AbstractAsset):
+            raise ValueError(f"Node {asset_uri} is not an asset")
+        uris += [str(prop.uri) for prop in asset.assetProperties or []]
+
+    uris = list(dict.fromkeys(uris))
+    if not uris:
+        raise ValueError("No property to stream, set node_uri or asset_uri")
+
+    nodes = await sindit_kg_connector.load_nodes_by_uris_async(uris)
+    properties = {
+        str(node.uri): node for node in nodes if isinstance(node, AbstractAssetProperty)
+    }
+    missing = [uri for uri in uris if uri not in properties]
+    if missing:
+        raise ValueError(f"Nodes {', '.join(missing)} are not properties")
+    return properties
+
+
+@app.get("/kg/stream/multi", tags=["Knowledge Graph"])
+async def stream_properties(
+    node_uri: List[str] = Query(None),
+    asset_uri: str = None,
+    heartbeat: float = 15,
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Streams updates from many properties over one Server-Sent Events
+    connection (`text/event-stream`).
+
+    The properties are given with one or more `node_uri` parameters, and/or
+    with `asset_uri` to stream all the properties of an asset.
+
+    Each `value` event holds a property node as JSON, its `uri` tells which
+    property changed: the current state of every property first, then the
+    property every time a new value is received. Values are coalesced per
+    property: a client that reads slower than the values arrive gets the
+    latest value of each property. A comment line is sent after `heartbeat`
+    seconds without values.
+
+    Example:
+      `/kg/stream/multi?node_uri=http://example.org/p1&node_uri=http://example.org/p2`
+    """
+    try:
+        nodes = await _load_streamed_properties(node_uri, asset_uri)
+        return StreamingResponse(
+            _sse_property_events(nodes, heartbeat),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    except Exception as e:
+        logger.error(f"Error streaming properties: {e}")
+        raise HTTPException(status_code=500, detail=f"Error streaming properties: {e}")
+
+
+@app.websocket("/kg/stream/multi/ws")
+async def stream_properties_websocket(
+    websocket: WebSocket,
+    node_uri: List[str] = Query(None),
+    asset_uri: str = None,
+    current_user: User = Depends(get_websocket_user),
+):
+    """
+    WebSocket variant of `/kg/stream/multi`: one JSON text message per
+    property node, with the same coalescing.
+    """
+    try:
+        nodes = await _load_streamed_properties(node_uri, asset_uri)
+    except Exception as e:
+        logger.error(f"Error streaming properties: {e}")
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+
+    await websocket.accept()
+    try:
+        await _websocket_property_events(websocket, nodes)
+    except WebSocketDisconnect:
+        pass
+
+
+def _history_series(records):
+    """Group the records of a history query into one columnar series per
+    table. Only one series is held in memory at a time."""
+    series = None
+    for record in records:
+        if series is None or record.table != series["table"]:
+            if series is not None:
+                del series["table"]
+                yield series
+            series = {
+                "table": record.table,
+                "field": record.get_field(),
+                "measurement": record.get_measurement(),
+                "tags": {
+                    key: value
+                    for key, value in record.values.items()
+                    if not key.startswith("_") and key not in ("result", "table")
+                },
+                "time": [],
+                "value": [],
+            }
+        series["time"].append(int(record.get_time().timestamp() * 1000))
+        series["value"].append(record.get_value())
+    if series is not None:
+        del series["table"]
+        yield series
+
+
+async def _history_chunks(header: dict, records):
+    """Stream the history as one JSON object, the series being written as
+    they are read from InfluxDB."""
+    header = json.dumps(header)
+    yield header[:-1] + ', "series": ['
+
+    separator = ""
+    async for series in iterate_in_thread(_history_series(records)):
+        yield separator + json.dumps(series)
+        separator = ","
+    yield "]}"
+
+
+@app.get("/kg/property/history", tags=["Knowledge Graph"])
+async def get_property_history(
+    node_uri: str,
+    start: str = "-1d",
+    stop: str = "now()",
+    max_points: int = Query(1000, ge=1, le=100000),
+    aggregate: str = "mean",
+    format: str = "json",
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get the history of a timeseries property, downsampled by InfluxDB so that
+    the payload does not depend on the length of the range.
+
+    The range is split into at most `max_points` windows (`aggregateWindow`),
+    and the values of each window are aggregated with `aggregate` (`mean`,
+    `median`, `min`, `max`, `first`, `last`, `sum` or `count`). The
+    connection of the property must be running.
+
+    Parameters:
+    - node_uri (str): The URI of a TimeseriesProperty.
+    - start, stop (str): The range, as RFC3339 timestamps or durations
+      relative to now such as `-7d`. Default to the last day.
+    - max_points (int): The maximum number of points of each series.
+    - format (str): `json` (default) or `csv`.
+
+    Response (`json`): a JSON object streamed series by series, with the
+    times in milliseconds since the epoch:
+      ```
+      {"node_uri": "...", "start": "...", "stop": "...", "every": 60,
+       "series": [{"field": "temperature", "measurement": "sensor",
+                   "tags": {"room": "1"}, "time": [...], "value": [...]}]}
+      ```
+    Response (`csv`): one row per point with its `_time`, `_field`, `_value`
+    and tags, the header being repeated when the tags change.
+    """
+    if format not in ("json", "csv"):
+        raise HTTPException(
+            status_code=400, detail=f"Unsupported format {format}, use json or csv"
+        )
+
+    try:
+        node = await sindit_kg_connector.load_node_by_uri_async(node_uri)
+    except Exception as e:
+        logger.error(f"Error loading node {node_uri}: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+    if not isinstance(node, TimeseriesProperty):
+        raise HTTPException(
+            status_code=400, detail=f"Node {node_uri} is not a TimeseriesProperty"
+        )
+
+    connection_uri = (
+        str(node.propertyConnection.uri) if node.propertyConnection else None
+    )
+    connector = connections.get(connection_uri)
+    if not isinstance(connector, InfluxDBConnector) or connector.client is None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"The InfluxDB connection of {node_uri} is not running",
+        )
+
+    identifiers = node.timeseriesIdentifiers
+    if not isinstance(identifiers, dict):
+        identifiers = {}
+    tags = node.timeseriesTags if isinstance(node.timeseriesTags, dict) else None
+
+    try:
+        start_time, stop_time, every = history_window(start, stop, max_points)
+        # The query is sent here, so that its errors get a status code
+        records = await asyncio.to_thread(
+            connector.query_history,
+            start_time,
+            stop_time,
+            every,
+            field=identifiers.get("field"),
+            measurement=identifiers.get("measurement"),
+            bucket=identifiers.get("bucket"),
+            org=identifiers.get("org"),
+            tags=tags,
+            aggregate=aggregate,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error querying the history of {node_uri}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if format == "csv":
+        return StreamingResponse(
+            iterate_in_thread(csv_chunks(record_batches(records, max_points))),
+            media_type="text/csv",
+        )
+
+    header = {
+        "node_uri": node_uri,
+        "start": flux_time(start_time),
+        "stop": flux_time(stop_time),
+        "every": every,
+    }
+    return StreamingResponse(
+        _history_chunks(header, records), media_type="application/json"
+    )
+
+
 @app.get(
     "/kg/advanced_search_node",
     tags=["Knowledge Graph"],
@@ -616,6 +1327,7 @@ async def stream_property(
     ],
 )
 async def advanced_search_node(
+    response: Response,
     type_uri: str = None,
     attribute: str = None,
     attribute_value: str = None,
@@ -624,6 +1336,7 @@ async def advanced_search_node(
     depth: int = 1,
     skip: int = 0,
     limit: int = 10,
+    cursor: str = None,
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -649,11 +1362,14 @@ async def advanced_search_node(
       - `"?value > 10"` to filter nodes with values greater than 10.
       - `CONTAINS(STR(?value), "Temp")` to filter nodes with values  containing "Temp".
 
+    - cursor (str): The `X-Next-Cursor` header of the previous page, to get
+      the next page. Faster than `skip` on deep pages.
+
     Response:
-    - A list of nodes that match the specified criteria.
+    - A list of nodes that match the specified criteria, ordered by uri.
     """
     try:
-        return sindit_kg_connector.find_node_by_attribute(
+        nodes = await sindit_kg_connector.find_node_by_attribute_async(
             type_uri=type_uri,
             attribute_uri=attribute,
             attribute_value=attribute_value,
@@ -662,7 +1378,12 @@ async def advanced_search_node(
             depth=depth,
             skip=skip,
             limit=limit,
+            cursor=cursor,
         )
+        _set_next_cursor(response, nodes)
+        return nodes
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error searching node: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,9 @@
 from typing import List
-from fastapi import Body, HTTPException, Depends
+from fastapi import Body, HTTPException, Depends, Response
 from pydantic import TypeAdapter
 from sindit.initialize_kg_connectors import sindit_kg_connector
 from sindit.api.authentication_endpoints import User, get_current_active_user
+from sindit.api.kg_endpoints import _set_next_cursor
 
 from sindit.knowledge_graph.relationship_model import (
     RelationshipUnion,
@@ -73,15 +74,26 @@ async def get_relationship_by_node(
     response_model=List[RelationshipUnion],
 )
 async def get_all_relationships(
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     skip: int = 0,
     limit: int = 10,
+    cursor: str = None,
 ) -> list:
     """
     Get all relationships.
+
+    When there are more relationships, the `X-Next-Cursor` response header
+    holds the `cursor` of the next page.
     """
     try:
-        return sindit_kg_connector.get_all_relationships(skip=skip, limit=limit)
+        relationships = sindit_kg_connector.get_all_relationships(
+            skip=skip, limit=limit, cursor=cursor
+        )
+        _set_next_cursor(response, relationships)
+        return relationships
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting all relationships: {e}")
         raise HTTPException(status_code=404, detail=str(e))
@@ -1,14 +1,35 @@
 import time
 
-import requests
 from sindit.common.semantic_knowledge_graph.SemanticKGPersistenceService import (
     SemanticKGPersistenceService,
 )
-from sindit.util.client_api import ClientAPI
+from sindit.util.client_api import AsyncClientAPI, ClientAPI
 from sindit.util.log import logger
 
 
 class GraphDBPersistenceService(SemanticKGPersistenceService):
+    """GraphDB implementation of the persistence service.
+
+    One instance is meant to be shared by all threads (API, connectors, thread
+    pools): its requests go through a single pooled keep-alive HTTP session
+    and at most ``max_concurrent_requests`` of them run against GraphDB at the
+    same time. The ``*_async`` methods use a separate asyncio client with the
+    same limits, so API endpoints do not block the event loop.
+
+    Args:
+        host (str): GraphDB host, with or without scheme.
+        port (str): GraphDB port.
+        repository (str): The repository id.
+        username (str): Username for GraphDB.
+        password (str): Password for GraphDB.
+        pool_size (int): Number of keep-alive connections to GraphDB.
+            Default is 10.
+        max_concurrent_requests (int): Maximum number of concurrent requests
+            to GraphDB. Default is 10.
+        connect_timeout (float): Connect timeout in seconds. Default is 5.
+        read_timeout (float): Read timeout in seconds. Default is 300.
+    """
+
     def __init__(
         self,
         host: str,
@@ -16,6 +37,10 @@ class GraphDBPersistenceService(SemanticKGPersistenceService):
         repository: str,
         username: str = "",
         password: str = "",
+        pool_size: int = 10,
+        max_concurrent_requests: int = 10,
+        connect_timeout: float = 5,
+        read_timeout: float = 300,
     ):
         # Validate inputs
         if not host:
@@ -41,9 +66,23 @@ class GraphDBPersistenceService(SemanticKGPersistenceService):
         self.__username = username
         self.__password = password
         self.__connected = False
-        self._connect()
 
-        self.__client_api = ClientAPI(self.__sparql_endpoint)
+        self.__client_api = ClientAPI(
+            self.__sparql_endpoint,
+            pool_size=pool_size,
+            max_concurrency=max_concurrent_requests,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+        self.__async_client_api = AsyncClientAPI(
+            self.__sparql_endpoint,
+            pool_size=pool_size,
+            max_concurrency=max_concurrent_requests,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+
+        self._connect()
 
     def _connect(self):
         self.__health_check_uri = f"{self.__sparql_endpoint}/health"
@@ -53,7 +92,7 @@ class GraphDBPersistenceService(SemanticKGPersistenceService):
                 logger.info("Connecting to GraphDB...")
                 logger.debug(f"Trying to connect to uri {self.__health_check_uri}.")
 
-                response = requests.get(
+                response = self.__client_api.session.get(
                     self.__health_check_uri,
                     timeout=5,
                     auth=(self.__username, self.__password),
@@ -140,3 +179,51 @@ class GraphDBPersistenceService(SemanticKGPersistenceService):
         )
 
         return response
+
+    async def graph_query_async(self, query: str, accept_content: str) -> str:
+        data = {
+            "query": query,
+        }
+        headers = {
+            "Accept": accept_content,
+            "Content-Type": "application/x-www-form-urlencoded",
+        }
+        response = await self.__async_client_api.post(
+            "",
+            data=data,
+            headers=headers,
+            retries=5,
+            auth=(self.__username, self.__password),
+        )
+        return response.text
+
+    async def graph_update_async(self, update: str) -> any:
+        data = {
+            "update": update,
+        }
+        response = await self.__async_client_api.post(
+            "/statements",
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            retries=5,
+            auth=(self.__username, self.__password),
+        )
+
+        return response
+
+    async def graph_export_async(self, graph_uri: str, accept_content: str):
+        # The RDF4J statements endpoint streams the statements of a context
+        params = {
+            "context": f"<{graph_uri}>",
+        }
+        async for chunk in self.__async_client_api.stream(
+            "GET",
+            "/statements",
+            params=params,
+            headers={"Accept": accept_content},
+            auth=(self.__username, self.__password),
+        ):
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self.__async_client_api.aclose()
@@ -29,3 +29,39 @@ class SemanticKGPersistenceService:
         :return: True if the update was successful, False otherwise
         """
         pass
+
+    async def graph_query_async(self, query: str, accept_content: str) -> str:
+        """
+        Asynchronous version of graph_query, to be awaited from coroutines
+        without blocking the event loop.
+        :param query: The query to be executed
+        :param accept_content: The content type of the response
+        :return: The result of the query
+        """
+        pass
+
+    async def graph_update_async(self, update: str) -> any:
+        """
+        Asynchronous version of graph_update.
+        :param update: The update query to be executed
+        :return: The response of the database
+        """
+        pass
+
+    async def graph_export_async(self, graph_uri: str, accept_content: str):
+        """
+        Stream all the statements of a named graph, without loading them in
+        memory.
+        :param graph_uri: The uri of the named graph
+        :param accept_content: The RDF format of the statements, e.g.
+            application/n-triples, application/x-trig
+        :return: An asynchronous iterator over the chunks (bytes) of the
+            serialized statements
+        """
+        pass
+
+    async def aclose(self) -> None:
+        """
+        Close the connections opened by the asynchronous methods.
+        """
+        pass
@@ -39,6 +39,35 @@ class URIRefNode(BaseModel):
         return f"uri: {self.uri}"
 
 
+NTRIPLES_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def _nt_term(term: Node) -> str:
+    if isinstance(term, Literal):
+        # Literal.n3() writes multi-line strings with triple quotes, which
+        # is not valid N-Triples
+        value = f'"{str(term).translate(NTRIPLES_ESCAPES)}"'
+        if term.language is not None:
+            return f"{value}@{term.language}"
+        if term.datatype is not None:
+            return f"{value}^^<{term.datatype}>"
+        return value
+    return term.n3()
+
+
+def to_ntriples(triples) -> str:
+    """Serialize rdflib triples to N-Triples, one triple per line. The result
+    can be used as is in the data block of a SPARQL INSERT DATA or DELETE
+    DATA request."""
+    return "".join(
+        f"{_nt_term(s)} {_nt_term(p)} {_nt_term(o)} .\n" for s, p, o in triples
+    )
+
+
+# node class -> (len(mapping), plan), see RDFModel._field_plan
+_field_plans = {}
+
+
 class RDFModel(BaseModel):
     """RDF Model
     Limitations:
@@ -228,6 +257,13 @@ class RDFModel(BaseModel):
         super().__setattr__(name, new_val) """
 
     def _process_attr(self, value: Any) -> None:
+        return RDFModel.to_rdf_term(value)
+
+    @staticmethod
+    def to_rdf_term(value: Any) -> Any:
+        """Convert a python value to the rdflib term stored in the graph.
+        Values that have no term representation (e.g., nested RDFModel
+        objects or lists) are returned unchanged."""
         if isinstance(value, URIRefNode):
             new_val = value.uri
         elif (
@@ -257,6 +293,7 @@ class RDFModel(BaseModel):
 
         return new_val
 
+    @staticmethod
     def reverse_to_type(value: Any, value_type_hint: Any) -> Any:
         # Convert the value to the correct data type
         # TODO: Should check for other xsd types
@@ -279,6 +316,7 @@ class RDFModel(BaseModel):
             new_val = str(value)
         return new_val
 
+    @staticmethod
     def _reverse_attr(value: Any, value_type_hint: Any) -> None:
         new_val = value
         if isinstance(value, Literal):
@@ -330,8 +368,11 @@ class RDFModel(BaseModel):
         return new_val
 
     def g(self) -> Graph:
-        """Lazy load the rdflib.Graph object."""
-        self.rdf()
+        """Build the rdflib.Graph object of this object and its related
+        objects."""
+        self._g = Graph()
+        for triple in self.triples():
+            self._g.add(triple)
         return self._g
 
     """ def _add(self, s: Node, p: Node, o: Node):
@@ -391,20 +432,32 @@ class RDFModel(BaseModel):
                     raise TypeError(f"Unexpected type {type(value)} for value {value}")
         return self._g.serialize(format=format) """
 
-    def rdf(self, format: str = "turtle") -> str:
-        # Initialize the graph
-        self._g = Graph()
+    def triples(self) -> list:
+        """Get the triples of this object and of its related objects, without
+        building an rdflib.Graph. Duplicates are removed, the order is the
+        order in which the fields are visited."""
+        # Used as an ordered set
+        triples = {}
 
         # Track visited URIs to prevent infinite recursion
         visited = set()
 
-        def _add_to_graph(obj: RDFModel, g: Graph, visited: set):
+        def _add(s: Node, p: Node, o: Node):
+            if isinstance(p, URIRef):
+                triples[(s, p, o)] = None
+            elif isinstance(p, MapTo):
+                triples[(s, p.value, o)] = None
+                triples[(o, p.inverse, s)] = None
+            else:
+                raise TypeError(f"Unexpected type {type(p)} for value {p}")
+
+        def _add_triples(obj: RDFModel):
             if obj.uri in visited:
                 return  # Skip if already processed (circular reference)
 
             visited.add(obj.uri)  # Mark the object as visited
 
-            g.add((obj.uri, RDF.type, obj.class_uri))
+            triples[(obj.uri, RDF.type, obj.class_uri)] = None
 
             for key, rdf_property in obj.mapping.items():
                 value = getattr(obj, key, None)
@@ -412,37 +465,43 @@ class RDFModel(BaseModel):
 
                 if value is not None:
                     if isinstance(value, RDFModel):
-                        obj._add(obj.uri, rdf_property, value.uri, g)
+                        _add(obj.uri, rdf_property, value.uri)
 
-                        _add_to_graph(
-                            value, g, visited
-                        )  # Recursively add nested RDFModel
+                        _add_triples(value)  # Recursively add nested RDFModel
                     elif isinstance(value, list) or isinstance(value, tuple):
                         for item in value:
                             item = obj._process_attr(item)
                             if isinstance(item, RDFModel):
-                                obj._add(obj.uri, rdf_property, item.uri, g)
+                                _add(obj.uri, rdf_property, item.uri)
 
-                                _add_to_graph(
-                                    item, g, visited
-                                )  # Recursively add nested RDFModel
+                                _add_triples(item)  # Recursively add nested RDFModel
                             elif isinstance(item, URIRef):
-                                obj._add(obj.uri, rdf_property, item, g)
+                                _add(obj.uri, rdf_property, item)
                             elif isinstance(item, Literal):  # New, need to be tested!
-                                obj._add(obj.uri, rdf_property, item, g)
+                                _add(obj.uri, rdf_property, item)
                             else:
                                 raise TypeError(
                                     f"Unexpected type {type(item)} for value {item}"
                                 )
                     elif isinstance(value, Literal) or isinstance(value, URIRef):
-                        obj._add(obj.uri, rdf_property, value, g)
+                        _add(obj.uri, rdf_property, value)
                     else:
                         raise TypeError(
                             f"Unexpected type {type(value)} for value {value}"
                         )
 
-        # Add this object and its related objects to the graph
-        _add_to_graph(self, self._g, visited)
+        _add_triples(self)
+        return list(triples)
+
+    def ntriples(self) -> str:
+        """Serialize this object and its related objects to N-Triples."""
+        return to_ntriples(self.triples())
+
+    def rdf(self, format: str = "turtle") -> str:
+        # Build the graph of this object and its related objects
+        self._g = Graph()
+        for triple in self.triples():
+            self._g.add(triple)
 
         # Return the serialized graph
         return self._g.serialize(format=format)
@@ -487,30 +546,27 @@ class RDFModel(BaseModel):
                 "in the knowledge graph"
             )
 
+        plan = RDFModel._field_plan(node_class)
         for ind in individuals:
             # for ind, _, _ in g.triples(None, RDF.type, class_uri):
             if str(ind) not in return_individuals:
                 new_ind = node_class(uri=ind)
                 return_individuals[str(ind)] = new_ind
 
-                for att_name, att_uri in node_class.mapping.items():
-                    if isinstance(att_uri, MapTo):
-                        att_uri = att_uri.value
-                    # att_value = g.value(subject=ind, predicate=att_uri)
-                    att_value = [
-                        value for _, _, value in g.triples((ind, att_uri, None))
-                    ]
-
-                    if att_value is not None:
-                        return_individuals = RDFModel._set_att_from_graph(
-                            new_ind,
-                            g,
-                            ind,
-                            att_name,
-                            att_value,
-                            return_individuals,
-                            uri_class_mapping,
-                        )
+                # Single pass over the triples of the individual
+                values = {}
+                for predicate, value in g.predicate_objects(ind):
+                    fields = plan.get(predicate)
+                    if fields is None:
+                        continue
+                    value, return_individuals = RDFModel._value_from_graph(
+                        g, value, return_individuals, uri_class_mapping
+                    )
+                    for field in fields:
+                        values.setdefault(field, []).append(value)
+
+                for field, field_values in values.items():
+                    RDFModel._set_obj_att(new_ind, field, field_values)
 
         return return_individuals
 
@@ -541,31 +597,58 @@ class RDFModel(BaseModel):
 
         return return_individuals
 
-    def _set_obj_att(ind_obj, att_name, att_value):
-        att_type_hint = get_type_hints(ind_obj.__class__).get(att_name)
-
-        try:
-            new_att_value = RDFModel._reverse_attr(att_value, att_type_hint)
-        except Exception:
-            new_att_value = att_value
+    def _field_plan(node_class) -> dict:
+        """Get the deserialization plan of a class: a dict mapping each
+        predicate to the fields stored with it, as (name, type hint, is list)
+        tuples.
+
+        The plan is computed on first use and cached per class, as resolving
+        the type hints is expensive. It is recomputed if the mapping of the
+        class changes (the label is added to it on instantiation).
+        """
+        cached = _field_plans.get(node_class)
+        if cached is not None and cached[0] == len(node_class.mapping):
+            return cached[1]
+
+        type_hints = get_type_hints(node_class)
+        mapping = dict(node_class.mapping)
+        if "label" in node_class.model_fields:
+            mapping["label"] = RDFS.label
+
+        plan = {}
+        for att_name, att_uri in mapping.items():
+            if isinstance(att_uri, MapTo):
+                att_uri = att_uri.value
+            att_type_hint = type_hints.get(att_name)
+            is_list = getattr(att_type_hint, "__origin__", None) in (list, List)
+            plan.setdefault(att_uri, []).append((att_name, att_type_hint, is_list))
+
+        plan = {predicate: tuple(fields) for predicate, fields in plan.items()}
+        _field_plans[node_class] = (len(node_class.mapping), plan)
+        return plan
+
+    def _set_obj_att(ind_obj, field: tuple, att_values: list):
+        """Set all the values read from the graph for a field at once."""
+        att_name, att_type_hint, is_list = field
+
+        new_att_values = []
+        for att_value in att_values:
+            if isinstance(att_value, Literal):
+                try:
+                    att_value = RDFModel._reverse_attr(att_value, att_type_hint)
+                except Exception:
+                    pass
+            new_att_values.append(att_value)
 
         if att_type_hint is not None:
-            if "__origin__" in dir(att_type_hint) and (
-                att_type_hint.__origin__ == list or att_type_hint.__origin__ == List
-            ):
-                # get the exising value
+            if is_list:
                 existing_value = getattr(ind_obj, att_name, None)
-                # if the existing value is not None
                 if existing_value is not None:
-                    # append the new value to the existing value
-                    setattr(ind_obj, att_name, existing_value + [new_att_value])
-                # if the existing value is None
-                else:
-                    # set the value as a list
-                    setattr(ind_obj, att_name, [new_att_value])
+                    new_att_values = existing_value + new_att_values
+                setattr(ind_obj, att_name, new_att_values)
             else:
                 # Scalar field: always replace (never accumulate non-List fields)
-                setattr(ind_obj, att_name, new_att_value)
+                setattr(ind_obj, att_name, new_att_values[-1])
 
         else:
             # No type hint: accumulate (unknown if scalar or multi-valued)
@@ -573,73 +656,53 @@ class RDFModel(BaseModel):
             if existing_value is not None:
                 if not isinstance(existing_value, list):
                     existing_value = [existing_value]
-                setattr(ind_obj, att_name, existing_value + [new_att_value])
+                setattr(ind_obj, att_name, existing_value + new_att_values)
+            elif len(new_att_values) == 1:
+                setattr(ind_obj, att_name, new_att_values[0])
             else:
-                setattr(ind_obj, att_name, new_att_value)
+                setattr(ind_obj, att_name, new_att_values)
 
-    def _set_att_from_graph(
-        ind_obj,
+    def _value_from_graph(
         g: Graph,
-        ind: URIRef,
-        att_name: str,
-        att_value: Any,
+        value: Any,
         created_individuals: dict = {},
         uri_class_mapping: dict = {},
     ):
+        """Get the attribute value of an object of a triple: the literal,
+        the individual it refers to (deserialized if needed), or a
+        URIRefNode if its class is unknown."""
         return_individuals = created_individuals
 
-        # value = g.value(subject=ind, predicate=att_uri)
-
-        # if value is not None:
-        value = att_value
         if isinstance(value, Literal):
-            RDFModel._set_obj_att(ind_obj, att_name, value)
+            return value, return_individuals
         elif isinstance(value, URIRef) or isinstance(value, BNode):
             if str(value) in return_individuals:
-                RDFModel._set_obj_att(ind_obj, att_name, return_individuals[str(value)])
-            else:
-                new_node_uri = value
-                new_node_class_uri = g.value(subject=value, predicate=RDF.type)
-                if (
-                    new_node_class_uri is not None
-                    and new_node_class_uri in uri_class_mapping
-                ):
-                    new_node_class = uri_class_mapping.get(new_node_class_uri)
-                    new_node_class_uri = URIRef(new_node_class_uri)
-                    return_individuals = RDFModel.deserialize(
-                        g,
-                        new_node_class,
-                        new_node_uri,
-                        new_node_class_uri,
-                        return_individuals,
-                        uri_class_mapping,
-                    )
-                    if str(value) in return_individuals:
-                        RDFModel._set_obj_att(
-                            ind_obj, att_name, return_individuals[str(value)]
-                        )
-                    else:
-                        raise ValueError(
-                            "Could not create object for {value} with class "
-                            "{new_node_class_uri}"
-                        )
-                else:
-                    # Instead of setting value to URIRef, create a URIRefNode
-                    value = URIRefNode(uri=value)
-                    RDFModel._set_obj_att(ind_obj, att_name, value)
-
-        elif isinstance(value, list):
-            for item in value:
-                return_individuals = RDFModel._set_att_from_graph(
-                    ind_obj,
+                return return_individuals[str(value)], return_individuals
+
+            new_node_uri = value
+            new_node_class_uri = g.value(subject=value, predicate=RDF.type)
+            if (
+                new_node_class_uri is not None
+                and new_node_class_uri in uri_class_mapping
+            ):
+                new_node_class = uri_class_mapping.get(new_node_class_uri)
+                new_node_class_uri = URIRef(new_node_class_uri)
+                return_individuals = RDFModel.deserialize(
                     g,
-                    ind,
-                    att_name,
-                    item,
+                    new_node_class,
+                    new_node_uri,
+                    new_node_class_uri,
                     return_individuals,
                     uri_class_mapping,
                 )
-        else:
-            raise TypeError(f"Unexpected type {type(value)} for value {value}")
+                if str(value) in return_individuals:
+                    return return_individuals[str(value)], return_individuals
+                raise ValueError(
+                    f"Could not create object for {value} with class "
+                    f"{new_node_class_uri}"
+                )
 
-        return return_individuals
+            # Instead of setting value to URIRef, create a URIRefNode
+            return URIRefNode(uri=value), return_individuals
+
+        raise TypeError(f"Unexpected type {type(value)} for value {value}")
@@ -0,0 +1,80 @@
+import csv
+import json
+from io import StringIO
+from typing import Iterator
+
+
+class SPARQLResult:
+    """Rows of a SELECT query result, read without pandas.
+
+    The result is parsed lazily: iterating over it reads the rows one by one
+    from the response body, as plain tuples ordered like ``variables``.
+    Unbound values are None.
+
+    Args:
+        query_result (str): The body of the response, as returned by
+            SemanticKGPersistenceService.graph_query.
+        content_type (str): ``text/csv`` (default) or
+            ``application/sparql-results+json``.
+    """
+
+    def __init__(self, query_result: str, content_type: str = "text/csv"):
+        self.content_type = content_type
+        self._query_result = query_result or ""
+        self._json = None
+
+        if content_type == "application/sparql-results+json":
+            if self._query_result.strip():
+                self._json = json.loads(self._query_result)
+            else:
+                self._json = {}
+            self.variables = list(self._json.get("head", {}).get("vars", []))
+        elif content_type == "text/csv":
+            header = next(csv.reader(StringIO(self._query_result)), [])
+            self.variables = [variable.strip() for variable in header]
+        else:
+            raise ValueError(f"Unsupported content type {content_type}")
+
+    def __iter__(self) -> Iterator[tuple]:
+        if self._json is not None:
+            for binding in self._json.get("results", {}).get("bindings", []):
+                yield tuple(
+                    binding[variable]["value"] if variable in binding else None
+                    for variable in self.variables
+                )
+            return
+
+        reader = csv.reader(StringIO(self._query_result))
+        next(reader, None)
+        for row in reader:
+            if not row:
+                continue
+            # Unbound values are empty strings in the CSV format
+            yield tuple(value if value != "" else None for value in row)
+
+    def dicts(self, drop_none: bool = False) -> Iterator[dict]:
+        """Iterate over the rows as dicts {variable: value}. Unbound values
+        are left out if ``drop_none`` is True."""
+        for row in self:
+            if drop_none:
+                yield {
+                    variable: value
+                    for variable, value in zip(self.variables, row)
+                    if value is not None
+                }
+            else:
+                yield dict(zip(self.variables, row))
+
+    def column(self, variable: str) -> list:
+        """Get the values of one variable, for all rows."""
+        if variable not in self.variables:
+            return []
+        index = self.variables.index(variable)
+        return [row[index] for row in self]
+
+    def to_dataframe(self):
+        """Get the result as a pandas DataFrame, for the callers that really
+        need one. pandas is only imported here."""
+        import pandas as pd
+
+        return pd.DataFrame.from_records(list(self), columns=self.variables)
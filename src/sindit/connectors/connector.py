@@ -1,9 +1,9 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 import threading
-from sindit.common.semantic_knowledge_graph.rdf_model import RDFModel, URIRefNode
 from sindit.util.log import logger
 from sindit.knowledge_graph.kg_connector import SINDITKGConnector
+from sindit.knowledge_graph.property_value_hub import property_value_hub
 
 
 class Connector:
@@ -58,17 +58,34 @@ class Connector:
         """
         logger.debug(f"Node {self.uri} notifies all attached properties")
         self.observers_lock.acquire()
-
         try:
+            observers = []
             if self._observers is not None:
-                for observer in self._observers.values():
-                    try:
-                        observer.update_value(self, **kwargs)
-                    except Exception as e:
-                        logger.error(f"Failed to notify observer {observer.uri}: {e}")
+                observers = list(self._observers.values())
+        finally:
+            self.observers_lock.release()
+
+        self._notify_observers(observers, **kwargs)
+
+    def _notify_observers(self, observers: list, **kwargs) -> None:
+        """
+        Notify the given properties. Called without holding the observers
+        lock, so that slow properties do not block attach/detach.
+        """
+        for observer in observers:
+            try:
+                observer.update_value(self, **kwargs)
+            except Exception as e:
+                logger.error(f"Failed to notify observer {observer.uri}: {e}")
 
+    def get_metrics(self) -> dict:
+        """Get the runtime metrics of the connector."""
+        self.observers_lock.acquire()
+        try:
+            properties = len(self._observers) if self._observers is not None else 0
         finally:
             self.observers_lock.release()
+        return {"connected": self.is_connected, "properties": properties}
 
     @abstractmethod
     def start(self, **kwargs) -> any:
@@ -131,46 +148,37 @@ class Property(ABC):
         pass
 
     def update_property_value_to_kg(self, uri, value, timestamp):
+        # Push the value to the streaming clients first, they do not wait
+        # for the knowledge graph
+        property_value_hub.publish(uri, value, timestamp)
+
         if self.kg_connector is not None:
-            # Update the knowledge graph with the new value
-            node = None
+            # The value of the property, converted to its propertyDataType
+            node_value = value
             try:
-                node = self.kg_connector.load_node_by_uri(uri)
+                node_value = self.kg_connector.convert_property_value(uri, value)
             except Exception as e:
-                logger.error(f"Failed to load node {uri}: {e}")
-
-            if node is not None:
-                data_type = node.propertyDataType
-                node_value = None
-
-                if isinstance(data_type, URIRefNode):
-                    data_type = data_type.uri
-
-                if data_type is not None:
-                    data_type = str(data_type)
+                logger.error(f"Failed to get the data type of property {uri}: {e}")
 
-                if isinstance(value, dict):
-                    node_value = {}
-                    for key, value in value.items():
-                        node_value[key] = RDFModel.reverse_to_type(value, data_type)
-                else:
-                    node_value = RDFModel.reverse_to_type(value, data_type)
+            writer = self.kg_connector.get_property_value_writer()
+            if writer is not None:
+                # Write-behind: the value is coalesced with other updates
+                # and flushed to the knowledge graph in a batch
+                writer.submit(uri, value, timestamp)
+                self.value = node_value
+                return
 
-                value = node_value
-
-                node.propertyValue = value
-                node.propertyValueTimestamp = timestamp
-
-                try:
-                    self.kg_connector.save_node(node)
-                    logger.debug(
-                        f"Property {uri} saved to KG with value type: {type(value)}"
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to save node {uri} to KG: {e}")
+            # Only the value and the timestamp of the node are written
+            try:
+                self.kg_connector.update_property_value(uri, value, timestamp)
+                logger.debug(
+                    f"Property {uri} saved to KG with value type: {type(value)}"
+                )
+            except Exception as e:
+                logger.error(f"Failed to save property value {uri} to KG: {e}")
 
             logger.debug(
                 f"Property {uri} updated with value {value}, " f"timestamp {timestamp}"
             )
 
-            self.value = value
+            self.value = node_value
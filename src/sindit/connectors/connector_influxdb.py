@@ -1,6 +1,13 @@
+import asyncio
+import csv
+import math
+import re
 import threading
 import time
+from io import StringIO
+from datetime import datetime, timedelta, timezone
 
+from dateutil import parser
 from influxdb_client import InfluxDBClient
 from sindit.connectors.connector import Connector
 from sindit.knowledge_graph.kg_connector import SINDITKGConnector
@@ -8,6 +15,157 @@ from sindit.util.log import logger
 
 from sindit.connectors.connector_factory import ObjectBuilder
 from sindit.connectors.connector_factory import connector_factory
+from sindit.util.environment_and_configuration import get_environment_variable
+
+# Relative Flux durations accepted for the history range, e.g. -7d or -1h30m
+FLUX_DURATION_PATTERN = re.compile(r"(\d+)(ms|s|m|h|d|w)")
+FLUX_DURATION_SECONDS = {
+    "ms": 0.001,
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+}
+
+# Aggregate functions of the history windows
+HISTORY_AGGREGATES = ("mean", "median", "min", "max", "first", "last", "sum", "count")
+
+
+def parse_flux_time(value, now: datetime = None) -> datetime:
+    """Get the datetime of a Flux time: ``now()``, a relative duration such as
+    ``-7d`` or ``-1h30m``, or an RFC3339 timestamp. Raise ValueError for other
+    values."""
+    if now is None:
+        now = datetime.now(timezone.utc)
+    if isinstance(value, datetime):
+        timestamp = value
+    else:
+        value = str(value).strip()
+        if value == "now()":
+            return now
+        if value.startswith("-"):
+            parts = FLUX_DURATION_PATTERN.findall(value[1:])
+            if parts and "".join(n + unit for n, unit in parts) == value[1:]:
+                seconds = sum(int(n) * FLUX_DURATION_SECONDS[u] for n, u in parts)
+                return now - timedelta(seconds=seconds)
+        try:
+            timestamp = parser.isoparse(value)
+        except ValueError:
+            raise ValueError(f"Invalid time {value}")
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def history_window(start, stop, max_points: int) -> tuple:
+    """Get the absolute (start, stop) datetimes of a range, and the duration
+    in seconds of the windows that split it into at most ``max_points``."""
+    if max_points < 1:
+        raise ValueError("max_points must be at least 1")
+    now = datetime.now(timezone.utc)
+    start_time = parse_flux_time(start, now)
+    stop_time = parse_flux_time(stop, now)
+    if start_time >= stop_time:
+        raise ValueError("start must be before stop")
+    span = (stop_time - start_time).total_seconds()
+    return start_time, stop_time, max(1, math.ceil(span / max_points))
+
+
+def flux_time(timestamp: datetime) -> str:
+    """Get the RFC3339 literal of a datetime, in UTC."""
+    return timestamp.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+# Return types of query_field reading the result in batches, see record_batches
+STREAM_RETURN_TYPES = ("dataframes", "arrow", "csv")
+
+# Columns of the records that only describe the Flux result
+RESULT_COLUMNS = ("result", "table")
+
+
+def record_batches(records, batch_size: int = 10000):
+    """Group FluxRecords into columnar batches, as they are read.
+
+    A batch holds at most ``batch_size`` rows of a single table (series), so
+    its columns are the same for all its rows.
+
+    Yields:
+        dict: The values of each column of the batch, by column name.
+    """
+    columns = None
+    table = None
+    rows = 0
+    for record in records:
+        if columns is None or record.table != table or rows >= batch_size:
+            if columns is not None:
+                yield columns
+            table = record.table
+            columns = {key: [] for key in record.values if key not in RESULT_COLUMNS}
+            rows = 0
+        for key, column in columns.items():
+            column.append(record.values.get(key))
+        rows += 1
+    if columns is not None:
+        yield columns
+
+
+def dataframe_batches(batches):
+    """Convert columnar batches to pandas DataFrames."""
+    import pandas as pd
+
+    for columns in batches:
+        yield pd.DataFrame(columns)
+
+
+def arrow_batches(batches):
+    """Convert columnar batches to pyarrow RecordBatches."""
+    import pyarrow
+
+    for columns in batches:
+        yield pyarrow.RecordBatch.from_pydict(columns)
+
+
+def csv_chunks(batches):
+    """Convert columnar batches to CSV text. The header is written again
+    when the columns change from a batch to the next."""
+    header = None
+    for columns in batches:
+        output = StringIO()
+        writer = csv.writer(output)
+        if list(columns) != header:
+            header = list(columns)
+            writer.writerow(header)
+        for row in zip(*columns.values()):
+            writer.writerow(
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            )
+        yield output.getvalue()
+
+
+async def iterate_in_thread(iterator):
+    """Iterate over a blocking iterator, e.g. the records read from the HTTP
+    response of a query, without blocking the event loop.
+
+    The iterator is closed when the iteration stops early, e.g. when the
+    client of a streamed response disconnects, so that the response is
+    released.
+    """
+    read = None
+    try:
+        while True:
+            # Shielded, as a cancelled read still runs to its end in its thread
+            read = asyncio.ensure_future(asyncio.to_thread(next, iterator, None))
+            item = await asyncio.shield(read)
+            if item is None:
+                return
+            yield item
+    finally:
+        # A generator cannot be closed while a read is running in it
+        if read is not None:
+            await asyncio.wait([read])
+        await asyncio.to_thread(getattr(iterator, "close", lambda: None))
 
 
 class InfluxDBConnector(Connector):
@@ -27,6 +185,10 @@ class InfluxDBConnector(Connector):
         token (str, optional):
             The authentication token for accessing the InfluxDB instance.
             Defaults to None.
+        update_interval (int, optional): Seconds between two updates of the
+            attached properties. Defaults to 30.
+        lookback (str, optional): Start of the range searched for the latest
+            value of the properties, as a Flux duration. Defaults to "-30d".
 
     Attributes:
         host (str): The hostname or IP address of the InfluxDB server.
@@ -49,6 +211,7 @@ class InfluxDBConnector(Connector):
         uri: str = None,
         kg_connector: SINDITKGConnector = None,
         update_interval: int = 30,  # update every 30 seconds
+        lookback: str = "-30d",
     ):
         super().__init__()
 
@@ -72,6 +235,7 @@ class InfluxDBConnector(Connector):
         self.thread = None
         self._stop_event = threading.Event()
         self.update_interval = update_interval
+        self.lookback = lookback
 
     def set_token(self, token):
         """Set the authentication token for the InfluxDB connection.
@@ -188,6 +352,7 @@ class InfluxDBConnector(Connector):
         tags: dict = None,
         latest: bool = False,
         query_return_type: str = "pandas",
+        batch_size: int = 10000,
     ):
         """Query the specified field or measurement from the InfluxDB database.
 
@@ -201,11 +366,20 @@ class InfluxDBConnector(Connector):
                 Defaults to "now()".
             query_return_type (str, optional):
                 The type of the query result to return.
-                Valid values are "pandas" and "flux".
-                Defaults to "flux".
+                Valid values are "pandas" and "flux", or, to read large
+                results with bounded memory, "dataframes", "arrow" and "csv".
+                The latter return an iterator over batches of at most
+                `batch_size` rows of one series, read from the response as
+                they are iterated: pandas DataFrames, pyarrow RecordBatches
+                (pyarrow must be installed) or CSV text. Their rows are not
+                pivoted, there is one row per record with its `_time`,
+                `_field` and `_value` columns.
+                Defaults to "pandas".
+            batch_size (int, optional): The maximum number of rows of the
+                batches of the streaming return types. Defaults to 10000.
 
         Returns:
-            pandas.DataFrame or InfluxDB result:
+            pandas.DataFrame, InfluxDB result or iterator of batches:
                 The query result based on the specified return type.
 
         Raises:
@@ -219,6 +393,51 @@ class InfluxDBConnector(Connector):
                 "but not both as None."
             )
 
+        if query_return_type == "arrow":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("The 'arrow' query return type requires pyarrow.")
+
+        query = self._build_query(field, measurement, start, stop, bucket, tags)
+
+        if latest:
+            query += "|> last()"
+
+        if query_return_type in STREAM_RETURN_TYPES:
+            records = self.client.query_api().query_stream(query, org=org)
+            batches = record_batches(records, batch_size)
+            if query_return_type == "dataframes":
+                return dataframe_batches(batches)
+            if query_return_type == "arrow":
+                return arrow_batches(batches)
+            return csv_chunks(batches)
+
+        if query_return_type == "pandas":
+            query += (
+                '|> pivot(rowKey:["_time"], '
+                'columnKey: ["_field"], '
+                'valueColumn: "_value") '
+            )
+            return self.client.query_api().query_data_frame(query, org=org)
+        elif query_return_type == "flux":
+            return self.client.query_api().query(query, org=org)
+        else:
+            raise ValueError(
+                "Invalid query return type. Choose one of 'pandas', 'flux', "
+                f"{', '.join(repr(t) for t in STREAM_RETURN_TYPES)}."
+            )
+
+    def _build_query(
+        self,
+        field: str | list = None,
+        measurement: str = None,
+        start: str = "-1h",
+        stop: str = "now()",
+        bucket: str = None,
+        tags: dict = None,
+    ) -> str:
+        """Get the Flux query of the range, measurement, field(s) and tags."""
         self._check_if_bucket_name_is_set(bucket)
 
         query = f"""
@@ -250,22 +469,96 @@ class InfluxDBConnector(Connector):
                     query += f'    |> filter(fn: (r) => r.{key} == "{value}")\n'
                 # query += f'    |> filter(fn: (r) => r.{key} == "{value}")\n'
 
-        if latest:
-            query += "|> last()"
+        return query
 
-        if query_return_type == "pandas":
-            query += (
-                '|> pivot(rowKey:["_time"], '
-                'columnKey: ["_field"], '
-                'valueColumn: "_value") '
-            )
-            return self.client.query_api().query_data_frame(query, org=org)
-        elif query_return_type == "flux":
-            return self.client.query_api().query(query, org=org)
-        else:
+    def query_history(
+        self,
+        start: datetime,
+        stop: datetime,
+        every: int,
+        field: str | list = None,
+        measurement: str = None,
+        bucket: str = None,
+        org: str = None,
+        tags: dict = None,
+        aggregate: str = "mean",
+    ):
+        """Query the field(s) downsampled by the server into windows.
+
+        Args:
+            start (datetime): The start time of the query range.
+            stop (datetime): The stop time of the query range.
+            every (int): The duration of the windows in seconds, see
+                history_window().
+            aggregate (str, optional): The function aggregating the values
+                of a window, one of HISTORY_AGGREGATES. Defaults to "mean".
+
+        Returns:
+            Iterator[FluxRecord]: The records, series after series, read
+            from the response as they are iterated.
+        """
+        if aggregate not in HISTORY_AGGREGATES:
             raise ValueError(
-                "Invalid query return type. Choose either 'pandas' or 'flux'."
+                f"Invalid aggregate {aggregate}, "
+                f"choose one of {', '.join(HISTORY_AGGREGATES)}."
             )
+        query = self._build_query(
+            field, measurement, flux_time(start), flux_time(stop), bucket, tags
+        )
+        query += (
+            f"|> aggregateWindow(every: {int(every)}s, fn: {aggregate}, "
+            "createEmpty: false)"
+        )
+        return self.client.query_api().query_stream(query, org=org)
+
+    def query_latest(
+        self,
+        field: str | list = None,
+        measurement: str = None,
+        bucket: str = None,
+        org: str = None,
+        tags: dict = None,
+        start: str = None,
+    ) -> dict:
+        """Get the latest value of the fields with a single last() query.
+
+        Args:
+            field (str | list, optional): The field(s) to query, all the fields
+                of the measurement if None.
+            measurement (str, optional): The measurement to query from.
+            start (str, optional): The start of the range searched, defaults
+                to the look-back of the connector.
+
+        Returns:
+            dict: (time, value) of the latest record of each field, by field.
+        """
+        tables = self.query_field(
+            field=field,
+            measurement=measurement,
+            start=start or self.lookback,
+            stop="now()",
+            bucket=bucket,
+            org=org,
+            tags=tags,
+            latest=True,
+            query_return_type="flux",
+        )
+
+        latest = {}
+        # last() returns one record per series, several series may hold the
+        # same field if the tags do not select a single one
+        for table in tables:
+            for record in table.records:
+                field_name = record.get_field()
+                record_time = record.get_time()
+                current = latest.get(field_name)
+                if current is None or (
+                    record_time is not None
+                    and current[0] is not None
+                    and record_time > current[0]
+                ):
+                    latest[field_name] = (record_time, record.get_value())
+        return latest
 
     def get_buckets(self):
         """Get list of buckets in the InfluxDB database.
@@ -333,6 +626,66 @@ class InfluxDBConnector(Connector):
         # TODO: Implement this method?
         pass
 
+    def notify(self, **kwargs) -> None:
+        """Update the attached properties, with one query per group of
+        properties reading the same bucket, measurement and tags."""
+        self.observers_lock.acquire()
+        try:
+            observers = []
+            if self._observers is not None:
+                observers = list(self._observers.values())
+        finally:
+            self.observers_lock.release()
+
+        for (org, bucket, measurement, _), properties in self._group_properties(
+            observers
+        ).items():
+            fields = set()
+            for property in properties:
+                if property.field is None:
+                    # Some property reads all the fields of the measurement
+                    fields = None
+                    break
+                if isinstance(property.field, list):
+                    fields.update(property.field)
+                else:
+                    fields.add(property.field)
+
+            try:
+                latest = self.query_latest(
+                    field=sorted(fields) if fields else None,
+                    measurement=measurement,
+                    bucket=bucket,
+                    org=org,
+                    tags=properties[0].tags,
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error querying the latest values of {len(properties)} "
+                    f"properties from {bucket}/{measurement}: {e}"
+                )
+                continue
+
+            self._notify_observers(properties, latest=latest)
+
+    def _group_properties(self, properties: list) -> dict:
+        groups = {}
+        for property in properties:
+            tags = property.tags or {}
+            key = (
+                property.org,
+                property.bucket,
+                property.measurement,
+                tuple(
+                    sorted(
+                        (tag, tuple(value) if isinstance(value, list) else value)
+                        for tag, value in tags.items()
+                    )
+                ),
+            )
+            groups.setdefault(key, []).append(property)
+        return groups
+
     def update_property(self):
         while not self._stop_event.is_set():
             try:
@@ -351,6 +704,9 @@ class InfluxDBConnectorBuilder(ObjectBuilder):
             token=token,
             uri=uri,
             kg_connector=kg_connector,
+            lookback=get_environment_variable(
+                "INFLUXDB_LOOKBACK", optional=True, default="-30d"
+            ),
         )
         return connector
 
@@ -4,6 +4,12 @@ import threading
 import paho.mqtt.client as mqtt
 from sindit.connectors.connector import Connector
 from sindit.connectors.connector_factory import ObjectBuilder
+from sindit.connectors.dispatch_queue import DROP_OLDEST, DispatchQueue
+from sindit.connectors.json_path import loads
+from sindit.util.environment_and_configuration import (
+    get_environment_variable,
+    get_environment_variable_int,
+)
 from sindit.util.log import logger
 from sindit.knowledge_graph.kg_connector import SINDITKGConnector
 from sindit.util.datetime_util import (
@@ -24,18 +30,31 @@ class MQTTConnector(Connector):
             Default is 60 seconds.
         username (str): The username for connecting to the MQTT broker.
         password (str): The password for connecting to the MQTT broker.
+        workers (int): Number of threads updating the properties, so that
+            the knowledge graph writes do not block the MQTT network loop.
+            With 0, the properties are updated in the network loop.
+            Default is 4.
+        queue_size (int): Number of topics waiting for the workers at which
+            new messages are dropped. Default is 10000.
+        queue_policy (str): ``drop_oldest`` or ``drop_newest``, see
+            DispatchQueue. Default is ``drop_oldest``.
 
     Attributes:
         client (mqtt.Client): The MQTT client instance.
         messages (dict): A dictionary to store subscribed messages.
         thread (threading.Thread): The thread for running the MQTT client loop.
+        dispatch_queue (DispatchQueue): The topics of the received messages,
+            waiting for the workers.
 
     Methods:
         start(): Start the MQTT client and connect to the broker.
             The connection is started in a separate thread.
         stop(): Stop the MQTT client gracefully.
         subscribe(topic=None): Subscribe to a MQTT topic.
+        get_properties_by_topic(topic): Get the properties subscribed to a
+            topic.
         get_messages(): Get the stored messages.
+        decode_message(message): Get the parsed JSON payload of a message.
 
     """
 
@@ -51,6 +70,9 @@ class MQTTConnector(Connector):
         password: str = None,
         uri: str = None,
         kg_connector: SINDITKGConnector = None,
+        workers: int = 4,
+        queue_size: int = 10000,
+        queue_policy: str = DROP_OLDEST,
     ):
         super().__init__()
 
@@ -68,6 +90,24 @@ class MQTTConnector(Connector):
         self.messages = {}  # Dict to store subscribed messages
         self.thread = None
 
+        # topic filter -> {property uri: property}, exact topics and filters
+        # with wildcards apart so that most messages need a single lookup
+        self._topic_index = {}
+        self._wildcard_index = {}
+        # property uri -> topic filter
+        self._property_topics = {}
+
+        # Messages only queue their topic, the properties read the latest
+        # message of the topic, so a slow knowledge graph coalesces updates
+        # instead of stalling the network loop
+        self.dispatch_queue = DispatchQueue(
+            self._dispatch,
+            workers=workers,
+            max_size=queue_size,
+            policy=queue_policy,
+            name=f"mqtt_{host}_{port}",
+        )
+
         self.uri = f"mqtt://{host}:{port}/"
         if uri is not None:
             self.uri = uri
@@ -81,6 +121,7 @@ class MQTTConnector(Connector):
             # set user and pwd if provided
             self.client.username_pw_set(self.__username, self.__password)
         self.client.connect(self.host, self.port, self.timeout)
+        self.dispatch_queue.start()
         self.thread = threading.Thread(target=self.client.loop_forever)
         self.thread.start()
 
@@ -90,6 +131,7 @@ class MQTTConnector(Connector):
         self.client.disconnect()
         if self.thread is not None:
             self.thread.join()
+        self.dispatch_queue.stop()
         logger.info("Connector " + self.uri + " stopped")
 
     def _on_connect(self, client, userdata, flags, rc, properties=None):
@@ -107,14 +149,14 @@ class MQTTConnector(Connector):
         # Update the knowledge graph with the new value
         self.update_connection_status(True)
 
-        # Subscribe to the topic again after reconnection
+        # Subscribe to the topics again after reconnection
         self.observers_lock.acquire()
         try:
-            if self._observers is not None:
-                for property in self._observers.values():
-                    self.subscribe(property.topic)
+            topics = list(self._topic_index) + list(self._wildcard_index)
         finally:
             self.observers_lock.release()
+        for topic in topics:
+            self.subscribe(topic)
 
     def _on_disconnect(self, client, userdata, disconnect_flags, rc, properties):
         logger.info(
@@ -145,8 +187,82 @@ class MQTTConnector(Connector):
 
         self.messages[topic] = {"timestamp": local_timestamp, "payload": payload}
 
-        # update the properties value
-        self.notify()
+        # update the value of the properties subscribed to the topic
+        if not self.dispatch_queue.put(topic):
+            logger.debug(f"Dispatch queue full, dropped a message on {topic}")
+
+    def _dispatch(self, topic: str) -> None:
+        # Decoded once here, the properties of the topic share the result
+        message = self.messages.get(topic)
+        if message is not None:
+            self.decode_message(message)
+        self.notify(topic=topic)
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics["topics"] = len(self.messages)
+        metrics["dispatch_queue"] = self.dispatch_queue.get_metrics()
+        return metrics
+
+    def attach(self, property) -> None:
+        super().attach(property)
+
+        topic = getattr(property, "topic", None)
+        if topic is None:
+            return
+        topic = str(topic)
+        self.observers_lock.acquire()
+        try:
+            if self._observers.get(property.uri) is property:
+                self._get_index(topic).setdefault(topic, {})[property.uri] = property
+                self._property_topics[property.uri] = topic
+        finally:
+            self.observers_lock.release()
+
+    def detach(self, property) -> None:
+        super().detach(property)
+
+        self.observers_lock.acquire()
+        try:
+            if property.uri in self._observers:
+                return
+            topic = self._property_topics.pop(property.uri, None)
+            if topic is not None:
+                index = self._get_index(topic)
+                properties = index.get(topic, {})
+                properties.pop(property.uri, None)
+                if not properties:
+                    index.pop(topic, None)
+        finally:
+            self.observers_lock.release()
+
+    def notify(self, topic: str = None, **kwargs) -> None:
+        """Notify the properties subscribed to the topic of a message, or
+        all the properties if no topic is given."""
+        if topic is None:
+            super().notify(**kwargs)
+            return
+        self._notify_observers(
+            self.get_properties_by_topic(topic), topic=topic, **kwargs
+        )
+
+    def get_properties_by_topic(self, topic: str) -> list:
+        """Get the properties whose topic filter matches a topic, including
+        the filters with MQTT wildcards (+ and #)."""
+        self.observers_lock.acquire()
+        try:
+            properties = list(self._topic_index.get(topic, {}).values())
+            for topic_filter, filter_properties in self._wildcard_index.items():
+                if mqtt.topic_matches_sub(topic_filter, topic):
+                    properties.extend(filter_properties.values())
+        finally:
+            self.observers_lock.release()
+        return properties
+
+    def _get_index(self, topic: str) -> dict:
+        if "+" in topic or "#" in topic:
+            return self._wildcard_index
+        return self._topic_index
 
     def subscribe(self, topic=None):
         """Subscribe to a topic."""
@@ -163,6 +279,24 @@ class MQTTConnector(Connector):
         """
         return self.messages
 
+    @staticmethod
+    def decode_message(message: dict):
+        """Get the parsed JSON payload of a message.
+
+        The payload is parsed the first time and kept in the message, under
+        "data". Payloads that are not JSON are returned as they are.
+        """
+        data = message.get("data")
+        if data is None:
+            data = message["payload"]
+            if isinstance(data, (str, bytes)):
+                try:
+                    data = loads(data)
+                except ValueError:
+                    pass
+            message["data"] = data
+        return data
+
 
 class MQTTConnectorBuilder(ObjectBuilder):
     """A class for building an MQTT connector instance."""
@@ -177,6 +311,15 @@ class MQTTConnectorBuilder(ObjectBuilder):
             password=password,
             uri=uri,
             kg_connector=kg_connector,
+            workers=get_environment_variable_int(
+                "MQTT_WORKERS", optional=True, default=4
+            ),
+            queue_size=get_environment_variable_int(
+                "MQTT_QUEUE_SIZE", optional=True, default=10000
+            ),
+            queue_policy=get_environment_variable(
+                "MQTT_QUEUE_POLICY", optional=True, default=DROP_OLDEST
+            ),
         )
         return connector
 
@@ -1,11 +1,25 @@
 # from abc import ABC, abstractmethod
+import json
+import re
+import select
 import threading
+from contextlib import contextmanager
+from datetime import datetime
+
 import psycopg2
+import psycopg2.pool
+from dateutil import parser
+from psycopg2 import sql
 from sindit.connectors.connector import Connector
 from sindit.knowledge_graph.kg_connector import SINDITKGConnector
+from sindit.util.environment_and_configuration import get_environment_variable_int
 from sindit.util.log import logger
 from sindit.connectors.connector_factory import ObjectBuilder, connector_factory
 
+# Names written as they are in the queries. Like names in hand-written SQL,
+# they are case-insensitive. Other names are quoted.
+PLAIN_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+
 
 class PostgreSQLConnector(Connector):
     """PostgreSQL connector class.
@@ -21,6 +35,24 @@ class PostgreSQLConnector(Connector):
         user (str): The username for accessing the PostgreSQL database.
         password (str, optional): The password for accessing the database.
             Defaults to None.
+        pool_size (int, optional): The maximum number of connections, so
+            that properties and API calls can query concurrently.
+            Defaults to 5.
+        pool_timeout (float, optional): Seconds to wait for a connection
+            when all of them are in use. Defaults to 10.
+        listen_channel (str, optional): Channel to LISTEN on for changes
+            (push mode), see handle_notifications(). Defaults to None, the
+            properties are then only polled every ``update_interval``.
+
+    Connections that are closed or broken are replaced by new ones: a query
+    that fails because its connection dropped is retried once on a fresh
+    connection, and the update thread checks the server with ``ping()``
+    before each update.
+
+    In push mode, a dedicated connection LISTENs on ``listen_channel``, and
+    the properties of the tables named by the notifications are updated as
+    soon as they arrive. Polling is paused while the connection listens, and
+    resumes as the fallback when it is lost.
     """
 
     id: str = "postgresql"
@@ -35,6 +67,9 @@ class PostgreSQLConnector(Connector):
         uri: str = None,
         kg_connector: SINDITKGConnector = None,
         update_interval: int = 30,  # update every 30 seconds
+        pool_size: int = 5,
+        pool_timeout: float = 10,
+        listen_channel: str = None,
     ):
         super().__init__()
 
@@ -43,7 +78,12 @@ class PostgreSQLConnector(Connector):
         self.dbname = dbname
         self.user = user
         self.password = password
-        self.connection = None
+        self.pool_size = max(1, int(pool_size))
+        self.pool_timeout = pool_timeout
+        self.pool = None
+        # getconn() fails instead of waiting when all the connections are
+        # in use, so the connections are borrowed with a slot of this
+        self._pool_slots = threading.BoundedSemaphore(self.pool_size)
 
         self.uri = f"postgresql://{host}:{port}/{dbname}"
         if uri is not None:
@@ -54,18 +94,28 @@ class PostgreSQLConnector(Connector):
         self.thread = None
         self._stop_event = threading.Event()
         self.update_interval = update_interval
+        # The catch-up of the listen thread and the polling must not update
+        # the properties at the same time, with rows of different ages
+        self._notify_lock = threading.Lock()
+
+        self.listen_channel = listen_channel
+        self.listen_thread = None
+        self._listening = False
+        self._notifications = 0
 
     def start(self, **kwargs):
-        """Instantiate a connection to the PostgreSQL server."""
+        """Instantiate a pool of connections to the PostgreSQL server."""
         try:
-            self.connection = psycopg2.connect(
+            self.pool = psycopg2.pool.ThreadedConnectionPool(
+                1,
+                self.pool_size,
                 host=self.host,
                 port=self.port,
                 dbname=self.dbname,
                 user=self.user,
                 password=self.password,
             )
-            self.connection.autocommit = True
+            self.ping()
             logger.info(f"Connector {self.uri} successfully connected to PostgreSQL")
 
             self.update_connection_status(True)
@@ -73,50 +123,425 @@ class PostgreSQLConnector(Connector):
             self.thread.daemon = True
             self._stop_event.clear()
             self.thread.start()
+
+            if self.listen_channel:
+                self.listen_thread = threading.Thread(target=self._listen, daemon=True)
+                self.listen_thread.start()
         except Exception as e:
             logger.error(f"Failed to connect to PostgreSQL: {e}")
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
             self.update_connection_status(False)
 
     def stop(self, **kwargs):
         """Disconnect from the PostgreSQL server."""
-        if self.connection:
-            self.connection.close()
-        self.update_connection_status(False)
+        self._stop_event.set()
+        for thread in (self.thread, self.listen_thread):
+            if thread is not None:
+                thread.join()
+        self.thread = None
+        self.listen_thread = None
 
-        if self.thread is not None:
-            self._stop_event.set()
-            self.thread.join()
-            self.thread = None
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+        self.update_connection_status(False)
 
         logger.info(f"Connector {self.uri} disconnected from PostgreSQL")
 
-    def query(self, query_str):
+    @contextmanager
+    def get_connection(self):
+        """Borrow a connection of the pool, in autocommit mode.
+
+        Wait up to ``pool_timeout`` seconds if all the connections are in
+        use, then raise psycopg2.pool.PoolError. A connection that is
+        closed, or that breaks while it is borrowed, is discarded instead of
+        being returned to the pool.
+        """
+        pool = self.pool
+        if pool is None:
+            raise ConnectionError("PostgreSQL connection is not active.")
+
+        if not self._pool_slots.acquire(timeout=self.pool_timeout):
+            raise psycopg2.pool.PoolError(
+                f"All the {self.pool_size} connections to {self.uri} are in use"
+            )
+        try:
+            connection = pool.getconn()
+            if connection.closed:
+                pool.putconn(connection, close=True)
+                connection = pool.getconn()
+            broken = False
+            try:
+                if not connection.autocommit:
+                    connection.autocommit = True
+                yield connection
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+                raise
+            finally:
+                pool.putconn(connection, close=broken or bool(connection.closed))
+        finally:
+            self._pool_slots.release()
+
+    def _execute(self, query_str, params, fetch):
+        # A connection dropped by the server is only noticed when it is
+        # used, the query is then retried once on a new connection
+        for attempt in range(2):
+            try:
+                with self.get_connection() as connection:
+                    with connection.cursor() as cursor:
+                        cursor.execute(query_str, params)
+                        return fetch(cursor)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                if attempt == 1:
+                    raise
+                logger.warning(f"Connector {self.uri} reconnecting to PostgreSQL: {e}")
+
+    def query(self, query_str, params=None):
         """Execute an SQL query on the PostgreSQL database.
 
         Args:
             query_str (str): The SQL query to execute.
+            params (tuple | dict, optional): The parameters of the query.
 
         Returns:
             list: Query result as a list of rows.
 
         """
-        if not self.connection:
-            raise ConnectionError("PostgreSQL connection is not active.")
+        return self._execute(query_str, params, lambda cursor: cursor.fetchall())
 
-        cursor = self.connection.cursor()
-        cursor.execute(query_str)
-        result = cursor.fetchall()
-        cursor.close()
-        return result
+    def query_one(self, query_str, params=None):
+        """Execute an SQL query and get only its first row.
 
-    def update_property(self):
+        Returns:
+            tuple: The first row, None if there is none.
+        """
+        return self._execute(query_str, params, lambda cursor: cursor.fetchone())
+
+    def iter_query(self, query_str, params=None, batch_size: int = 1000):
+        """Execute an SQL query with a server-side cursor, for large results.
+
+        The rows are fetched ``batch_size`` at a time as they are iterated,
+        the connection is held until the iteration ends.
+
+        Yields:
+            tuple: The rows of the result.
+        """
+        with self.get_connection() as connection:
+            # Named cursors only live in a transaction
+            connection.autocommit = False
+            try:
+                with connection.cursor(name=f"sindit_{id(self)}") as cursor:
+                    cursor.itersize = batch_size
+                    cursor.execute(query_str, params)
+                    yield from cursor
+            finally:
+                if not connection.closed:
+                    connection.rollback()
+
+    def query_latest_row(
+        self,
+        table: str,
+        columns: list,
+        conditions: dict = None,
+        order_by: str = None,
+    ) -> dict | None:
+        """Read one row of a table with a single parameterized query.
+
+        Args:
+            table (str): The table to read, optionally qualified by its
+                schema. Table and column names made of letters, digits,
+                underscores and dots are written as is, so they are
+                case-insensitive. Other names are quoted as identifiers, so
+                they are case-sensitive.
+            columns (list): The columns to read, by name (``*`` and
+                expressions are not supported).
+            conditions (dict, optional): Values that the columns of the row
+                must be equal to, by column.
+            order_by (str, optional): The timestamp column of the table. The
+                latest row is read if given, any matching row otherwise.
+
+        Returns:
+            dict: The values of the row by column (including ``order_by``),
+            None if no row matches.
+        """
+        columns = list(dict.fromkeys(columns))
+        if order_by is not None and order_by not in columns:
+            columns.append(order_by)
+
+        # The names come from the knowledge graph, those that are not plain
+        # names are quoted as identifiers rather than written into the query
+        query = sql.SQL("SELECT {} FROM {}").format(
+            sql.SQL(", ").join(_identifier(column) for column in columns),
+            _identifier(table),
+        )
+        params = None
+        if conditions:
+            query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(
+                sql.SQL("{}=%s").format(_identifier(key)) for key in conditions
+            )
+            # Passed as strings, like quoted values in the query
+            params = tuple(str(value) for value in conditions.values())
+        if order_by is not None:
+            query += sql.SQL(" ORDER BY {} DESC").format(_identifier(order_by))
+        query += sql.SQL(" LIMIT 1")
+
+        row = self.query_one(query, params)
+        if row is None:
+            return None
+        return dict(zip(columns, row))
+
+    def notify(self, changes: dict = None, **kwargs) -> None:
+        """Update the attached properties, with one query per group of
+        properties reading the same table, conditions and order.
+
+        Args:
+            changes (dict, optional): The changed rows by table name, a row
+                being None if only the table is known. Only the properties
+                of these tables are updated, without query if a changed row
+                has their columns. With ``order_by``, a changed row older
+                than the current one of the properties is ignored, and the
+                latest row is queried if the properties have none yet. All
+                the properties are updated if None.
+        """
+        with self._notify_lock:
+            self._notify_groups(changes)
+
+    def _notify_groups(self, changes: dict = None) -> None:
+        self.observers_lock.acquire()
+        try:
+            observers = []
+            if self._observers is not None:
+                observers = list(self._observers.values())
+        finally:
+            self.observers_lock.release()
+
+        groups = {}
+        for property in observers:
+            conditions = tuple(
+                (key, str(value)) for key, value in (property.conditions or {}).items()
+            )
+            key = (property.table, tuple(sorted(conditions)), property.order_by)
+            groups.setdefault(key, []).append(property)
+
+        for (table, conditions, order_by), properties in groups.items():
+            columns = [field for property in properties for field in property.fields]
+
+            row = None
+            if changes is not None:
+                rows = changes.get(_table_name(table))
+                if rows is None:
+                    continue
+                row = _changed_row(rows, columns, conditions)
+                if row is False:
+                    # None of the changed rows match the conditions
+                    continue
+                if row is not None and order_by is not None:
+                    newer = _is_newer_row(row, order_by, properties)
+                    if newer is False:
+                        # An older row changed, the latest row is the same
+                        continue
+                    if newer is None:
+                        row = None
+
+            if row is None:
+                try:
+                    row = self.query_latest_row(
+                        table, columns, properties[0].conditions, order_by
+                    )
+                except Exception as e:
+                    logger.error(
+                        f"Error reading {len(properties)} properties "
+                        f"from {table}: {e}"
+                    )
+                    continue
+
+            if row is None:
+                logger.debug(
+                    f"No data found in {table} for {len(properties)} properties"
+                )
+                continue
+            self._notify_observers(properties, row=row)
+
+    def handle_notifications(self, payloads: list) -> None:
+        """Update the properties affected by NOTIFY payloads.
+
+        A payload is either a JSON object ``{"table": ..., "row": {...}}``,
+        where ``row`` is optional (e.g. ``row_to_json(NEW)`` in a trigger), or
+        the name of the changed table. An empty payload updates all the
+        properties.
+        """
+        changes = {}
+        for payload in payloads:
+            table, row = None, None
+            try:
+                message = json.loads(payload) if payload else None
+            except ValueError:
+                message = payload
+            if isinstance(message, dict):
+                table, row = message.get("table"), message.get("row")
+            elif isinstance(message, str):
+                table = message
+
+            if not table:
+                self.notify()
+                return
+            changes.setdefault(_table_name(table), []).append(
+                row if isinstance(row, dict) else None
+            )
+        if changes:
+            self.notify(changes=changes)
+
+    def _listen(self):
         while not self._stop_event.is_set():
+            connection = None
             try:
-                logger.debug(f"PostgreSQL node {self.uri} updating property")
+                connection = psycopg2.connect(
+                    host=self.host,
+                    port=self.port,
+                    dbname=self.dbname,
+                    user=self.user,
+                    password=self.password,
+                )
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        sql.SQL("LISTEN {}").format(sql.Identifier(self.listen_channel))
+                    )
+                self._listening = True
+                logger.info(
+                    f"Connector {self.uri} listening on channel {self.listen_channel}"
+                )
+                # Catch up with the changes made while not listening
                 self.notify()
+
+                while not self._stop_event.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    payloads = []
+                    while connection.notifies:
+                        payloads.append(connection.notifies.pop(0).payload)
+                    if payloads:
+                        self._notifications += len(payloads)
+                        self.handle_notifications(payloads)
+            except Exception as e:
+                logger.error(
+                    f"Connector {self.uri} stopped listening on "
+                    f"{self.listen_channel}, polling instead: {e}"
+                )
+            finally:
+                self._listening = False
+                if connection is not None:
+                    connection.close()
+            self._stop_event.wait(self.update_interval)
+
+    def ping(self) -> bool:
+        """Check that the server answers, raise an exception otherwise."""
+        self.query_one("SELECT 1")
+        return True
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics["pool_size"] = self.pool_size
+        metrics["listening"] = self._listening
+        metrics["notifications"] = self._notifications
+        return metrics
+
+    def update_property(self):
+        while not self._stop_event.is_set():
+            try:
+                self.ping()
+                if not self.is_connected:
+                    logger.info(f"Connector {self.uri} reconnected to PostgreSQL")
+                    self.update_connection_status(True)
+                # While listening, the properties are updated by the
+                # notifications instead
+                if not self._listening:
+                    logger.debug(f"PostgreSQL node {self.uri} updating property")
+                    self.notify()
+            except psycopg2.pool.PoolError as e:
+                # The server is fine, the connections are all busy
+                logger.warning(f"Connector {self.uri} skipped an update: {e}")
+            except psycopg2.Error as e:
+                logger.error(f"Connector {self.uri} lost PostgreSQL: {e}")
+                if self.is_connected:
+                    self.update_connection_status(False)
             except Exception as e:
                 logger.error(f"Error updating property: {e}")
-            threading.Event().wait(self.update_interval)
+            self._stop_event.wait(self.update_interval)
+
+
+def _identifier(name: str) -> sql.Composable:
+    # A name may be qualified, e.g. public.sensors
+    if PLAIN_NAME_PATTERN.match(str(name)):
+        return sql.SQL(str(name))
+    return sql.Identifier(*(part.strip('"') for part in str(name).split(".")))
+
+
+def _table_name(table: str) -> str:
+    # Notifications usually carry TG_TABLE_NAME, without schema
+    return str(table).split(".")[-1].strip('"').lower()
+
+
+def row_timestamp(row: dict, column: str) -> datetime | None:
+    """Get the timestamp in a column of a row, None if it is not one. Rows
+    sent by notifications are JSON, their timestamps are ISO strings."""
+    timestamp = row.get(column)
+    if isinstance(timestamp, str):
+        try:
+            timestamp = parser.isoparse(timestamp)
+        except ValueError:
+            return None
+    return timestamp if isinstance(timestamp, datetime) else None
+
+
+def _is_newer_row(row: dict, order_by: str, properties: list):
+    """Whether a changed row is at least as recent as the rows of the
+    properties, None if it cannot be told."""
+    timestamp = row_timestamp(row, order_by)
+    latest = [property.timestamp for property in properties]
+    if timestamp is None or None in latest:
+        return None
+    try:
+        return timestamp >= max(latest)
+    except TypeError:
+        # Naive and aware timestamps
+        return None
+
+
+def _condition_matches(value, condition: str) -> bool:
+    """Whether a value of a JSON row is equal to a condition, which is a
+    string. JSON booleans and numbers are compared as PostgreSQL compares
+    them, e.g. ``true`` or ``1.0`` match the conditions "true" or "1"."""
+    if isinstance(value, bool):
+        return str(value).lower() == condition.strip().lower()
+    if isinstance(value, (int, float)):
+        try:
+            return float(value) == float(condition)
+        except ValueError:
+            return False
+    return str(value) == condition
+
+
+def _changed_row(rows: list, columns: list, conditions: tuple):
+    """Get the changed row to use for a group of properties: the last row
+    matching the conditions, None if the group must be queried, False if no
+    row matches."""
+    matched = False
+    for row in rows:
+        if row is None:
+            return None
+        if not all(key in row for key, _ in conditions):
+            # The row cannot be matched, the database is asked instead
+            return None
+        if all(_condition_matches(row[key], value) for key, value in conditions):
+            if not all(column in row for column in columns):
+                return None
+            matched = row
+    return matched
 
 
 class PostgreSQLConnectorBuilder(ObjectBuilder):
@@ -124,9 +549,11 @@ class PostgreSQLConnectorBuilder(ObjectBuilder):
         self, host, port, username, password, uri, kg_connector, configuration, **kwargs
     ):
         dbname = None
+        listen_channel = None
         if configuration is not None:
             if "dbname" in configuration:
                 dbname = configuration.get("dbname")
+            listen_channel = configuration.get("listen_channel")
         if dbname is None:
             raise ValueError("PostgreSQL database name is required.")
 
@@ -138,6 +565,10 @@ class PostgreSQLConnectorBuilder(ObjectBuilder):
             password=password,
             uri=uri,
             kg_connector=kg_connector,
+            pool_size=get_environment_variable_int(
+                "POSTGRESQL_POOL_SIZE", optional=True, default=5
+            ),
+            listen_channel=listen_channel,
         )
         return connector
 
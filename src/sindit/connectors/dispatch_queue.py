@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sindit.util.log import logger
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+QUEUE_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+
+class DispatchQueue:
+    """Bounded queue of keys handled by a pool of worker threads.
+
+    Connectors put the key of what changed (e.g. the topic of an MQTT
+    message) and return immediately; the workers call ``handler(key)``.
+    Keys are coalesced: a key that is already waiting is not queued again,
+    and a key that is being handled is queued once more after the handler
+    returns, so the handler of a key never runs twice at the same time and
+    always sees the latest data.
+
+    Args:
+        handler (callable): Called with each key, from the worker threads.
+        workers (int): Number of worker threads. With 0 workers, put() calls
+            the handler in the calling thread. Default is 4.
+        max_size (int): Number of waiting keys at which the queue is full.
+            Default is 10000.
+        policy (str): What to do with a new key when the queue is full:
+            ``drop_oldest`` (default) drops the key that waited the longest,
+            ``drop_newest`` drops the new key.
+        name (str): Prefix of the names of the worker threads.
+    """
+
+    def __init__(
+        self,
+        handler,
+        workers: int = 4,
+        max_size: int = 10000,
+        policy: str = DROP_OLDEST,
+        name: str = "dispatch",
+    ):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy {policy}")
+        self.handler = handler
+        self.workers = int(workers)
+        self.max_size = int(max_size)
+        self.policy = policy
+        self.name = name
+
+        # key -> monotonic time at which it was queued
+        self._pending = OrderedDict()
+        # keys being handled, and the ones queued again meanwhile
+        self._running = set()
+        self._rerun = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self.threads = []
+
+        self._metrics = {
+            "received": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "handled": 0,
+            "failed": 0,
+            "max_depth_seen": 0,
+            "max_lag_seen": 0.0,
+            "last_lag": 0.0,
+        }
+
+    def start(self):
+        """Start the worker threads."""
+        with self._condition:
+            if self.threads:
+                return
+            self._stopping = False
+            self.threads = [
+                threading.Thread(target=self._run, name=f"{self.name}_{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop the worker threads. Keys still waiting are discarded."""
+        with self._condition:
+            self._stopping = True
+            threads = self.threads
+            self.threads = []
+            self._condition.notify_all()
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        with self._condition:
+            self._pending.clear()
+            self._rerun.clear()
+
+    def is_running(self) -> bool:
+        return bool(self.threads)
+
+    def put(self, key) -> bool:
+        """Queue a key. Returns False if it was dropped because the queue is
+        full."""
+        if not self.is_running():
+            with self._condition:
+                self._metrics["received"] += 1
+            self._handle(key, 0.0)
+            return True
+
+        now = time.monotonic()
+        with self._condition:
+            self._metrics["received"] += 1
+            if key in self._pending or key in self._rerun:
+                self._metrics["coalesced"] += 1
+                return True
+            if key in self._running:
+                self._rerun[key] = now
+                return True
+
+            if len(self._pending) >= self.max_size:
+                self._metrics["dropped"] += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._pending.popitem(last=False)
+
+            self._pending[key] = now
+            depth = len(self._pending) + len(self._rerun)
+            if depth > self._metrics["max_depth_seen"]:
+                self._metrics["max_depth_seen"] = depth
+            self._condition.notify()
+        return True
+
+    def get_metrics(self) -> dict:
+        """Get the counters of the queue, together with its current depth and
+        the age in seconds of the oldest waiting key."""
+        with self._condition:
+            metrics = dict(self._metrics)
+            metrics["workers"] = len(self.threads)
+            metrics["depth"] = len(self._pending) + len(self._rerun)
+            metrics["running"] = len(self._running)
+            since = [next(iter(self._pending.values()))] if self._pending else []
+            since.extend(self._rerun.values())
+            metrics["lag"] = time.monotonic() - min(since) if since else 0.0
+        return metrics
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                key, since = self._pending.popitem(last=False)
+                self._running.add(key)
+
+            try:
+                self._handle(key, time.monotonic() - since)
+            finally:
+                with self._condition:
+                    self._running.discard(key)
+                    since = self._rerun.pop(key, None)
+                    if since is not None and not self._stopping:
+                        self._pending[key] = since
+                        self._condition.notify()
+
+    def _handle(self, key, lag: float):
+        try:
+            self.handler(key)
+            failed = False
+        except Exception as e:
+            logger.error(f"Error handling {key} in {self.name}: {e}")
+            failed = True
+
+        with self._condition:
+            self._metrics["handled"] += 1
+            if failed:
+                self._metrics["failed"] += 1
+            self._metrics["last_lag"] = lag
+            if lag > self._metrics["max_lag_seen"]:
+                self._metrics["max_lag_seen"] = lag
@@ -0,0 +1,112 @@
+import json
+import re
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:  # optional, see the "speedups" extra
+    orjson = None
+
+# A step of a dotted or bracketed path: .name, name, [0], ["name"] or ['name']
+STEP_PATTERN = re.compile(
+    r"""\[\s*(?P<index>-?\d+)\s*\]"""
+    r"""|\[\s*(?P<quote>['"])(?P<key>.*?)(?P=quote)\s*\]"""
+    r"""|(?P<dot>\.?)(?P<name>[^.\[\]\s()'"*+/=<>!,%]+)"""
+)
+
+
+def loads(data):
+    """Parse a JSON document from bytes or str, with orjson if installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JSONPath:
+    """A path to a value in a parsed JSON document, compiled once.
+
+    Supported expressions:
+
+    - slash-separated keys: ``sensors/0/temperature``
+    - JSONPath-like: ``$.sensors[0].temperature``, ``$['a key']``
+    - dotted keys: ``sensors[0].temperature``
+    - Python subscriptions of ``data``: ``data["sensors"][0]["temperature"]``
+
+    A number selects an item of a list, or the key with that name of an
+    object. A key of the document equal to the whole expression is always
+    selected first, like ``temperature`` or ``a.b`` for ``{"a.b": 1}``.
+
+    Use compile_path() to create a path.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        # (key, index) pairs, index is None for keys that are not numbers
+        self.steps = tuple(_parse_steps(expression))
+
+    def __call__(self, data):
+        """Get the value at the path, None if it does not exist."""
+        if isinstance(data, dict) and self.expression in data:
+            return data[self.expression]
+
+        value = data
+        for key, index in self.steps:
+            if isinstance(value, dict):
+                if key not in value:
+                    return None
+                value = value[key]
+            elif isinstance(value, list) and index is not None:
+                if not -len(value) <= index < len(value):
+                    return None
+                value = value[index]
+            else:
+                return None
+        return value
+
+    def __repr__(self):
+        return f"JSONPath({self.expression!r})"
+
+
+@lru_cache(maxsize=1024)
+def compile_path(expression: str) -> JSONPath:
+    """Compile a path expression, see JSONPath. Raise ValueError if the
+    expression is not a supported path."""
+    return JSONPath(str(expression))
+
+
+def _parse_steps(path: str):
+    expression = path.strip()
+    if "/" in expression:
+        for key in expression.split("/"):
+            yield _step(key)
+        return
+
+    if expression.startswith("$"):
+        expression = expression[1:]
+    elif expression.startswith("data") and expression[4:5] in ("[", "."):
+        expression = expression[4:]
+
+    position = 0
+    while position < len(expression):
+        match = STEP_PATTERN.match(expression, position)
+        if match is None or (
+            # Names are separated by dots
+            match.group("name") is not None
+            and position > 0
+            and not match.group("dot")
+        ):
+            raise ValueError(f"Unsupported path expression: {path}")
+        if match.group("index") is not None:
+            yield _step(match.group("index"))
+        elif match.group("quote") is not None:
+            yield match.group("key"), None
+        else:
+            yield _step(match.group("name"))
+        position = match.end()
+
+
+def _step(key: str) -> tuple:
+    try:
+        return key, int(key)
+    except ValueError:
+        return key, None
@@ -35,29 +35,34 @@ class InfluxDBProperty(Property):
         self.field = field
         self.tags = tags
 
-    def update_value(self, connector: Connector, **kwargs) -> None:
+    def update_value(self, connector: Connector, latest: dict = None, **kwargs) -> None:
         """
         Receive update from connector
+
+        Args:
+            latest (dict, optional): The latest (time, value) of the fields
+                queried by the connector for a group of properties, see
+                InfluxDBConnector.notify. Queried for this property alone
+                if None.
         """
         if self.connector is not None:
             influxdb_connector: InfluxDBConnector = connector
-            df = influxdb_connector.query_field(
-                field=self.field,
-                measurement=self.measurement,
-                org=self.org,
-                bucket=self.bucket,
-                tags=self.tags,
-                latest=True,
-                start=0,
-                stop="now()",
-            )
-            if df is None or df.empty:
+            if latest is None:
+                latest = influxdb_connector.query_latest(
+                    field=self.field,
+                    measurement=self.measurement,
+                    org=self.org,
+                    bucket=self.bucket,
+                    tags=self.tags,
+                )
+
+            selected = self._select_latest(latest)
+            if selected is None:
                 logger.debug(f"No data found for property {self.uri}")
             else:
-                if "_time" in df.columns:
-                    self.timestamp = df["_time"].iloc[0]
-                    self.timestamp = self.timestamp.to_pydatetime()
-                else:
+                timestamp, value = selected
+                self.timestamp = timestamp
+                if self.timestamp is None:
                     self.timestamp = get_current_local_time()
 
                 try:
@@ -71,18 +76,7 @@ class InfluxDBProperty(Property):
                     self.timestamp = get_current_local_time()
                     logger.error(f"Error converting timestamp to datetime: {e}")
 
-                self.value = None
-                if self.field is not None:
-                    if isinstance(self.field, list):
-                        # set value to a dictionary of field values
-                        self.value = {}
-                        for field in self.field:
-                            self.value[field] = df[field].values[0]
-
-                    elif isinstance(self.field, str):
-                        self.value = df[self.field].values[0]
-                elif "_value" in df.columns:
-                    self.value = df["_value"].values[0]
+                self.value = value
 
                 # Update the knowledge graph with the new value
                 """ node = None
@@ -120,6 +114,29 @@ class InfluxDBProperty(Property):
                 ) """
                 self.update_property_value_to_kg(self.uri, self.value, self.timestamp)
 
+    def _select_latest(self, latest: dict) -> tuple | None:
+        """Get the (timestamp, value) of the property from the latest values
+        of the fields, None if there is no value for its field(s)."""
+        if self.field is None:
+            # The latest value of any field of the measurement
+            records = list(latest.values())
+        elif isinstance(self.field, list):
+            records = [latest[field] for field in self.field if field in latest]
+        else:
+            records = [latest[self.field]] if self.field in latest else []
+        if not records:
+            return None
+
+        timed = [record for record in records if record[0] is not None]
+        if isinstance(self.field, list):
+            # set value to a dictionary of field values
+            timestamp = max(time for time, _ in timed) if timed else None
+            fields = [field for field in self.field if field in latest]
+            return timestamp, {field: latest[field][1] for field in fields}
+        if timed:
+            return max(timed, key=lambda record: record[0])
+        return records[0]
+
     def attach(self, connector: Connector) -> None:
         """
         Attach a property to the connector.
@@ -1,6 +1,8 @@
-import json
+import threading
+
 from sindit.connectors.connector import Connector, Property
 from sindit.connectors.connector_mqtt import MQTTConnector
+from sindit.connectors.json_path import compile_path, loads
 from sindit.knowledge_graph.graph_model import StreamingProperty
 
 from sindit.util.log import logger
@@ -16,9 +18,18 @@ class MQTTProperty(Property):
         self.topic = str(topic)
         self.uri = str(uri)
         self.path_or_code = str(path_or_code)
+        # Compiled once, shared by the properties with the same path
+        try:
+            self.path = compile_path(self.path_or_code)
+        except ValueError as e:
+            logger.error(f"Property {self.uri} cannot read its values: {e}")
+            self.path = None
         self.timestamp = None
         self.value = None
         self.kg_connector = kg_connector
+        # A wildcard topic is matched by messages of several topics, which
+        # may be dispatched to different workers at the same time
+        self._update_lock = threading.Lock()
 
     def attach(self, connector: Connector) -> None:
         # self.connector = connector
@@ -26,13 +37,21 @@ class MQTTProperty(Property):
         connector.subscribe(str(self.topic))
         # logger.debug(f"Attaching property {self.uri} to connector {connector.uri}")
 
-    def update_value(self, connector: Connector, **kwargs) -> None:
+    def update_value(self, connector: Connector, topic: str = None, **kwargs) -> None:
         mqtt_connector: MQTTConnector = connector
         messages = mqtt_connector.get_messages()
-        if self.topic in messages:
-            timestamp = messages[self.topic]["timestamp"]
-            value = messages[self.topic]["payload"]
-            if self.timestamp != timestamp:
+        # The topic of the message, which may differ from a wildcard self.topic
+        if topic is None:
+            topic = self.topic
+        if topic not in messages:
+            return
+        with self._update_lock:
+            message = messages[topic]
+            timestamp = message["timestamp"]
+            value = message["payload"]
+            # A message older than the current value, e.g. of another topic
+            # matching the same wildcard, is ignored
+            if self.timestamp is None or timestamp > self.timestamp:
                 self.timestamp = timestamp
                 # self.value = value
                 # logger.debug(f"Property {self.uri} updated with value {self.value}")
@@ -41,7 +60,7 @@ class MQTTProperty(Property):
                     self.value = value
                 else:
                     extracted_value = self._extract_value_from_json(
-                        value, self.path_or_code
+                        mqtt_connector.decode_message(message)
                     )
                     if extracted_value is not None:
                         self.value = extracted_value
@@ -84,34 +103,18 @@ class MQTTProperty(Property):
                             self.uri, self.value, self.timestamp
                         )
 
-    def _extract_value_from_json(self, json_data, path_or_code):
+    def _extract_value_from_json(self, json_data, path_or_code=None):
+        """Get the value at the path of the property in a JSON payload, None
+        if the payload is not JSON or the value does not exist."""
+        path = self.path if path_or_code is None else compile_path(path_or_code)
+        if path is None:
+            return None
         try:
-            if isinstance(json_data, str):
-                json_data = json.loads(json_data)
-            # Check if the input is a JSON path (slash-separated string)
-            if isinstance(path_or_code, str) and "/" in path_or_code:
-                keys = path_or_code.split("/")
-                value = json_data
-                for key in keys:
-                    if key in value:
-                        value = value[key]
-                    else:
-                        return None
-                return value
-            elif path_or_code in json_data:
-                return json_data[path_or_code]
-            # Otherwise, assume it's a Python code string
-            elif isinstance(path_or_code, str):
-                # Evaluate the path code within the context
-                value = eval(path_or_code, {}, {"data": json_data})
-                return value
-
-            else:
-                return None
-
-        except (KeyError, IndexError, TypeError, NameError):
-            # Return None or handle error if path is invalid
+            if isinstance(json_data, (str, bytes)):
+                json_data = loads(json_data)
+        except ValueError:
             return None
+        return path(json_data)
 
 
 class MQTTPropertyBuilder(ObjectBuilder):
@@ -4,7 +4,7 @@ from datetime import datetime
 from sindit.knowledge_graph.kg_connector import SINDITKGConnector
 from sindit.knowledge_graph.graph_model import DatabaseProperty
 from sindit.util.log import logger
-from sindit.connectors.connector_postgresql import PostgreSQLConnector
+from sindit.connectors.connector_postgresql import PostgreSQLConnector, row_timestamp
 from sindit.connectors.connector_factory import ObjectBuilder, property_factory
 
 
@@ -15,59 +15,55 @@ class PostgreSQLProperty(Property):
         table: str = None,
         field: str = None,
         conditions: dict = None,
+        order_by: str = None,
         kg_connector: SINDITKGConnector = None,
     ):
         self.uri = str(uri)
         self.table = table
         self.field = field
         self.conditions = conditions
+        # Column of the timestamps of the rows: the latest row is read
+        self.order_by = order_by
         self.kg_connector = kg_connector
         self.timestamp = None
         self.value = None
 
-    def update_value(self, connector: Connector, **kwargs) -> None:
+    @property
+    def fields(self) -> list:
+        """The columns read by the property."""
+        return list(self.field) if isinstance(self.field, list) else [self.field]
+
+    def update_value(self, connector: Connector, row: dict = None, **kwargs) -> None:
         """
         Receive update from the PostgreSQL connector
         and query the database for the property value.
+
+        Args:
+            row (dict, optional): The row read by the connector for a group
+                of properties, by column, see PostgreSQLConnector.notify.
+                Queried for this property alone if None.
         """
         if self.connector is not None:
             postgresql_connector: PostgreSQLConnector = connector
 
-            # Build query based on table, field, and conditions
-            if isinstance(self.field, list):
-                fields_str = ", ".join(self.field)  # Join fields for multiple selection
-            else:
-                fields_str = self.field  # Single field
-
-            query = f"SELECT {fields_str} FROM {self.table}"
-
-            # Adding conditions to the query if they exist
-            if self.conditions:
-                condition_str = " AND ".join(
-                    [f"{k}='{v}'" for k, v in self.conditions.items()]
+            if row is None:
+                row = postgresql_connector.query_latest_row(
+                    self.table, self.fields, self.conditions, self.order_by
                 )
-                query += f" WHERE {condition_str}"
-
-            # query += " ORDER BY id DESC LIMIT 1;"
-            # Assuming 'id' or primary key exists to get the latest entry
-
-            # Execute the query
-            result = postgresql_connector.query(query)
 
-            if result:
-                result_row = result[0]  # Fetch the first row of the result
+            if row is not None:
                 self.timestamp = datetime.now()
+                if self.order_by is not None:
+                    self.timestamp = row_timestamp(row, self.order_by) or self.timestamp
 
                 # Check if the field is a list or a single value
                 if isinstance(self.field, list):
                     # Create a dictionary with field names
                     # as keys and their respective values
-                    self.value = {
-                        self.field[i]: result_row[i] for i in range(len(self.field))
-                    }
+                    self.value = {field: row[field] for field in self.field}
                 else:
                     # Single field case, just return the scalar value
-                    self.value = result_row[0]
+                    self.value = row[self.field]
 
                 # Log and update value in the knowledge graph
                 logger.debug(
@@ -97,6 +93,7 @@ class PostgreSQLPropertyBuilder(ObjectBuilder):
             table = None
             field = None
             conditions = None
+            order_by = None
             property_identifiers = node.propertyIdentifiers
             if "table" in property_identifiers:
                 table = property_identifiers["table"]
@@ -104,6 +101,8 @@ class PostgreSQLPropertyBuilder(ObjectBuilder):
                 field = property_identifiers["field"]
             if "conditions" in property_identifiers:
                 conditions = property_identifiers["conditions"]
+            if "order_by" in property_identifiers:
+                order_by = property_identifiers["order_by"]
 
             if table is None or field is None:
                 logger.error(
@@ -117,6 +116,7 @@ class PostgreSQLPropertyBuilder(ObjectBuilder):
                 table=table,
                 field=field,
                 conditions=conditions,
+                order_by=order_by,
                 kg_connector=kg_connector,
             )
 
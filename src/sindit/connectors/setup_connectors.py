@@ -404,15 +404,13 @@ def _start_connector_async(connector: Connector, node: Connection):
 
 
 def _iter_nodes_by_class(class_uri: str, batch_size: int = 50):
-    """Yield all nodes of a class by paging with skip/limit."""
-    skip = 0
+    """Yield all nodes of a class by paging with a cursor."""
+    cursor = None
     seen = set()
     while True:
         batch = sindit_kg_connector.load_nodes_by_class(
-            class_uri, skip=skip, limit=batch_size
+            class_uri, limit=batch_size, cursor=cursor
         )
-        if not batch:
-            break
 
         for node in batch:
             node_uri = str(getattr(node, "uri", ""))
@@ -420,10 +418,9 @@ def _iter_nodes_by_class(class_uri: str, batch_size: int = 50):
                 seen.add(node_uri)
                 yield node
 
-        got = len(batch)
-        if got < batch_size:
+        cursor = batch.next_cursor
+        if cursor is None:
             break
-        skip += got
 
 
 def initialize_connections_and_properties(
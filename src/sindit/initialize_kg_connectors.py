@@ -1,3 +1,5 @@
+import atexit
+
 from sindit.common.semantic_knowledge_graph.GraphDBPersistenceService import (
     GraphDBPersistenceService,
 )
@@ -5,8 +7,13 @@ from sindit.common.semantic_knowledge_graph.SemanticKGPersistenceService import
     SemanticKGPersistenceService,
 )
 from sindit.knowledge_graph.kg_connector import SINDITKGConnector
+from sindit.knowledge_graph.node_cache import NodeCache
+from sindit.knowledge_graph.property_value_writer import PropertyValueWriter
 from sindit.util.environment_and_configuration import (
     get_environment_variable,
+    get_environment_variable_bool,
+    get_environment_variable_float,
+    get_environment_variable_int,
 )
 from sindit.util.log import logger
 
@@ -18,6 +25,51 @@ kg_service: SemanticKGPersistenceService = GraphDBPersistenceService(
     get_environment_variable("GRPAPHDB_REPOSITORY"),
     get_environment_variable("GRAPHDB_USERNAME"),
     get_environment_variable("GRAPHDB_PASSWORD"),
+    pool_size=get_environment_variable_int(
+        "GRAPHDB_POOL_SIZE", optional=True, default=10
+    ),
+    max_concurrent_requests=get_environment_variable_int(
+        "GRAPHDB_MAX_CONCURRENT_REQUESTS", optional=True, default=10
+    ),
+    connect_timeout=get_environment_variable_float(
+        "GRAPHDB_CONNECT_TIMEOUT", optional=True, default=5
+    ),
+    read_timeout=get_environment_variable_float(
+        "GRAPHDB_READ_TIMEOUT", optional=True, default=300
+    ),
 )
 
-sindit_kg_connector = SINDITKGConnector(kg_service)
+# In-process cache of the nodes loaded by uri
+node_cache: NodeCache = None
+if get_environment_variable_bool("KG_NODE_CACHE", optional=True, default="True"):
+    node_cache = NodeCache(
+        max_size=get_environment_variable_int(
+            "KG_NODE_CACHE_SIZE", optional=True, default=1024
+        ),
+        ttl=get_environment_variable_float(
+            "KG_NODE_CACHE_TTL", optional=True, default=30.0
+        ),
+    )
+
+sindit_kg_connector = SINDITKGConnector(kg_service, node_cache=node_cache)
+
+# Write-behind queue for property values coming from the connectors
+property_value_writer: PropertyValueWriter = None
+if get_environment_variable_bool("KG_WRITE_BEHIND", optional=True, default="True"):
+    property_value_writer = PropertyValueWriter(
+        sindit_kg_connector,
+        flush_interval=get_environment_variable_float(
+            "KG_WRITE_BEHIND_FLUSH_INTERVAL", optional=True, default=1.0
+        ),
+        batch_size=get_environment_variable_int(
+            "KG_WRITE_BEHIND_BATCH_SIZE", optional=True, default=500
+        ),
+        max_pending=get_environment_variable_int(
+            "KG_WRITE_BEHIND_MAX_PENDING", optional=True, default=10000
+        ),
+    )
+    property_value_writer.start()
+    sindit_kg_connector.set_property_value_writer(property_value_writer)
+
+    # Flush the remaining values synchronously on shutdown
+    atexit.register(property_value_writer.stop)
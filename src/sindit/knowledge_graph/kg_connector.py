@@ -1,10 +1,16 @@
-from io import StringIO
-
-import pandas as pd
-from sindit.common.semantic_knowledge_graph.rdf_model import MapTo, RDFModel
+import json
+import time
+from contextvars import ContextVar
+
+from sindit.common.semantic_knowledge_graph.rdf_model import (
+    MapTo,
+    RDFModel,
+    to_ntriples,
+)
 from sindit.common.semantic_knowledge_graph.SemanticKGPersistenceService import (
     SemanticKGPersistenceService,
 )
+from sindit.common.semantic_knowledge_graph.sparql_result import SPARQLResult
 from sindit.knowledge_graph.graph_model import (
     GRAPH_MODEL,
     KG_NS,
@@ -12,48 +18,228 @@ from sindit.knowledge_graph.graph_model import (
 )
 from sindit.knowledge_graph.relationship_model import RelationshipURIClassMapping
 from sindit.knowledge_graph.dataspace_model import DataspaceURIClassMapping
+from sindit.knowledge_graph.node_cache import NodeCache
+from sindit.knowledge_graph.query_registry import (
+    cursor_filter,
+    encode_cursor,
+    Query,
+    escape_string,
+    iri,
+    iris,
+    query_registry,
+)
 from rdflib import RDF, XSD, Graph, URIRef
 from rdflib.term import _is_valid_uri
 
 # from initialize_connectors import update_connection_node, update_propery_node
 
 
-load_node_query_file = "knowledge_graph/queries/load_node.sparql"
-load_nodes_query_file = "knowledge_graph/queries/load_nodes.sparql"
-delete_node_query_file = "knowledge_graph/queries/delete_node.sparql"
-delete_nodes_query_file = "knowledge_graph/queries/delete_nodes.sparql"
-insert_data_query_file = "knowledge_graph/queries/insert_data.sparql"
-insert_delete_query_file = "knowledge_graph/queries/insert_delete.sparql"
-insert_delete_data_query_file = "knowledge_graph/queries/insert_delete_data.sparql"
-get_uris_by_class_uri_query_file = (
-    "knowledge_graph/queries/get_uris_by_class_uri.sparql"
-)
-get_uris_by_classes_query_file = "knowledge_graph/queries/get_uris_by_classes.sparql"
-get_class_uri_by_uri_query_file = "knowledge_graph/queries/get_class_uri_by_uri.sparql"
-list_named_graphs_query_file = "knowledge_graph/queries/list_named_graphs.sparql"
-search_unit_query_file = "knowledge_graph/queries/find_unit.sparql"
-get_all_units_query_file = "knowledge_graph/queries/get_all_units.sparql"
-search_unit_by_uri_query_file = "knowledge_graph/queries/find_unit_by_uri.sparql"
-get_all_relationship_types_query_file = (
-    "knowledge_graph/queries/get_all_relationship_types.sparql"
-)
+def _unique_uris(node_uris) -> list[str]:
+    """Normalize the uris to strings and deduplicate them, preserving order."""
+    seen = set()
+    roots: list[str] = []
+    for u in node_uris:
+        su = str(u)
+        if su not in seen:
+            seen.add(su)
+            roots.append(su)
+    return roots
+
+
+def _read_node_uris(query_result: str) -> list[str]:
+    """Read the ?node column of a SELECT query result."""
+    return SPARQLResult(query_result).column("node")
+
+
+class NodePage(list):
+    """A page of nodes, remembering the cursor of the next page.
+
+    ``next_cursor`` is None on the last page. Pass it as ``cursor`` to get
+    the next page: the nodes are paged by uri (keyset pagination), which
+    does not get slower on deep pages as OFFSET does.
+    """
+
+    def __init__(self, nodes=(), next_cursor: str = None):
+        super().__init__(nodes)
+        self.next_cursor = next_cursor
+
+
+def _node_page(nodes, node_uris: list, limit: int) -> NodePage:
+    # The cursor is taken from the selected uris rather than from the
+    # nodes, as nodes that cannot be loaded are left out
+    next_cursor = None
+    if len(node_uris) > 0 and len(node_uris) >= int(limit):
+        next_cursor = encode_cursor(node_uris[-1])
+    return NodePage(nodes, next_cursor)
+
+
+def _read_node_types(query_result: str) -> list[dict]:
+    """Read the (?s, ?d) rows of a SELECT query result as
+    {"uri": ..., "description": ...} dicts."""
+    return [
+        {"uri": uri, "description": description}
+        for uri, description in SPARQLResult(query_result)
+    ]
+
+
+def _read_units(query_result: str) -> list[dict]:
+    """Read the rows of a unit query result as dicts without the unbound
+    values, the ?unit variable being renamed to uri."""
+    units = []
+    for row in SPARQLResult(query_result).dicts(drop_none=True):
+        if "unit" in row:
+            row["uri"] = row.pop("unit")
+        units.append(row)
+    return units
+
+
+def _get_node_classes(triples: list, subjects) -> dict:
+    """Get the class of each subject of the serialized triples."""
+    classes = {}
+    for s, p, o in triples:
+        if p == RDF.type:
+            classes.setdefault(s, o)
+
+    node_classes = {}
+    for s in subjects:
+        node_class_uri = classes.get(s)
+        if node_class_uri is None:
+            raise Exception(f"Node {s} has no class")
+        node_classes[s] = node_class_uri
+    return node_classes
+
+
+def _read_node_classes(query_result: str) -> dict:
+    """Read the (?node, ?class) rows of a SELECT query result into a map
+    from node uri to class uri, keeping the first class of each node."""
+    node_classes = {}
+    for row in SPARQLResult(query_result).dicts():
+        node_classes.setdefault(row["node"], row["class"])
+    return node_classes
+
+
+def _check_node_classes(node_classes: dict, stored_classes: dict):
+    """Raise if one of the nodes (node uri -> class uri) is stored in the
+    graph with another class (see _read_node_classes)."""
+    for node_uri, node_class_uri in node_classes.items():
+        class_uri = stored_classes.get(str(node_uri))
+        if class_uri is not None and class_uri != str(node_class_uri):
+            raise Exception(
+                f"Node {node_uri} has a different class {node_class_uri} "
+                f"than the one in the graph {class_uri}"
+            )
 
-get_relationships_by_node_query_file = (
-    "knowledge_graph/queries/get_relationships_by_node.sparql"
-)
 
-get_node_types_query_file = "knowledge_graph/queries/get_node_types.sparql"
+def _node_error(index: int, node: RDFModel, error: Exception) -> dict:
+    return {"index": index, "uri": str(node.uri), "error": str(error)}
+
+
+def _offset_errors(errors: list, offset: int) -> list:
+    for error in errors:
+        error["index"] += offset
+    return errors
+
+
+def _prepare_nodes(nodes: list[RDFModel]):
+    """Serialize the nodes to save. Returns the batch of
+    (index, node, triples, node classes) and the errors of the nodes that
+    cannot be serialized."""
+    batch = []
+    errors = []
+    for index, node in enumerate(nodes):
+        try:
+            triples = node.triples()
+            subjects = set([s for s, _, _ in triples])
+            batch.append((index, node, triples, _get_node_classes(triples, subjects)))
+        except Exception as e:
+            errors.append(_node_error(index, node, e))
+    return batch, errors
+
+
+def _batch_subjects(batch: list) -> set:
+    subjects = set()
+    for _, _, _, node_classes in batch:
+        subjects.update(node_classes.keys())
+    return subjects
+
+
+def _check_batch_classes(batch: list, class_query_result: str):
+    """Split the batch into the nodes whose subjects have the same class as
+    in the graph and the errors of the others."""
+    stored_classes = _read_node_classes(class_query_result)
+    valid = []
+    errors = []
+    for entry in batch:
+        index, node, _, node_classes = entry
+        try:
+            _check_node_classes(node_classes, stored_classes)
+            valid.append(entry)
+        except Exception as e:
+            errors.append(_node_error(index, node, e))
+    return valid, errors
+
+
+def _merge_batch(batch: list):
+    triples = {}
+    subjects = set()
+    for _, _, node_triples, node_classes in batch:
+        triples.update(dict.fromkeys(node_triples))
+        subjects.update(node_classes.keys())
+    return list(triples), subjects
+
+
+def _convert_property_value(value, data_type: str):
+    # Convert the value the same way as when the whole node is saved
+    if isinstance(value, dict):
+        return {
+            key: RDFModel.reverse_to_type(item, data_type)
+            for key, item in value.items()
+        }
+    return RDFModel.reverse_to_type(value, data_type)
+
 
-advanced_search_query_file = "knowledge_graph/queries/advanced_search_node.sparql"
+def stored_property_value(value, data_type: str = None):
+    """Get a property value as it is read back from the knowledge graph once
+    written by update_property_value: converted to ``data_type``, dicts and
+    lists being stored as JSON (see RDFModel.to_rdf_term)."""
+    if value is None:
+        return None
+    if data_type is not None and not isinstance(value, list):
+        value = _convert_property_value(value, str(data_type))
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return value
 
 
 class SINDITKGConnector:
-    def __init__(self, kg_service: SemanticKGPersistenceService):
+    def __init__(
+        self, kg_service: SemanticKGPersistenceService, node_cache: NodeCache = None
+    ):
         self.__kg_service = kg_service
         self.__graph_uri = KG_NS.DefaultGraph
+        # Graph of the current request. Set along with __graph_uri, which is
+        # only used where no graph was set in the context (e.g. the
+        # connector threads), so that concurrent requests of users in
+        # different workspaces do not query each other's graph.
+        self.__context_graph_uri = ContextVar(
+            f"sindit_graph_uri_{id(self)}", default=None
+        )
+        self.__node_cache = node_cache
+        self.__property_value_writer = None
+        # (graph_uri, property_uri) -> propertyDataType, see update_property_value
+        self.__property_data_types = {}
 
     def get_graph_uri(self):
-        return str(self.__graph_uri)
+        graph_uri = self.__context_graph_uri.get()
+        if graph_uri is None:
+            graph_uri = self.__graph_uri
+        return str(graph_uri)
+
+    def _graph(self, graph_uri: str = None) -> URIRef:
+        """The named graph to query, the current one by default."""
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+        return URIRef(graph_uri)
 
     def set_graph_uri(self, uri: str):
         try:
@@ -63,84 +249,85 @@ class SINDITKGConnector:
             if not _is_valid_uri(uri):
                 raise Exception(f"Invalid uri: {uri}")
             self.__graph_uri = URIRef(uri)
+            self.__context_graph_uri.set(self.__graph_uri)
             return str(self.__graph_uri)
         except Exception as e:
             raise Exception(f"Failed to set the graph uri. Reason: {e}")
 
-    def get_graph_uris(self):
-        with open(list_named_graphs_query_file, "r") as f:
-            try:
-                query = f.read()
-                query_result = self.__kg_service.graph_query(query, "text/csv")
-                df = pd.read_csv(StringIO(query_result), sep=",")
-                return df["g"].to_list()
-            except Exception as e:
-                raise Exception(f"Failed to get the graph uris. Reason: {e}")
+    def get_node_cache(self) -> NodeCache:
+        return self.__node_cache
 
-    def search_unit(self, search_term: str):
-        with open(search_unit_query_file, "r") as f:
-            try:
-                query_template = f.read()
-                query = query_template.replace("[search_term]", search_term)
-                query_result = self.__kg_service.graph_query(query, "text/csv")
-                df = pd.read_csv(StringIO(query_result), sep=",")
+    def get_property_value_writer(self):
+        return self.__property_value_writer
 
-                if not df.empty:
-                    # rename the columns unit to uri
-                    df.rename(columns={"unit": "uri"}, inplace=True)
-                    # convert the dataframe to a list of dictionaries, ignore nan values
-                    # replace nan with None
-                    df_dict = df.apply(lambda x: x.dropna().to_dict(), axis=1).tolist()
+    def set_property_value_writer(self, writer):
+        """Route property value updates from the connectors through a
+        write-behind queue (see PropertyValueWriter). Pass None to write
+        every value synchronously."""
+        self.__property_value_writer = writer
 
-                    return df_dict
-
-                return []
-
-            except Exception as e:
-                raise Exception(f"Failed to search for the unit. Reason: {e}")
+    def _graph_query(self, query: str, accept_content: str):
+        start = time.perf_counter()
+        try:
+            return self.__kg_service.graph_query(query, accept_content)
+        finally:
+            query_registry.record(query, time.perf_counter() - start)
 
-    def get_unit_by_uri(self, uri: str):
-        with open(search_unit_by_uri_query_file, "r") as f:
-            try:
-                query_template = f.read()
-                query = query_template.replace("[unit_uri]", uri)
-                query_result = self.__kg_service.graph_query(query, "text/csv")
-                df = pd.read_csv(StringIO(query_result), sep=",")
+    def _graph_update(self, update: str):
+        start = time.perf_counter()
+        try:
+            return self.__kg_service.graph_update(update)
+        finally:
+            query_registry.record(update, time.perf_counter() - start)
 
-                if not df.empty:
-                    # rename the columns unit to uri
-                    df.rename(columns={"unit": "uri"}, inplace=True)
-                    # convert the dataframe to a list of dictionaries, ignore nan values
-                    # replace nan with None
-                    df_dict = df.apply(lambda x: x.dropna().to_dict(), axis=1).tolist()
+    async def _graph_query_async(self, query: str, accept_content: str):
+        start = time.perf_counter()
+        try:
+            return await self.__kg_service.graph_query_async(query, accept_content)
+        finally:
+            query_registry.record(query, time.perf_counter() - start)
 
-                    return df_dict
+    async def _graph_update_async(self, update: str):
+        start = time.perf_counter()
+        try:
+            return await self.__kg_service.graph_update_async(update)
+        finally:
+            query_registry.record(update, time.perf_counter() - start)
 
-                return []
+    def get_graph_uris(self):
+        try:
+            query = query_registry.render("list_named_graphs")
+            query_result = self._graph_query(query, "text/csv")
+            return SPARQLResult(query_result).column("g")
+        except Exception as e:
+            raise Exception(f"Failed to get the graph uris. Reason: {e}")
 
-            except Exception as e:
-                raise Exception(f"Failed to search for the unit. Reason: {e}")
+    def search_unit(self, search_term: str):
+        try:
+            query = query_registry.render("find_unit", search_term=search_term)
+            query_result = self._graph_query(query, "text/csv")
+            return _read_units(query_result)
 
-    def get_all_units(self):
-        with open(get_all_units_query_file, "r") as f:
-            try:
-                query = f.read()
-                query_result = self.__kg_service.graph_query(query, "text/csv")
-                df = pd.read_csv(StringIO(query_result), sep=",")
+        except Exception as e:
+            raise Exception(f"Failed to search for the unit. Reason: {e}")
 
-                if not df.empty:
-                    # rename the columns unit to uri
-                    df.rename(columns={"unit": "uri"}, inplace=True)
-                    # convert the dataframe to a list of dictionaries, ignore nan values
-                    # replace nan with None
-                    df_dict = df.apply(lambda x: x.dropna().to_dict(), axis=1).tolist()
+    def get_unit_by_uri(self, uri: str):
+        try:
+            query = query_registry.render("find_unit_by_uri", unit_uri=uri)
+            query_result = self._graph_query(query, "text/csv")
+            return _read_units(query_result)
 
-                    return df_dict
+        except Exception as e:
+            raise Exception(f"Failed to search for the unit. Reason: {e}")
 
-                return []
+    def get_all_units(self):
+        try:
+            query = query_registry.render("get_all_units")
+            query_result = self._graph_query(query, "text/csv")
+            return _read_units(query_result)
 
-            except Exception as e:
-                raise Exception(f"Failed to get all units. Reason {e}")
+        except Exception as e:
+            raise Exception(f"Failed to get all units. Reason {e}")
 
     def get_all_data_types(self):
         list_data_types = []
@@ -159,8 +346,20 @@ class SINDITKGConnector:
         node_class=None,
         depth: int = 1,
     ) -> RDFModel:
+        cache = self.__node_cache
+        if cache is None or node_class is not None:
+            ret = self._load_node_optimized(node_uri, node_class, depth)
+            return ret[node_uri]
+
+        key = (self.get_graph_uri(), node_uri, depth)
+        node = cache.get(key)
+        if node is not None:
+            return node
+
+        generation = cache.generation()
         ret = self._load_node_optimized(node_uri, node_class, depth)
         node = ret[node_uri]
+        cache.put(key, node, ret.keys(), generation=generation)
 
         # print(f"node uri: {node_uri}, depth: {depth}")
         # print(node)
@@ -176,6 +375,22 @@ class SINDITKGConnector:
     ) -> RDFModel:
         """Optimized version that fetches up to `depth` levels in a single
         query using nested OPTIONAL blocks."""
+        query = self._build_load_node_query(node_uri, depth)
+
+        # Execute single query to get all data
+        query_result = self._graph_query(query, "application/x-trig")
+
+        return self._deserialize_node(
+            query_result,
+            node_uri,
+            node_class,
+            created_individuals=created_individuals,
+            uri_class_mapping=uri_class_mapping,
+        )
+
+    def _build_load_node_query(
+        self, node_uri: str, depth: int = 1, graph_uri: str = None
+    ) -> str:
         if depth < 1:
             depth = 1
 
@@ -186,7 +401,7 @@ class SINDITKGConnector:
 
         # Build WHERE with properly nested OPTIONALs
         where_lines = [
-            f"BIND(<{node_uri}> AS ?s0) .",
+            f"BIND({iri(node_uri)} AS ?s0) .",
             "?s0 ?p0 ?o0 .",
         ]
         open_blocks = 0
@@ -202,14 +417,22 @@ class SINDITKGConnector:
             {' '.join(construct_triples)}
         }}
         WHERE {{
-            GRAPH <{self.__graph_uri}> {{
+            GRAPH <{self._graph(graph_uri)}> {{
                 {' '.join(where_lines)}
             }}
         }}
         """
+        # Not a template, but timed like the templates
+        return Query(query, "load_node_optimized")
 
-        # Execute single query to get all data
-        query_result = self.__kg_service.graph_query(query, "application/x-trig")
+    def _deserialize_node(
+        self,
+        query_result: str,
+        node_uri: str,
+        node_class=None,
+        created_individuals: dict = {},
+        uri_class_mapping: dict = NodeURIClassMapping,
+    ) -> dict:
         full_graph = Graph()
         full_graph.parse(data=query_result, format="trig")
 
@@ -231,14 +454,6 @@ class SINDITKGConnector:
         created_individuals: dict = {},
         uri_class_mapping: dict = NodeURIClassMapping,
     ) -> RDFModel:
-        # read the sparql query from the file
-        with open(load_node_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
-
         loop = depth
         full_graph = Graph()
 
@@ -252,10 +467,12 @@ class SINDITKGConnector:
                 if current_node_uri in visited:
                     continue
                 visited.add(current_node_uri)
-                query = query_template.replace("[node_uri]", str(current_node_uri))
-                query_result = self.__kg_service.graph_query(
-                    query, "application/x-trig"
+                query = query_registry.render(
+                    "load_node",
+                    graph_uri=self._graph(),
+                    node_uri=current_node_uri,
                 )
+                query_result = self._graph_query(query, "application/x-trig")
                 g = Graph()
                 g.parse(data=query_result, format="trig")
                 if len(g) > 0 and loop > 0:
@@ -305,19 +522,26 @@ class SINDITKGConnector:
         if not node_uris:
             return []
 
+        query = self._build_load_nodes_query(node_uris, depth)
+
+        # Execute single query
+        query_result = self._graph_query(query, "application/x-trig")
+
+        return self._deserialize_nodes(
+            query_result,
+            node_uris,
+            created_individuals=created_individuals,
+            uri_class_mapping=uri_class_mapping,
+        )
+
+    def _build_load_nodes_query(
+        self, node_uris: list[str], depth: int = 1, graph_uri: str = None
+    ) -> str:
         if depth < 1:
             depth = 1
 
-        # Normalize and deduplicate while preserving order
-        seen = set()
-        roots: list[str] = []
-        for u in node_uris:
-            su = str(u)
-            if su not in seen:
-                seen.add(su)
-                roots.append(su)
-
-        values_str = " ".join(f"<{u}>" for u in roots)
+        roots = _unique_uris(node_uris)
+        values_str = iris(roots)
 
         # CONSTRUCT triples
         construct_triples = ["?r ?p0 ?o0 ."]
@@ -341,14 +565,20 @@ class SINDITKGConnector:
             {' '.join(construct_triples)}
         }}
         WHERE {{
-            GRAPH <{self.__graph_uri}> {{
+            GRAPH <{self._graph(graph_uri)}> {{
                 {' '.join(where_lines)}
             }}
         }}
         """
+        return Query(query, "load_nodes_optimized")
 
-        # Execute single query
-        query_result = self.__kg_service.graph_query(query, "application/x-trig")
+    def _deserialize_nodes(
+        self,
+        query_result: str,
+        node_uris: list[str],
+        created_individuals: dict = {},
+        uri_class_mapping: dict = NodeURIClassMapping,
+    ) -> list[RDFModel]:
         full_graph = Graph()
         full_graph.parse(data=query_result, format="trig")
 
@@ -361,7 +591,7 @@ class SINDITKGConnector:
 
         # Return models for requested roots, preserving order and skipping missing
         models: list[RDFModel] = []
-        for u in roots:
+        for u in _unique_uris(node_uris):
             m = ret_map.get(u)
             if m is not None:
                 models.append(m)
@@ -374,39 +604,19 @@ class SINDITKGConnector:
         uri_class_mapping: dict = NodeURIClassMapping,
         skip: int = 0,
         limit: int = 10,
-    ) -> list:
-        with open(get_uris_by_class_uri_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
+        cursor: str = None,
+    ) -> NodePage:
+        """Load a page of the nodes of a class (subclasses included), ordered
+        by uri. Pass the ``next_cursor`` of the returned page as ``cursor``
+        to get the next page."""
+        query = self._build_nodes_by_class_query(class_uri, skip, limit, cursor)
+        query_result = self._graph_query(query, "text/csv")
+        node_uris = _read_node_uris(query_result)
+        # check if there is no result
+        if not node_uris:
+            return NodePage()
 
-        query = (
-            query_template.replace("[class_uri]", class_uri)
-            .replace("[offset]", str(skip))
-            .replace("[limit]", str(limit))
-        )
-        query_result = self.__kg_service.graph_query(query, "text/csv")
-        df = pd.read_csv(StringIO(query_result), sep=",")
         created_individuals = {}
-        nodes = []
-        """ for uri in df["node"]:
-            ret = self._load_node(
-                uri,
-                None,
-                depth,
-                created_individuals=created_individuals,
-                uri_class_mapping=uri_class_mapping,
-            )
-            created_individuals.update(ret)
-            node = ret[uri]
-            nodes.append(node) """
-        # check if df is empty
-        if df.empty:
-            return []
-
-        node_uris = df["node"].tolist()
         nodes = self._load_nodes_optimized(
             node_uris,
             None,
@@ -415,7 +625,24 @@ class SINDITKGConnector:
             uri_class_mapping=uri_class_mapping,
         )
 
-        return nodes
+        return _node_page(nodes, node_uris, limit)
+
+    def _build_nodes_by_class_query(
+        self,
+        class_uri: str,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        graph_uri: str = None,
+    ) -> str:
+        return query_registry.render(
+            "get_uris_by_class_uri",
+            graph_uri=self._graph(graph_uri),
+            class_uri=class_uri,
+            cursor_filter=cursor_filter(cursor),
+            offset=int(skip),
+            limit=int(limit),
+        )
 
     def find_node_by_attribute(
         self,
@@ -428,7 +655,46 @@ class SINDITKGConnector:
         depth: int = 1,
         skip: int = 0,
         limit: int = 10,
-    ) -> list:
+        cursor: str = None,
+    ) -> NodePage:
+        query = self._build_find_node_by_attribute_query(
+            type_uri,
+            attribute_uri,
+            attribute_value,
+            is_value_uri=is_value_uri,
+            filtering_condition=filtering_condition,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+        )
+        query_result = self._graph_query(query, "text/csv")
+        node_uris = _read_node_uris(query_result)
+        # check if there is no result
+        if not node_uris:
+            return NodePage()
+
+        created_individuals = {}
+        nodes = self._load_nodes_optimized(
+            node_uris,
+            None,
+            depth=depth,
+            created_individuals=created_individuals,
+            uri_class_mapping=uri_class_mapping,
+        )
+        return _node_page(nodes, node_uris, limit)
+
+    def _build_find_node_by_attribute_query(
+        self,
+        type_uri: str,
+        attribute_uri: str,
+        attribute_value: str,
+        is_value_uri: bool = False,
+        filtering_condition: str = None,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        graph_uri: str = None,
+    ) -> str:
         # check if either atribute_value or filtering_condition is provided
         # but not both
         if attribute_value is None and filtering_condition is None:
@@ -441,40 +707,31 @@ class SINDITKGConnector:
                 )
             )
 
-        with open(advanced_search_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
         if type_uri is not None:
-            query_template = query_template.replace(
-                "[FILTER_BY_TYPE]", "?node rdf:type ?nodeType ."
-            ).replace(
-                "[TYPE_HIERARCHY_FILTER]",
+            filter_by_type = "?node rdf:type ?nodeType ."
+            type_hierarchy_filter = (
                 f"?nodeType "
                 f"(<urn:samm:org.eclipse.esmf.samm:meta-model:2.1.0#extends>)* "
-                f"<{type_uri}> .",
+                f"{iri(type_uri)} ."
             )
         else:
-            query_template = query_template.replace("[FILTER_BY_TYPE]", "").replace(
-                "[TYPE_HIERARCHY_FILTER]", ""
-            )
+            filter_by_type = ""
+            type_hierarchy_filter = ""
 
         if attribute_uri is not None:
             if "label" in attribute_uri:
                 new_attribute = f"rdfs:{attribute_uri}"
             else:
-                new_attribute = f"<{GRAPH_MODEL}{attribute_uri}>"
+                new_attribute = iri(f"{GRAPH_MODEL}{attribute_uri}")
         else:
             new_attribute = "?attribute"
 
         if attribute_value is not None:
             attribute_value = attribute_value.strip()
             if is_value_uri:
-                new_value = f"<{attribute_value}>"
+                new_value = iri(attribute_value)
             else:
-                new_value = f'"{attribute_value}"'
+                new_value = f'"{escape_string(attribute_value)}"'
                 # try not to put quotes around the value
                 # if attribute_value is a number, do not put quotes
                 # if attribute_value is a date, do not put quotes
@@ -487,82 +744,44 @@ class SINDITKGConnector:
                 elif attribute_value.replace(".", "", 1).isdigit():
                     new_value = attribute_value
 
-            query_template = query_template.replace(
-                "[FILTER_BY_ATTRIBUTE]", f"?node {new_attribute} {new_value} ."
-            )
+            filter_by_attribute = f"?node {new_attribute} {new_value} ."
         else:
-            query_template = query_template.replace(
-                "[FILTER_BY_ATTRIBUTE]",
-                f"?node {new_attribute} ?value . FILTER({filtering_condition})",
+            filter_by_attribute = (
+                f"?node {new_attribute} ?value . FILTER({filtering_condition})"
             )
 
-        query_template = query_template.replace("[offset]", str(skip)).replace(
-            "[limit]", str(limit)
+        return query_registry.render(
+            "advanced_search_node",
+            graph_uri=self._graph(graph_uri),
+            FILTER_BY_TYPE=filter_by_type,
+            TYPE_HIERARCHY_FILTER=type_hierarchy_filter,
+            FILTER_BY_ATTRIBUTE=filter_by_attribute,
+            cursor_filter=cursor_filter(cursor),
+            offset=int(skip),
+            limit=int(limit),
         )
 
-        query_result = self.__kg_service.graph_query(query_template, "text/csv")
-        df = pd.read_csv(StringIO(query_result), sep=",")
-        created_individuals = {}
-        nodes = []
-        """ for uri in df["node"]:
-            ret = self._load_node(
-                uri,
-                None,
-                1,
-                created_individuals=created_individuals,
-                uri_class_mapping=uri_class_mapping,
-            )
-            created_individuals.update(ret)
-            node = ret[uri]
-            nodes.append(node) """
-        # check if df is empty
-        if df.empty:
-            return []
-
-        node_uris = df["node"].tolist()
-        nodes = self._load_nodes_optimized(
-            node_uris,
-            None,
-            depth=depth,
-            created_individuals=created_individuals,
-            uri_class_mapping=uri_class_mapping,
-        )
-        return nodes
-
     def load_all_nodes(
         self,
         uri_class_mapping: dict = NodeURIClassMapping,
         depth: int = 1,
         skip: int = 0,
         limit: int = 10,
-    ) -> list:
+        cursor: str = None,
+    ) -> NodePage:
         """
         Page across nodes from all classes in
-        uri_class_mapping using a single SELECT with OFFSET/LIMIT,
-        then hydrate them in one batch with _load_nodes_optimized.
+        uri_class_mapping using a single SELECT with a cursor (or OFFSET)
+        and LIMIT, then hydrate them in one batch with _load_nodes_optimized.
         """
-        # Build class VALUES list
-        class_uris = " ".join(f"<{uri}>" for uri in uri_class_mapping.keys())
-
-        # Read and fill the multi-class query
-        with open(get_uris_by_classes_query_file, "r") as f:
-            query_template = f.read()
-
-        query = (
-            query_template.replace("[graph_uri]", str(self.__graph_uri))
-            .replace("[class_uris]", class_uris)
-            .replace("[offset]", str(skip))
-            .replace("[limit]", str(limit))
-        )
+        query = self._build_all_nodes_query(uri_class_mapping, skip, limit, cursor)
 
         # Execute and read URIs
-        query_result = self.__kg_service.graph_query(query, "text/csv")
-        df = pd.read_csv(StringIO(query_result), sep=",")
-
-        if df.empty:
-            return []
+        query_result = self._graph_query(query, "text/csv")
+        node_uris = _read_node_uris(query_result)
 
-        node_uris = df["node"].tolist()
+        if not node_uris:
+            return NodePage()
 
         # Hydrate in a single roundtrip
         created_individuals = {}
@@ -574,27 +793,51 @@ class SINDITKGConnector:
             uri_class_mapping=uri_class_mapping,
         )
 
-        return nodes
+        return _node_page(nodes, node_uris, limit)
+
+    def _build_all_nodes_query(
+        self,
+        uri_class_mapping: dict = NodeURIClassMapping,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        graph_uri: str = None,
+    ) -> str:
+        # Build class VALUES list
+        return query_registry.render(
+            "get_uris_by_classes",
+            graph_uri=self._graph(graph_uri),
+            class_uris=list(uri_class_mapping.keys()),
+            cursor_filter=cursor_filter(cursor),
+            offset=int(skip),
+            limit=int(limit),
+        )
 
     def delete_node(self, node_uri: str) -> bool:
         """Delete a node from the knowledge graph."""
-        with open(delete_node_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
-
-        query = query_template.replace("[node_uri]", node_uri)
-        query_result = self.__kg_service.graph_update(query)
+        query = self._build_delete_node_query(node_uri)
+        query_result = self._graph_update(query)
 
         if not query_result.ok:
             raise Exception(
                 "Failed to delete the node. Reason: " + query_result.content
             )
 
+        self._after_delete_node(node_uri)
+
         return query_result.ok
 
+    def _build_delete_node_query(self, node_uri: str, graph_uri: str = None) -> str:
+        return query_registry.render(
+            "delete_node", graph_uri=self._graph(graph_uri), node_uri=node_uri
+        )
+
+    def _after_delete_node(self, node_uri: str, graph_uri: str = None):
+        self._invalidate_property_data_types([node_uri], graph_uri)
+        # Triples of other nodes referencing this node are deleted as well
+        if self.__node_cache is not None:
+            self.__node_cache.invalidate_graph(str(self._graph(graph_uri)))
+
     def update_node(
         self,
         node_dict: dict,  # to accept any types of node
@@ -619,7 +862,45 @@ class SINDITKGConnector:
         """
         if "uri" not in node_dict:
             raise Exception("Node uri is required")
+        node_uri = node_dict["uri"]
 
+        # Resolve the node class via SPARQL. We need it to map property keys
+        # to RDF predicates and to validate non-None values via Pydantic.
+        query = self._build_get_class_query(node_uri)
+        query_result = self._graph_query(query, "text/csv")
+        node_update = self._prepare_node_update(
+            node_dict, query_result, uri_class_mapping
+        )
+
+        # Load the old data for the subject so we can compute the diff.
+        query = self._build_load_subjects_query(node_update["subjects"])
+        query_result_old = self._graph_query(query, "application/x-trig")
+
+        try:
+            query = self._build_update_node_query(
+                node_update, query_result_old, overwrite
+            )
+            query_result = self._graph_update(query)
+
+            if not query_result.ok:
+                raise Exception(f"{query_result.content}")
+
+        except Exception as e:
+            # self._restore_graph(g_old)
+            raise Exception(f"Failed to update the node. Reason: {e}")
+
+        self._after_update_node(node_update)
+
+        return query_result.ok
+
+    def _prepare_node_update(
+        self,
+        node_dict: dict,
+        class_query_result: str,
+        uri_class_mapping: dict = NodeURIClassMapping,
+    ) -> dict:
+        """Resolve the class of the node and build the graph to insert,
+        restricted to the keys of ``node_dict``. See update_node."""
         # Work on a shallow copy so we don't mutate the caller's dict
         node_dict = dict(node_dict)
         node_dict.pop("class_uri", None)
@@ -631,24 +912,13 @@ class SINDITKGConnector:
 
         subjects = {URIRef(node_uri)}
 
-        # Resolve the node class via SPARQL. We need it to map property keys
-        # to RDF predicates and to validate non-None values via Pydantic.
-        with open(get_class_uri_by_uri_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
-
-        query = query_template.replace("[node_uri]", node_uri)
-        query_result = self.__kg_service.graph_query(query, "text/csv")
-        df = pd.read_csv(StringIO(query_result), sep=",")
-        if len(df) == 0:
+        class_uris = SPARQLResult(class_query_result).column("class")
+        if len(class_uris) == 0:
             raise Exception(
                 f"Cannnot find the class of the node {node_uri}. "
                 "Try to save the node first if it is a new node."
             )
-        class_uri = df["class"][0]
+        class_uri = class_uris[0]
         node_class = uri_class_mapping.get(URIRef(class_uri))
         if node_class is None:
             raise Exception(
@@ -677,113 +947,81 @@ class SINDITKGConnector:
         }
         try:
             node = node_class(**non_none_input)
-            g_full = node.g()
+            triples_full = node.triples()
         except Exception as e:
             raise Exception(f"Failed to update the node {node_uri}. Reason: {e}")
 
-        # Restrict the insert graph to only the touched predicates' triples.
-        # ``rdf:type`` always emitted by ``node.g()`` is intentionally left
-        # out of inserts here: PATCH should not change the type of the node.
+        # Restrict the insert triples to only the touched predicates' triples.
+        # ``rdf:type`` always emitted by ``node.triples()`` is intentionally
+        # left out of inserts here: PATCH should not change the type of the
+        # node.
         s = URIRef(node_uri)
-        g = Graph()
-        for _, predicate in touched_predicates:
-            for triple in g_full.triples((s, predicate, None)):
-                g.add(triple)
+        predicates = set(predicate for _, predicate in touched_predicates)
+        triples = [
+            (triple_s, triple_p, triple_o)
+            for triple_s, triple_p, triple_o in triples_full
             # Nested RDFModel inserts also emit triples with the nested
             # subject != s. Carry those over so referenced child nodes
             # appear in the insert side too.
-            for nested_s, nested_p, nested_o in g_full:
-                if nested_s != s:
-                    g.add((nested_s, nested_p, nested_o))
+            if (triple_s == s and triple_p in predicates)
+            or (triple_s != s and len(predicates) > 0)
+        ]
 
-        subjects_str = " ".join([f"<{str(sub)}>" for sub in subjects])
+        return {
+            "node_dict": node_dict,
+            "subject": s,
+            "subjects": subjects,
+            "touched_predicates": touched_predicates,
+            "triples": triples,
+        }
+
+    def _build_update_node_query(
+        self,
+        node_update: dict,
+        query_result_old: str,
+        overwrite: bool = True,
+        graph_uri: str = None,
+    ) -> str:
+        node_dict = node_update["node_dict"]
+        s = node_update["subject"]
+        triples = node_update["triples"]
 
-        # Load the old data for the subject so we can compute the diff.
-        with open(load_nodes_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
-        query = query_template.replace("[nodes_uri]", subjects_str)
-        query_result_old = self.__kg_service.graph_query(query, "application/x-trig")
         g_old = Graph()
         g_old.parse(data=query_result_old, format="trig")
 
         # Build the delete set strictly from the touched predicates so
         # untouched predicates remain in the graph.
-        g_remove = Graph()
-        for key, predicate in touched_predicates:
+        # Used as an ordered set
+        triples_remove = {}
+        for key, predicate in node_update["touched_predicates"]:
             value = node_dict.get(key)
-            if value is None:
-                # Caller explicitly requested clearing this predicate.
-                for triple in g_old.triples((s, predicate, None)):
-                    g_remove.add(triple)
-                continue
-            if overwrite:
-                # Replace mode: drop all existing triples for this predicate.
-                for triple in g_old.triples((s, predicate, None)):
-                    g_remove.add(triple)
+            if value is None or overwrite:
+                # Caller explicitly requested clearing this predicate, or
+                # replace mode: drop all existing triples for this predicate.
+                triples_remove.update(
+                    dict.fromkeys(g_old.triples((s, predicate, None)))
+                )
             else:
                 # Append mode: only deduplicate exact (s, p, o) matches that
-                # the new graph would have re-added.
-                for new_s, new_p, new_o in g.triples((s, predicate, None)):
-                    for triple in g_old.triples((new_s, new_p, new_o)):
-                        g_remove.add(triple)
-
-        try:
-            with open(insert_delete_data_query_file, "r") as f:
-                query_template = f.read()
-                if "[graph_uri]" in query_template:
-                    query_template = query_template.replace(
-                        "[graph_uri]", str(self.__graph_uri)
-                    )
-
-            # For delete the old data
-            query_template = query_template.replace("[nodes_uri]", subjects_str)
-
-            graph_data = str(g.serialize(format="longturtle"))
-            graph_remove_data = str(g_remove.serialize(format="longturtle"))
-            # extract the line starting with PREFIX or prefix,
-            # and the data without the prefixes
-            prefixes = ""
-            old_prefixes = ""
-            insert_data = ""
-            for line in graph_data.split("\n"):
-                if line.startswith("PREFIX") or line.startswith("prefix"):
-                    prefixes += line + "\n"
-                else:
-                    insert_data += line + "\n"
-
-            delete_data = ""
-            for line in graph_remove_data.split("\n"):
-                if line.startswith("PREFIX") or line.startswith("prefix"):
-                    old_prefixes += line + "\n"
-                else:
-                    delete_data += line + "\n"
-
-            # Merge prefixes from both insert and delete graphs so that
-            # predicates only present in the delete side (e.g. when clearing
-            # a field with null) are also properly declared.
-            all_prefixes = prefixes
-            for line in old_prefixes.strip().split("\n"):
-                if line and line not in all_prefixes:
-                    all_prefixes += line + "\n"
-
-            query = query_template.replace("[prefixes]", all_prefixes)
-            query = query.replace("[insert_data]", insert_data)
-            query = query.replace("[delete_data]", delete_data)
-
-            query_result = self.__kg_service.graph_update(query)
-
-            if not query_result.ok:
-                raise Exception(f"{query_result.content}")
-
-        except Exception as e:
-            # self._restore_graph(g_old)
-            raise Exception(f"Failed to update the node. Reason: {e}")
+                # the new triples would have re-added.
+                for triple in triples:
+                    if triple[0] == s and triple[1] == predicate and triple in g_old:
+                        triples_remove[triple] = None
+
+        return query_registry.render(
+            "insert_delete_data",
+            graph_uri=self._graph(graph_uri),
+            nodes_uri=node_update["subjects"],
+            insert_data=to_ntriples(triples),
+            delete_data=to_ntriples(triples_remove),
+        )
 
-        return query_result.ok
+    def _after_update_node(self, node_update: dict, graph_uri: str = None):
+        # Nested nodes written along with the node are invalidated as well
+        subjects = node_update["subjects"]
+        written_subjects = subjects | set(sub for sub, _, _ in node_update["triples"])
+        self._invalidate_property_data_types(written_subjects, graph_uri)
+        self._invalidate_node_cache(written_subjects, graph_uri)
 
     def save_node(
         self,
@@ -797,64 +1035,21 @@ class SINDITKGConnector:
         serialized in the subgraph.
         """
 
-        g = node.g()
-        # get the list of subject in g
-        subjects = set([s for s, _, _ in g])
+        triples = node.triples()
+        # get the list of subject in triples
+        subjects = set([s for s, _, _ in triples])
         # Check the type of the subjects in the exising graph,
         # if different return error
-        with open(get_class_uri_by_uri_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
-
-        for s in subjects:
-            node_class_uri = g.value(s, RDF.type)
-            if node_class_uri is None:
-                raise Exception(f"Node {s} has no class")
-
-            query = query_template.replace("[node_uri]", str(s))
-            query_result = self.__kg_service.graph_query(query, "text/csv")
-            df = pd.read_csv(StringIO(query_result), sep=",")
-            if len(df) > 0:
-                class_uri = df["class"][0]
-                if class_uri != str(node_class_uri):
-                    raise Exception(
-                        f"Node {s} has a different class {node_class_uri} "
-                        f"than the one in the graph {class_uri}"
-                    )
-
-        subjects_str = " ".join([f"<{str(s)}>" for s in subjects])
+        node_classes = _get_node_classes(triples, subjects)
+        query = self._build_get_classes_query(subjects)
+        query_result = self._graph_query(query, "text/csv")
+        _check_node_classes(node_classes, _read_node_classes(query_result))
 
         # To make sure the the data will be restored in case of failure,
         # we use try/except block
         try:
-            with open(insert_delete_query_file, "r") as f:
-                query_template = f.read()
-                if "[graph_uri]" in query_template:
-                    query_template = query_template.replace(
-                        "[graph_uri]", str(self.__graph_uri)
-                    )
-
-            graph_data = str(g.serialize(format="longturtle"))
-            # extract the line starting with PREFIX or prefix,
-            # and the data without the prefixes
-            prefixes = ""
-            data = ""
-            for line in graph_data.split("\n"):
-                if line.startswith("PREFIX") or line.startswith("prefix"):
-                    prefixes += line + "\n"
-                else:
-                    data += line + "\n"
-
-            # For delete the old data
-            query_template = query_template.replace("[nodes_uri]", subjects_str)
-
-            query = query_template.replace("[prefixes]", prefixes)
-            query = query.replace("[data]", data)
-
-            query_result = self.__kg_service.graph_update(query)
+            query = self._build_save_node_query(triples, subjects)
+            query_result = self._graph_update(query)
 
             if not query_result.ok:
                 raise Exception(f"{query_result.content}")
@@ -863,16 +1058,249 @@ class SINDITKGConnector:
             # self._restore_graph(g_old)
             raise Exception(f"Failed to save the node. Reason: {e}")
 
+        self._invalidate_property_data_types(subjects)
+        self._invalidate_node_cache(subjects)
+
         return query_result.ok
 
-    """ def _restore_graph(self, graph: Graph):
-        with open(insert_data_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
+    def save_nodes(self, nodes: list[RDFModel], chunk_size: int = 500) -> list:
+        """Save many nodes to the knowledge graph, with the same semantics as
+        save_node.
+
+        The nodes are saved by chunks of ``chunk_size``: the classes of all
+        the subjects of a chunk are verified with one query, then the whole
+        chunk is written with one update. If the update of a chunk fails, its
+        nodes are saved one by one to find out which ones are failing.
+
+        Returns:
+            list: One ``{"index": ..., "uri": ..., "error": ...}`` dict per
+            node that could not be saved, ``index`` being the position of the
+            node in ``nodes``.
+        """
+        chunk_size = max(1, chunk_size)
+        errors = []
+        for start in range(0, len(nodes), chunk_size):
+            batch, batch_errors = _prepare_nodes(nodes[start : start + chunk_size])
+            errors.extend(_offset_errors(batch_errors, start))
+            if not batch:
+                continue
+
+            query = self._build_get_classes_query(_batch_subjects(batch))
+            query_result = self._graph_query(query, "text/csv")
+            batch, batch_errors = _check_batch_classes(batch, query_result)
+            errors.extend(_offset_errors(batch_errors, start))
+            if not batch:
+                continue
+
+            triples, subjects = _merge_batch(batch)
+            query = self._build_save_node_query(triples, subjects)
+            try:
+                query_result = self._graph_update(query)
+                saved = query_result.ok
+            except Exception:
+                saved = False
+
+            if saved:
+                self._invalidate_property_data_types(subjects)
+                self._invalidate_node_cache(subjects)
+                continue
+
+            for index, node, _, _ in batch:
+                try:
+                    self.save_node(node)
+                except Exception as e:
+                    errors.append(_node_error(start + index, node, e))
+
+        return sorted(errors, key=lambda error: error["index"])
+
+    def _build_save_node_query(
+        self, triples: list, subjects: set, graph_uri: str = None
+    ) -> str:
+        # The old data of the subjects is deleted
+        return query_registry.render(
+            "insert_delete",
+            graph_uri=self._graph(graph_uri),
+            nodes_uri=subjects,
+            data=to_ntriples(triples),
+        )
 
+    def _build_get_class_query(self, node_uri: str, graph_uri: str = None) -> str:
+        return query_registry.render(
+            "get_class_uri_by_uri", graph_uri=self._graph(graph_uri), node_uri=node_uri
+        )
+
+    def _build_get_classes_query(self, node_uris, graph_uri: str = None) -> str:
+        return query_registry.render(
+            "get_class_uris_by_uris",
+            graph_uri=self._graph(graph_uri),
+            nodes_uri=list(node_uris),
+        )
+
+    def _build_load_subjects_query(self, subjects, graph_uri: str = None) -> str:
+        return query_registry.render(
+            "load_nodes", graph_uri=self._graph(graph_uri), nodes_uri=list(subjects)
+        )
+
+    def update_property_value(
+        self,
+        uri: str,
+        value,
+        timestamp,
+        datatype: str = None,
+        graph_uri: str = None,
+    ) -> bool:
+        """Write the value and timestamp of a single property.
+
+        This is the fast path for connector samples: one templated
+        DELETE/INSERT touching only propertyValue and propertyValueTimestamp.
+        The node is not loaded. If ``datatype`` is not given, the data type of
+        the property is read once and cached locally.
+
+        Args:
+            uri: The uri of the property node.
+            value: The new value, converted according to the data type.
+            timestamp: The timestamp of the value.
+            datatype: The data type uri of the property (propertyDataType).
+            graph_uri: The named graph to write to. Defaults to the current
+                graph of the connector.
+        """
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+
+        uri = str(uri)
+        if datatype is None:
+            datatype = self._get_property_data_types([uri], graph_uri).get(uri)
+
+        return self._update_property_values(
+            {uri: (value, timestamp, datatype)}, graph_uri
+        )
+
+    def update_property_values(self, values: dict, graph_uri: str = None) -> bool:
+        """Write the latest value and timestamp of many properties in a single
+        SPARQL update.
+
+        Only the propertyValue and propertyValueTimestamp triples are
+        replaced, the rest of the property nodes is left untouched. Properties
+        that do not exist in the graph are skipped.
+
+        Args:
+            values: Map from property uri to a (value, timestamp) tuple.
+            graph_uri: The named graph to write to. Defaults to the current
+                graph of the connector.
+        """
+        if not values:
+            return True
+
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+
+        data_types = self._get_property_data_types(list(values.keys()), graph_uri)
+
+        return self._update_property_values(
+            {
+                str(uri): (value, timestamp, data_types.get(str(uri)))
+                for uri, (value, timestamp) in values.items()
+            },
+            graph_uri,
+        )
+
+    def _update_property_values(self, values: dict, graph_uri: str) -> bool:
+        """Issue the update for a map from property uri to a
+        (value, timestamp, data_type) tuple."""
+        rows = []
+        for uri, (value, timestamp, data_type) in values.items():
+            value_term = None
+            if value is not None:
+                value = _convert_property_value(value, data_type)
+                value_term = RDFModel.to_rdf_term(value)
+
+            timestamp_term = None
+            if timestamp is not None:
+                timestamp_term = RDFModel.to_rdf_term(timestamp)
+
+            value_str = value_term.n3() if value_term is not None else "UNDEF"
+            timestamp_str = (
+                timestamp_term.n3() if timestamp_term is not None else "UNDEF"
+            )
+            rows.append(f"({iri(uri)} {value_str} {timestamp_str})")
+
+        query = query_registry.render(
+            "update_property_values",
+            graph_uri=graph_uri,
+            values="\n    ".join(rows),
+        )
+
+        query_result = self._graph_update(query)
+        if not query_result.ok:
+            raise Exception(
+                f"Failed to update the property values. Reason: {query_result.content}"
+            )
+
+        self._invalidate_node_cache(values.keys(), graph_uri)
+
+        return query_result.ok
+
+    def convert_property_value(self, uri, value, graph_uri: str = None):
+        """Convert a value to the propertyDataType of a property, as it is
+        written to the knowledge graph by update_property_value. The data type
+        is read once and cached locally."""
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+
+        uri = str(uri)
+        data_type = self._get_property_data_types([uri], graph_uri).get(uri)
+        if data_type is not None:
+            data_type = str(data_type)
+        return _convert_property_value(value, data_type)
+
+    def _get_property_data_types(self, uris: list, graph_uri: str) -> dict:
+        """Get the propertyDataType of the given properties as a map from uri
+        to data type (None if the property has no data type).
+
+        Data types are cached per graph, only uncached properties are read
+        from the knowledge graph, all of them in one query.
+        """
+        missing = [
+            str(uri)
+            for uri in uris
+            if (graph_uri, str(uri)) not in self.__property_data_types
+        ]
+
+        if len(missing) > 0:
+            query = query_registry.render(
+                "get_property_data_types", graph_uri=graph_uri, nodes_uri=missing
+            )
+            query_result = self._graph_query(query, "text/csv")
+            found = {
+                node: data_type
+                for node, data_type in SPARQLResult(query_result)
+                if data_type is not None
+            }
+            for uri in missing:
+                self.__property_data_types[(graph_uri, uri)] = found.get(uri)
+
+        return {
+            str(uri): self.__property_data_types.get((graph_uri, str(uri)))
+            for uri in uris
+        }
+
+    def _invalidate_node_cache(self, uris, graph_uri: str = None):
+        """Drop the cached nodes containing any of the given nodes."""
+        if self.__node_cache is None:
+            return
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+        self.__node_cache.invalidate(graph_uri, uris)
+
+    def _invalidate_property_data_types(self, uris, graph_uri: str = None):
+        """Forget the cached data types of the given nodes, e.g., after the
+        nodes have been saved, updated or deleted."""
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+        for uri in uris:
+            self.__property_data_types.pop((graph_uri, str(uri)), None)
+
+    """ def _restore_graph(self, graph: Graph):
         graph_data = str(graph.serialize(format="longturtle"))
 
         # extract the line starting with PREFIX or prefix,
@@ -884,49 +1312,43 @@ class SINDITKGConnector:
                 prefixes += line + "\n"
             else:
                 data += line + "\n"
-        query = query_template.replace("[prefixes]", prefixes)
-        query = query.replace("[data]", data)
-        self.__kg_service.graph_update(query) """
+        query = query_registry.render(
+            "insert_data",
+            graph_uri=self._graph(),
+            prefixes=prefixes,
+            data=data,
+        )
+        self._graph_update(query) """
 
     def get_all_relationship_types(self):
-        with open(get_all_relationship_types_query_file, "r") as f:
-            try:
-                query = f.read()
-                query_result = self.__kg_service.graph_query(query, "text/csv")
-                df = pd.read_csv(StringIO(query_result), sep=",")
-                if df.empty:
-                    return []
-                else:
-                    df.rename(columns={"s": "uri", "d": "description"}, inplace=True)
-                    return df.to_dict(orient="records")
-            except Exception as e:
-                raise Exception(f"Failed to get all relationship types. Reason: {e}")
+        try:
+            query = query_registry.render("get_all_relationship_types")
+            query_result = self._graph_query(query, "text/csv")
+            return _read_node_types(query_result)
+        except Exception as e:
+            raise Exception(f"Failed to get all relationship types. Reason: {e}")
 
     def get_node_types(self, uri_class_mapping: dict = NodeURIClassMapping):
-        type_uris = " ".join(f"<{uri}>" for uri in uri_class_mapping.keys())
-
-        with open(get_node_types_query_file, "r") as f:
-            try:
-                query = f.read()
-                query = query.replace("[types_uri]", type_uris)
-
-                query_result = self.__kg_service.graph_query(query, "text/csv")
-                df = pd.read_csv(StringIO(query_result), sep=",")
-
-                if df.empty:
-                    return []
-                else:
-                    df.rename(columns={"s": "uri", "d": "description"}, inplace=True)
-                    return df.to_dict(orient="records")
+        try:
+            query = self._build_node_types_query(uri_class_mapping)
+            query_result = self._graph_query(query, "text/csv")
+            return _read_node_types(query_result)
+        except Exception as e:
+            raise Exception(f"Failed to get all node types. Reason: {e}")
 
-            except Exception as e:
-                raise Exception(f"Failed to get all node types. Reason: {e}")
+    def _build_node_types_query(
+        self, uri_class_mapping: dict = NodeURIClassMapping
+    ) -> str:
+        return query_registry.render(
+            "get_node_types", types_uri=list(uri_class_mapping.keys())
+        )
 
     def get_all_relationships(
         self,
         uri_class_mapping: dict = RelationshipURIClassMapping,
         skip: int = 0,
         limit: int = 10,
+        cursor: str = None,
     ):
         return self.load_nodes_by_class(
             "urn:samm:sindit.sintef.no:1.0.0#AbstractRelationship",
@@ -934,20 +1356,18 @@ class SINDITKGConnector:
             uri_class_mapping=uri_class_mapping,
             skip=skip,
             limit=limit,
+            cursor=cursor,
         )
 
     def get_relationships_by_node(
         self, node_uri: str, uri_class_mapping: dict = RelationshipURIClassMapping
     ):
-        with open(get_relationships_by_node_query_file, "r") as f:
-            query_template = f.read()
-            if "[graph_uri]" in query_template:
-                query_template = query_template.replace(
-                    "[graph_uri]", str(self.__graph_uri)
-                )
-
-        query = query_template.replace("[node_uri]", node_uri)
-        query_result = self.__kg_service.graph_query(query, "application/x-trig")
+        query = query_registry.render(
+            "get_relationships_by_node",
+            graph_uri=self._graph(),
+            node_uri=node_uri,
+        )
+        query_result = self._graph_query(query, "application/x-trig")
         g = Graph()
         g.parse(data=query_result, format="trig")
 
@@ -972,9 +1392,10 @@ class SINDITKGConnector:
         uri_class_mapping: dict = DataspaceURIClassMapping,
         skip: int = 0,
         limit: int = 10,
+        cursor: str = None,
     ) -> list:
         return self.load_all_nodes(
-            uri_class_mapping=uri_class_mapping, skip=skip, limit=limit
+            uri_class_mapping=uri_class_mapping, skip=skip, limit=limit, cursor=cursor
         )
 
     def get_dataspace_node_by_uri(
@@ -996,3 +1417,308 @@ class SINDITKGConnector:
             uri_class_mapping=uri_class_mapping,
         )
         return ret.get(node_uri)
+
+    # Asynchronous variants of the methods used by the API endpoints. They
+    # build and process the queries exactly like their synchronous
+    # counterparts, but await the knowledge graph service so that a slow
+    # query does not block the event loop.
+
+    async def load_node_by_uri_async(
+        self,
+        node_uri: str,
+        node_class=None,
+        depth: int = 1,
+    ) -> RDFModel:
+        # The graph is read once: set_graph_uri may be called by other
+        # requests while this one is waiting for the knowledge graph
+        graph_uri = self.get_graph_uri()
+        cache = self.__node_cache
+        use_cache = cache is not None and node_class is None
+        key = (graph_uri, node_uri, depth)
+        if use_cache:
+            node = cache.get(key)
+            if node is not None:
+                return node
+            generation = cache.generation()
+
+        query = self._build_load_node_query(node_uri, depth, graph_uri)
+        query_result = await self._graph_query_async(query, "application/x-trig")
+        ret = self._deserialize_node(query_result, node_uri, node_class)
+        node = ret[node_uri]
+
+        if use_cache:
+            cache.put(key, node, ret.keys(), generation=generation)
+        return node
+
+    async def _load_nodes_optimized_async(
+        self,
+        node_uris: list[str],
+        depth: int = 1,
+        uri_class_mapping: dict = NodeURIClassMapping,
+        graph_uri: str = None,
+    ) -> list[RDFModel]:
+        if not node_uris:
+            return []
+
+        query = self._build_load_nodes_query(node_uris, depth, graph_uri)
+        query_result = await self._graph_query_async(query, "application/x-trig")
+        return self._deserialize_nodes(
+            query_result,
+            node_uris,
+            created_individuals={},
+            uri_class_mapping=uri_class_mapping,
+        )
+
+    async def load_nodes_by_uris_async(
+        self,
+        node_uris: list[str],
+        depth: int = 1,
+        uri_class_mapping: dict = NodeURIClassMapping,
+    ) -> list[RDFModel]:
+        """Load many nodes with a single query. The nodes are returned in the
+        order of ``node_uris``, the nodes that do not exist are left out."""
+        return await self._load_nodes_optimized_async(
+            node_uris,
+            depth,
+            uri_class_mapping=uri_class_mapping,
+            graph_uri=self.get_graph_uri(),
+        )
+
+    async def load_nodes_by_class_async(
+        self,
+        class_uri: str,
+        depth: int = 1,
+        uri_class_mapping: dict = NodeURIClassMapping,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+    ) -> NodePage:
+        graph_uri = self.get_graph_uri()
+        query = self._build_nodes_by_class_query(
+            class_uri, skip, limit, cursor, graph_uri=graph_uri
+        )
+        query_result = await self._graph_query_async(query, "text/csv")
+        node_uris = _read_node_uris(query_result)
+        nodes = await self._load_nodes_optimized_async(
+            node_uris, depth, uri_class_mapping=uri_class_mapping, graph_uri=graph_uri
+        )
+        return _node_page(nodes, node_uris, limit)
+
+    async def find_node_by_attribute_async(
+        self,
+        type_uri: str,
+        attribute_uri: str,
+        attribute_value: str,
+        is_value_uri: bool = False,
+        filtering_condition: str = None,
+        uri_class_mapping: dict = NodeURIClassMapping,
+        depth: int = 1,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+    ) -> NodePage:
+        graph_uri = self.get_graph_uri()
+        query = self._build_find_node_by_attribute_query(
+            type_uri,
+            attribute_uri,
+            attribute_value,
+            is_value_uri=is_value_uri,
+            filtering_condition=filtering_condition,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            graph_uri=graph_uri,
+        )
+        query_result = await self._graph_query_async(query, "text/csv")
+        node_uris = _read_node_uris(query_result)
+        nodes = await self._load_nodes_optimized_async(
+            node_uris, depth, uri_class_mapping=uri_class_mapping, graph_uri=graph_uri
+        )
+        return _node_page(nodes, node_uris, limit)
+
+    async def load_all_nodes_async(
+        self,
+        uri_class_mapping: dict = NodeURIClassMapping,
+        depth: int = 1,
+        skip: int = 0,
+        limit: int = 10,
+        cursor: str = None,
+        graph_uri: str = None,
+    ) -> NodePage:
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+        query = self._build_all_nodes_query(
+            uri_class_mapping, skip, limit, cursor, graph_uri=graph_uri
+        )
+        query_result = await self._graph_query_async(query, "text/csv")
+        node_uris = _read_node_uris(query_result)
+        nodes = await self._load_nodes_optimized_async(
+            node_uris, depth, uri_class_mapping=uri_class_mapping, graph_uri=graph_uri
+        )
+        return _node_page(nodes, node_uris, limit)
+
+    async def iter_all_nodes_async(
+        self,
+        uri_class_mapping: dict = NodeURIClassMapping,
+        depth: int = 1,
+        page_size: int = 500,
+        graph_uri: str = None,
+    ):
+        """Iterate over all the nodes of the graph, loaded page by page with
+        a cursor so that only one page is held in memory.
+
+        All the pages are loaded from ``graph_uri``, by default the graph
+        that is current when the iteration starts."""
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+        cursor = None
+        while True:
+            page = await self.load_all_nodes_async(
+                uri_class_mapping=uri_class_mapping,
+                depth=depth,
+                limit=page_size,
+                cursor=cursor,
+                graph_uri=graph_uri,
+            )
+            for node in page:
+                yield node
+
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+    async def export_graph_async(
+        self, accept_content: str = "application/n-triples", graph_uri: str = None
+    ):
+        """Stream the statements of ``graph_uri`` (by default the current
+        graph) as serialized by the knowledge graph, chunk by chunk."""
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+        async for chunk in self.__kg_service.graph_export_async(
+            graph_uri, accept_content
+        ):
+            yield chunk
+
+    async def get_node_types_async(
+        self, uri_class_mapping: dict = NodeURIClassMapping
+    ) -> list:
+        try:
+            query = self._build_node_types_query(uri_class_mapping)
+            query_result = await self._graph_query_async(query, "text/csv")
+            return _read_node_types(query_result)
+        except Exception as e:
+            raise Exception(f"Failed to get all node types. Reason: {e}")
+
+    async def delete_node_async(self, node_uri: str) -> bool:
+        graph_uri = self.get_graph_uri()
+        query = self._build_delete_node_query(node_uri, graph_uri)
+        query_result = await self._graph_update_async(query)
+
+        if not query_result.is_success:
+            raise Exception("Failed to delete the node. Reason: " + query_result.text)
+
+        self._after_delete_node(node_uri, graph_uri)
+
+        return query_result.is_success
+
+    async def update_node_async(
+        self,
+        node_dict: dict,
+        overwrite: bool = True,
+        uri_class_mapping: dict = NodeURIClassMapping,
+    ) -> bool:
+        if "uri" not in node_dict:
+            raise Exception("Node uri is required")
+        node_uri = node_dict["uri"]
+        graph_uri = self.get_graph_uri()
+
+        query = self._build_get_class_query(node_uri, graph_uri)
+        query_result = await self._graph_query_async(query, "text/csv")
+        node_update = self._prepare_node_update(
+            node_dict, query_result, uri_class_mapping
+        )
+
+        query = self._build_load_subjects_query(node_update["subjects"], graph_uri)
+        query_result_old = await self._graph_query_async(query, "application/x-trig")
+
+        try:
+            query = self._build_update_node_query(
+                node_update, query_result_old, overwrite, graph_uri=graph_uri
+            )
+            query_result = await self._graph_update_async(query)
+
+            if not query_result.is_success:
+                raise Exception(query_result.text)
+
+        except Exception as e:
+            raise Exception(f"Failed to update the node. Reason: {e}")
+
+        self._after_update_node(node_update, graph_uri)
+
+        return query_result.is_success
+
+    async def save_node_async(self, node: RDFModel, graph_uri: str = None) -> bool:
+        if graph_uri is None:
+            graph_uri = self.get_graph_uri()
+        triples = node.triples()
+        subjects = set([s for s, _, _ in triples])
+
+        node_classes = _get_node_classes(triples, subjects)
+        query = self._build_get_classes_query(subjects, graph_uri)
+        query_result = await self._graph_query_async(query, "text/csv")
+        _check_node_classes(node_classes, _read_node_classes(query_result))
+
+        try:
+            query = self._build_save_node_query(triples, subjects, graph_uri)
+            query_result = await self._graph_update_async(query)
+
+            if not query_result.is_success:
+                raise Exception(query_result.text)
+
+        except Exception as e:
+            raise Exception(f"Failed to save the node. Reason: {e}")
+
+        self._invalidate_property_data_types(subjects, graph_uri)
+        self._invalidate_node_cache(subjects, graph_uri)
+
+        return query_result.is_success
+
+    async def save_nodes_async(
+        self, nodes: list[RDFModel], chunk_size: int = 500
+    ) -> list:
+        graph_uri = self.get_graph_uri()
+        chunk_size = max(1, chunk_size)
+        errors = []
+        for start in range(0, len(nodes), chunk_size):
+            batch, batch_errors = _prepare_nodes(nodes[start : start + chunk_size])
+            errors.extend(_offset_errors(batch_errors, start))
+            if not batch:
+                continue
+
+            query = self._build_get_classes_query(_batch_subjects(batch), graph_uri)
+            query_result = await self._graph_query_async(query, "text/csv")
+            batch, batch_errors = _check_batch_classes(batch, query_result)
+            errors.extend(_offset_errors(batch_errors, start))
+            if not batch:
+                continue
+
+            triples, subjects = _merge_batch(batch)
+            query = self._build_save_node_query(triples, subjects, graph_uri)
+            try:
+                query_result = await self._graph_update_async(query)
+                saved = query_result.is_success
+            except Exception:
+                saved = False
+
+            if saved:
+                self._invalidate_property_data_types(subjects, graph_uri)
+                self._invalidate_node_cache(subjects, graph_uri)
+                continue
+
+            for index, node, _, _ in batch:
+                try:
+                    await self.save_node_async(node, graph_uri)
+                except Exception as e:
+                    errors.append(_node_error(start + index, node, e))
+
+        return sorted(errors, key=lambda error: error["index"])
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sindit.common.semantic_knowledge_graph.rdf_model import RDFModel
+
+
+class NodeCache:
+    """Bounded LRU/TTL cache of deserialized nodes.
+
+    Entries are keyed by (graph_uri, node_uri, depth). Each entry remembers
+    the uris of all the nodes it contains (the children loaded with
+    depth > 1 included), so that writing any of these nodes invalidates every
+    entry it appears in. Nodes are copied in and out of the cache, callers can
+    freely modify the returned objects.
+
+    Args:
+        max_size (int): Maximum number of entries. The least recently used
+            entry is evicted first. Default is 1024.
+        ttl (float): Seconds after which an entry expires, to pick up changes
+            made to the knowledge graph by other applications. Default is 30.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        # key -> (expires_at, node, uris)
+        self._entries = OrderedDict()
+        # (graph_uri, uri) -> set of keys containing the uri
+        self._index = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def generation(self) -> int:
+        """Get the current generation of the cache. It changes with every
+        invalidation, see put()."""
+        with self._lock:
+            return self._generation
+
+    def get(self, key: tuple) -> RDFModel | None:
+        """Get a copy of the cached node, or None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+
+            expires_at, node, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self._metrics["expirations"] += 1
+                self._metrics["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+
+        return node.model_copy(deep=True)
+
+    def put(self, key: tuple, node: RDFModel, uris, generation: int = None):
+        """Cache a node.
+
+        Args:
+            key: (graph_uri, node_uri, depth)
+            node: The deserialized node.
+            uris: The uris of all the nodes contained in the entry.
+            generation: The generation of the cache before the node was
+                loaded. The node is not cached if an invalidation happened in
+                the meantime, as it may already be outdated.
+        """
+        node = node.model_copy(deep=True)
+        graph_uri = key[0]
+        uris = set(str(uri) for uri in uris)
+        uris.add(str(key[1]))
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, node, uris)
+            for uri in uris:
+                self._index.setdefault((graph_uri, uri), set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._metrics["evictions"] += 1
+
+    def invalidate(self, graph_uri: str, uris) -> None:
+        """Drop every entry of the graph containing one of the uris."""
+        with self._lock:
+            self._generation += 1
+            for uri in uris:
+                keys = self._index.get((graph_uri, str(uri)))
+                if not keys:
+                    continue
+                for key in list(keys):
+                    self._remove(key)
+                    self._metrics["invalidations"] += 1
+
+    def invalidate_graph(self, graph_uri: str) -> None:
+        """Drop every entry of the graph."""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key[0] == graph_uri]:
+                self._remove(key)
+                self._metrics["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._index.clear()
+
+    def get_metrics(self) -> dict:
+        """Get the hit/miss counters and the current size of the cache."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["size"] = len(self._entries)
+            lookups = metrics["hits"] + metrics["misses"]
+            metrics["hit_ratio"] = metrics["hits"] / lookups if lookups > 0 else 0.0
+        return metrics
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, _, uris = entry
+        for uri in uris:
+            index_key = (key[0], uri)
+            keys = self._index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[index_key]
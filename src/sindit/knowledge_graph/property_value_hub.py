@@ -0,0 +1,156 @@
+import asyncio
+import threading
+
+from sindit.util.log import logger
+
+
+class Subscription:
+    """Subscription of an asyncio consumer to the values of some properties.
+
+    Values are published from the connector threads and handed over to the
+    event loop of the consumer. They are coalesced per property: a consumer
+    that is slower than the updates gets the latest value of each property,
+    never a growing backlog.
+
+    Use PropertyValueHub.subscribe() to create a subscription, and close it
+    (or use it as a context manager) when the consumer goes away.
+    """
+
+    def __init__(self, hub, uris, loop: asyncio.AbstractEventLoop):
+        self.hub = hub
+        self.uris = frozenset(str(uri) for uri in uris)
+        self.coalesced = 0
+        self.closed = False
+
+        self._loop = loop
+        self._event = asyncio.Event()
+        # uri -> (value, timestamp)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _push(self, uri: str, value, timestamp) -> bool:
+        """Queue a value, from any thread. Returns False if the event loop of
+        the consumer is closed."""
+        with self._lock:
+            wake_up = not self._pending
+            if uri in self._pending:
+                self.coalesced += 1
+            self._pending[uri] = (value, timestamp)
+
+        if wake_up:
+            try:
+                self._loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                return False
+        return True
+
+    async def get(self, timeout: float = None) -> dict:
+        """Wait for new values.
+
+        Returns:
+            dict: The latest (value, timestamp) of each property updated since
+            the last call, by property uri. Empty if the timeout expired.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return {}
+            self._event.clear()
+
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+            if pending:
+                return pending
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class PropertyValueHub:
+    """In-process publish/subscribe hub for property values.
+
+    The connectors publish every new value of their properties here (see
+    Property.update_property_value_to_kg), and the streaming endpoints
+    subscribe to the properties their clients watch. Each value is fanned out
+    to all the subscribers as soon as it is received, without reading the
+    knowledge graph.
+    """
+
+    def __init__(self):
+        # uri -> set of subscriptions
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+        self._metrics = {
+            "published": 0,
+            "delivered": 0,
+            # Values replaced by a newer one before the consumer read them
+            "coalesced": 0,
+        }
+
+    def subscribe(self, uris, loop: asyncio.AbstractEventLoop = None) -> Subscription:
+        """Subscribe to the values of the properties. Must be called from the
+        event loop of the consumer, unless ``loop`` is given."""
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        subscription = Subscription(self, uris, loop)
+
+        with self._lock:
+            for uri in subscription.uris:
+                self._subscriptions.setdefault(uri, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._metrics["coalesced"] += subscription.coalesced
+
+            for uri in subscription.uris:
+                subscriptions = self._subscriptions.get(uri)
+                if subscriptions is None:
+                    continue
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[uri]
+
+    def publish(self, uri: str, value, timestamp) -> None:
+        """Send a new value of a property to its subscribers. Cheap if the
+        property has no subscriber."""
+        uri = str(uri)
+        with self._lock:
+            self._metrics["published"] += 1
+            subscriptions = self._subscriptions.get(uri)
+            if not subscriptions:
+                return
+            subscriptions = list(subscriptions)
+            self._metrics["delivered"] += len(subscriptions)
+
+        for subscription in subscriptions:
+            if not subscription._push(uri, value, timestamp):
+                logger.debug(f"Dropping the subscription of a closed loop to {uri}")
+                self.unsubscribe(subscription)
+
+    def get_metrics(self) -> dict:
+        """Get the counters of the hub and the number of subscriptions."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            subscriptions = set()
+            for uri_subscriptions in self._subscriptions.values():
+                subscriptions.update(uri_subscriptions)
+            metrics["subscriptions"] = len(subscriptions)
+            metrics["subscribed_properties"] = len(self._subscriptions)
+            metrics["coalesced"] += sum(s.coalesced for s in subscriptions)
+        return metrics
+
+
+property_value_hub = PropertyValueHub()
@@ -0,0 +1,195 @@
+import threading
+import time
+
+from sindit.util.log import logger
+
+
+class PropertyValueWriter:
+    """Write-behind queue for property values.
+
+    Connectors submit every new sample here instead of writing it to the
+    knowledge graph straight away. Samples are coalesced per property, so only
+    the latest value of each property is kept, and all dirty properties are
+    written with a single SPARQL update (see
+    SINDITKGConnector.update_property_values) every ``flush_interval`` seconds
+    or as soon as ``batch_size`` properties are waiting.
+
+    Args:
+        kg_connector (SINDITKGConnector): The connector used to flush values.
+        flush_interval (float): Seconds between two flushes. Default is 1.
+        batch_size (int): Number of dirty properties that triggers an early
+            flush. Default is 500.
+        max_pending (int): Number of dirty properties at which the submitting
+            thread flushes synchronously instead of queueing (backpressure).
+            Default is 10000.
+    """
+
+    def __init__(
+        self,
+        kg_connector,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        max_pending: int = 10000,
+    ):
+        self.kg_connector = kg_connector
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        # (graph_uri, property_uri) -> (value, timestamp)
+        self._pending = {}
+        self._pending_since = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self.thread = None
+
+        self._metrics = {
+            "submitted": 0,
+            "coalesced": 0,
+            "flushed": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "backpressure_flushes": 0,
+            "max_pending_seen": 0,
+            "last_flush_size": 0,
+            "last_flush_duration": 0.0,
+        }
+
+    def start(self):
+        """Start the background flush thread."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.thread = threading.Thread(
+            target=self._run, name="kg_property_writer", daemon=True
+        )
+        self.thread.start()
+        logger.info(
+            f"Property value writer started (flush_interval={self.flush_interval}s, "
+            f"batch_size={self.batch_size})"
+        )
+
+    def stop(self):
+        """Stop the background thread and flush the remaining values
+        synchronously."""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        logger.info("Property value writer stopped")
+
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def submit(self, uri: str, value, timestamp) -> None:
+        """Queue the latest value of a property. An older value of the same
+        property that has not been flushed yet is replaced."""
+        key = (self.kg_connector.get_graph_uri(), str(uri))
+
+        with self._lock:
+            self._metrics["submitted"] += 1
+            if key in self._pending:
+                self._metrics["coalesced"] += 1
+            elif not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending[key] = (value, timestamp)
+
+            pending = len(self._pending)
+            if pending > self._metrics["max_pending_seen"]:
+                self._metrics["max_pending_seen"] = pending
+
+            running = self.is_running()
+            backpressure = running and pending >= self.max_pending
+            if backpressure:
+                self._metrics["backpressure_flushes"] += 1
+
+        if not running or backpressure:
+            # Without the background thread, or when the queue is full,
+            # the submitting thread pays for the write itself
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wake_event.set()
+
+    def flush(self) -> int:
+        """Write all dirty properties to the knowledge graph.
+
+        Returns:
+            int: The number of property values written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+                self._pending_since = None
+
+            if not batch:
+                return 0
+
+            # A single update is issued per named graph
+            graphs = {}
+            for (graph_uri, uri), item in batch.items():
+                graphs.setdefault(graph_uri, {})[uri] = item
+
+            start = time.monotonic()
+            written = 0
+            for graph_uri, values in graphs.items():
+                try:
+                    self.kg_connector.update_property_values(
+                        values, graph_uri=graph_uri
+                    )
+                    written += len(values)
+                except Exception as e:
+                    with self._lock:
+                        self._metrics["failed_flushes"] += 1
+                    logger.error(
+                        f"Failed to flush {len(values)} property values "
+                        f"to graph {graph_uri}: {e}"
+                    )
+                    self._requeue(graph_uri, values)
+
+            duration = time.monotonic() - start
+            with self._lock:
+                self._metrics["flushes"] += 1
+                self._metrics["flushed"] += written
+                self._metrics["last_flush_size"] = written
+                self._metrics["last_flush_duration"] = duration
+
+            logger.debug(
+                f"Flushed {written} property values to the KG in {duration:.3f}s"
+            )
+            return written
+
+    def get_metrics(self) -> dict:
+        """Get the counters of the writer, together with the current
+        number of dirty properties and the age of the oldest one."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["pending"] = len(self._pending)
+            metrics["lag"] = (
+                time.monotonic() - self._pending_since
+                if self._pending_since is not None
+                else 0.0
+            )
+        return metrics
+
+    def _requeue(self, graph_uri: str, values: dict):
+        """Put values of a failed flush back, unless a newer value of the same
+        property has been submitted in the meantime."""
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            for uri, item in values.items():
+                self._pending.setdefault((graph_uri, uri), item)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing property values: {e}")
@@ -0,0 +1,203 @@
+import base64
+import binascii
+import re
+import threading
+import time
+from importlib import resources
+
+# [name] placeholders of the query templates
+PLACEHOLDER_PATTERN = re.compile(r"\[([A-Za-z_]+)\]")
+
+# Characters that are not allowed in an IRIREF
+INVALID_IRI_CHARACTERS = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+STRING_ESCAPES = {
+    "\\": "\\\\",
+    '"': '\\"',
+    "\n": "\\n",
+    "\r": "\\r",
+    "\t": "\\t",
+}
+
+
+def iri(uri) -> str:
+    """Get the SPARQL IRI term <uri>, raise ValueError if the uri contains
+    characters that would break out of the term."""
+    uri = str(uri)
+    if INVALID_IRI_CHARACTERS.search(uri):
+        raise ValueError(f"Invalid uri: {uri}")
+    return f"<{uri}>"
+
+
+def iris(uris) -> str:
+    """Get the space-separated IRI terms of the uris, for VALUES clauses."""
+    return " ".join(iri(uri) for uri in uris)
+
+
+def escape_string(value) -> str:
+    """Escape a value to be inserted between double quotes."""
+    return "".join(STRING_ESCAPES.get(c, c) for c in str(value))
+
+
+def encode_cursor(uri) -> str:
+    """Get the opaque pagination cursor pointing after the given node."""
+    return base64.urlsafe_b64encode(str(uri).encode("utf-8")).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """Get the uri of the last node seen from a cursor created by
+    encode_cursor(), raise ValueError if the cursor is invalid."""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        uri = base64.b64decode(cursor + padding, altchars=b"-_", validate=True)
+        return uri.decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def cursor_filter(cursor: str = None, variable: str = "?node") -> str:
+    """Get the FILTER clause selecting the nodes after the cursor, in the
+    ORDER BY order of the node uris. Empty if there is no cursor."""
+    if not cursor:
+        return ""
+    return f'FILTER(STR({variable}) > "{escape_string(decode_cursor(cursor))}")'
+
+
+class Query(str):
+    """A rendered query, remembering the name of its template so that its
+    execution time can be recorded (see QueryRegistry.record)."""
+
+    def __new__(cls, query: str, name: str = None):
+        ret = super().__new__(cls, query)
+        ret.name = name
+        return ret
+
+
+class QueryTemplate:
+    """A query template split once into its text parts and placeholders.
+
+    The kind of a placeholder depends on where it appears:
+
+    - ``<[name]>``: an IRI, the value is checked with ``iri()``.
+    - ``"[name]"``: a string literal, the value is escaped.
+    - ``[name]``: a query fragment. Lists, tuples and sets are rendered as
+      IRIs with ``iris()``, numbers as numbers, strings are inserted as is.
+    """
+
+    def __init__(self, name: str, template: str):
+        self.name = name
+        self.template = template
+        self.parts = []  # text parts, len(placeholders) + 1
+        self.placeholders = []  # (name, kind)
+
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            start, end = match.span()
+            before = template[start - 1] if start > 0 else ""
+            after = template[end] if end < len(template) else ""
+            if before == "<" and after == ">":
+                kind = "iri"
+            elif before == '"' and after == '"':
+                kind = "string"
+            else:
+                kind = "fragment"
+            self.parts.append(template[position:start])
+            self.placeholders.append((match.group(1), kind))
+            position = end
+        self.parts.append(template[position:])
+
+        self.parameters = set(name for name, _ in self.placeholders)
+
+    def render(self, **params) -> str:
+        rendered = [self.parts[0]]
+        for (name, kind), part in zip(self.placeholders, self.parts[1:]):
+            if name not in params:
+                raise ValueError(f"Missing parameter {name} of query {self.name}")
+            rendered.append(_render_value(params[name], kind))
+            rendered.append(part)
+        return "".join(rendered)
+
+
+def _render_value(value, kind: str) -> str:
+    if kind == "iri":
+        # The angle brackets are part of the template
+        return iri(value)[1:-1]
+    if kind == "string":
+        return escape_string(value)
+    if isinstance(value, (list, tuple, set)):
+        return iris(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class QueryRegistry:
+    """The query templates of a package, loaded and compiled once.
+
+    Args:
+        package (str): Package containing the ``.sparql`` templates, named by
+            their file name without extension.
+    """
+
+    def __init__(self, package: str = "sindit.knowledge_graph.queries"):
+        self.templates = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+        for entry in resources.files(package).iterdir():
+            if entry.is_file() and entry.name.endswith(".sparql"):
+                name = entry.name[: -len(".sparql")]
+                self.templates[name] = QueryTemplate(
+                    name, entry.read_text(encoding="utf-8")
+                )
+
+    def get_template(self, name: str) -> QueryTemplate:
+        template = self.templates.get(name)
+        if template is None:
+            raise ValueError(f"Unknown query {name}")
+        return template
+
+    def render(self, name: str, **params) -> Query:
+        """Render a query template. Parameters that the template does not
+        use are ignored."""
+        start = time.perf_counter()
+        query = Query(self.get_template(name).render(**params), name)
+        self._record(name, "render", time.perf_counter() - start)
+        return query
+
+    def record(self, query, duration: float) -> None:
+        """Record the execution time of a query rendered by render()."""
+        name = getattr(query, "name", None)
+        if name is not None:
+            self._record(name, "execution", duration)
+
+    def _record(self, name: str, kind: str, duration: float) -> None:
+        with self._lock:
+            metrics = self._metrics.get(name)
+            if metrics is None:
+                metrics = {
+                    "renders": 0,
+                    "render_time": 0.0,
+                    "executions": 0,
+                    "execution_time": 0.0,
+                    "max_execution_time": 0.0,
+                }
+                self._metrics[name] = metrics
+            if kind == "render":
+                metrics["renders"] += 1
+                metrics["render_time"] += duration
+            else:
+                metrics["executions"] += 1
+                metrics["execution_time"] += duration
+                metrics["max_execution_time"] = max(
+                    metrics["max_execution_time"], duration
+                )
+
+    def get_metrics(self) -> dict:
+        """Get the render and execution counters (times in seconds) of the
+        templates used so far."""
+        with self._lock:
+            return {name: dict(metrics) for name, metrics in self._metrics.items()}
+
+
+query_registry = QueryRegistry()
@@ -1,8 +1,12 @@
+import asyncio
 import json
+import threading
 import time
-from typing import Dict
+from typing import AsyncIterator, Dict
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException as ReqExc
 from sindit.util.log import logger
 
@@ -12,8 +16,80 @@ from sindit.util.log import logger
 
 
 class ClientAPI:
-    def __init__(self, api_uri: str):
+    """HTTP client for an API.
+
+    All requests go through one pooled ``requests.Session``, so connections
+    to the API host are kept alive and reused across calls and threads.
+
+    Args:
+        api_uri (str): Base uri of the API.
+        pool_size (int): Maximum number of connections kept open to the host.
+            Default is 10.
+        max_concurrency (int, optional): Maximum number of requests running
+            at the same time against the host. Further requests wait for a
+            free slot. Defaults to None (no limit).
+        connect_timeout (float, optional): Timeout in seconds to establish a
+            connection, used when a request has no explicit ``timeout``.
+            Defaults to None (no timeout).
+        read_timeout (float, optional): Timeout in seconds to wait for the
+            response, used when a request has no explicit ``timeout``.
+            Defaults to None (the default of the method).
+    """
+
+    def __init__(
+        self,
+        api_uri: str,
+        pool_size: int = 10,
+        max_concurrency: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+    ):
         self.api_uri = api_uri
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self.session = requests.Session()
+        # Block instead of opening throwaway connections when the pool is busy
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._semaphore = None
+        if max_concurrency is not None and max_concurrency > 0:
+            self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+    def _request(self, method: str, relative_path: str, default_timeout=None, **kwargs):
+        """Send a request through the pooled session, waiting for a free slot
+        if the number of concurrent requests is limited.
+
+        The read timeout is the ``timeout`` given by the caller, otherwise the
+        configured read timeout, otherwise ``default_timeout``. It is combined
+        with the configured connect timeout, unless a (connect, read) tuple is
+        given.
+        """
+        timeout = kwargs.pop("timeout", None)
+        if timeout is None:
+            timeout = (
+                self.read_timeout if self.read_timeout is not None else default_timeout
+            )
+        if self.connect_timeout is not None and not isinstance(timeout, tuple):
+            timeout = (self.connect_timeout, timeout)
+
+        if self._semaphore is None:
+            return self.session.request(
+                method, self.api_uri + relative_path, timeout=timeout, **kwargs
+            )
+
+        with self._semaphore:
+            return self.session.request(
+                method, self.api_uri + relative_path, timeout=timeout, **kwargs
+            )
 
     def _handle_request_exception(self, retry_number: int = 0):
         logger.info("API not available!")
@@ -29,7 +105,7 @@ class ClientAPI:
         self,
         relative_path: str,
         retries: int = -1,
-        timeout: int = 30,
+        timeout: int = None,
         result_class=None,
         **kwargs,
     ):
@@ -43,8 +119,8 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                response = requests.get(
-                    self.api_uri + relative_path, timeout=timeout, **kwargs
+                response = self._request(
+                    "GET", relative_path, 30, timeout=timeout, **kwargs
                 )
 
                 if response.ok is False:
@@ -84,7 +160,7 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                return requests.get(self.api_uri + relative_path, timeout=300, **kwargs)
+                return self._request("GET", relative_path, 300, **kwargs)
             except ReqExc:
                 self._handle_request_exception(i)
 
@@ -97,9 +173,7 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                response = requests.get(
-                    self.api_uri + relative_path, timeout=30, **kwargs
-                )
+                response = self._request("GET", relative_path, 30, **kwargs)
                 if response.ok is False:
                     return response
                 else:
@@ -119,9 +193,7 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                response = requests.get(
-                    self.api_uri + relative_path, timeout=30, **kwargs
-                )
+                response = self._request("GET", relative_path, 30, **kwargs)
                 if response.ok is False:
                     return response
                 else:
@@ -141,9 +213,7 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                response = requests.get(
-                    self.api_uri + relative_path, timeout=30, **kwargs
-                )
+                response = self._request("GET", relative_path, 30, **kwargs)
                 if response.ok is False:
                     return response
                 else:
@@ -155,7 +225,7 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                return requests.patch(self.api_uri + relative_path, **kwargs)
+                return self._request("PATCH", relative_path, **kwargs)
             except ReqExc:
                 self._handle_request_exception(i)
 
@@ -181,8 +251,8 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                return requests.put(
-                    self.api_uri + relative_path, data=data, json=json, **kwargs
+                return self._request(
+                    "PUT", relative_path, data=data, json=json, **kwargs
                 )
             except ReqExc:
                 self._handle_request_exception(i)
@@ -209,8 +279,8 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                response = requests.post(
-                    self.api_uri + relative_path, data=data, json=json, **kwargs
+                response = self._request(
+                    "POST", relative_path, data=data, json=json, **kwargs
                 )
                 # text = response.text
                 # print(response.status_code)
@@ -234,10 +304,159 @@ class ClientAPI:
         range_limit = retries + 1 if retries >= 0 else 9 * 10**23
         for i in range(range_limit):
             try:
-                response = requests.delete(self.api_uri + relative_path, **kwargs)
+                response = self._request("DELETE", relative_path, **kwargs)
                 # text = response.text
                 # if text[0] == '"' and text[-1] == '"':
                 #    text = text[1:-1]
                 return response
             except ReqExc:
                 self._handle_request_exception(i)
+
+
+class AsyncClientAPI:
+    """Asyncio HTTP client for an API, to be awaited from coroutines (e.g.
+    FastAPI endpoints) without blocking the event loop.
+
+    All requests go through one pooled ``httpx.AsyncClient``. The client is
+    created on first use and bound to the running event loop. If it is used
+    from another loop, the client of the previous loop is closed and a new
+    one is created. Call aclose() when the client is not needed anymore,
+    e.g. on application shutdown.
+
+    Args:
+        api_uri (str): Base uri of the API.
+        pool_size (int): Maximum number of idle keep-alive connections kept
+            open to the host. Default is 10.
+        max_concurrency (int, optional): Maximum number of connections, hence
+            of requests running at the same time against the host. Further
+            requests wait for a free connection. Defaults to None (no limit).
+        connect_timeout (float, optional): Timeout in seconds to establish a
+            connection. Defaults to None (no timeout).
+        read_timeout (float, optional): Timeout in seconds to wait for the
+            response. Defaults to None (no timeout).
+    """
+
+    def __init__(
+        self,
+        api_uri: str,
+        pool_size: int = 10,
+        max_concurrency: int = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+    ):
+        self.api_uri = api_uri
+        self.pool_size = pool_size
+        self.max_concurrency = (
+            max_concurrency
+            if max_concurrency is not None and max_concurrency > 0
+            else None
+        )
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._client = None
+        self._loop = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            previous, previous_loop = self._client, self._loop
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                # No pool timeout: wait for a free connection
+                timeout=httpx.Timeout(
+                    self.read_timeout, connect=self.connect_timeout, pool=None
+                ),
+            )
+            self._loop = loop
+            # Replaced before awaiting, so that concurrent requests share the
+            # new client
+            if previous is not None:
+                await _close_client(previous, previous_loop)
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        if self._client is not None:
+            client, loop = self._client, self._loop
+            self._client = None
+            self._loop = None
+            await _close_client(client, loop)
+
+    async def _request(
+        self, method: str, relative_path: str, retries: int = -1, **kwargs
+    ) -> httpx.Response:
+        """Send a request, retrying with an exponential backoff if the API is
+        not reachable. The last error is raised once the retries are
+        exhausted."""
+        range_limit = retries + 1 if retries >= 0 else 9 * 10**23
+        for i in range(range_limit):
+            try:
+                client = await self._get_client()
+                return await client.request(
+                    method, self.api_uri + relative_path, **kwargs
+                )
+            except httpx.TransportError as e:
+                if i >= range_limit - 1:
+                    raise
+                logger.info(f"API not available! Reason: {e}")
+                logger.info(f"Tried to connect to {self.api_uri}")
+
+                sleep_time = min(60, 1 * (2**i))
+                logger.info(f"Retrying in {sleep_time} seconds...")
+                await asyncio.sleep(sleep_time)
+
+    async def get(self, relative_path: str, retries: int = -1, **kwargs):
+        """Get request. Returns the response object."""
+        return await self._request("GET", relative_path, retries=retries, **kwargs)
+
+    async def post(
+        self,
+        relative_path: str,
+        data: Dict = None,
+        json: Dict = None,
+        retries: int = -1,
+        **kwargs,
+    ):
+        """Post request. Returns the response object."""
+        return await self._request(
+            "POST", relative_path, retries=retries, data=data, json=json, **kwargs
+        )
+
+    async def stream(
+        self, method: str, relative_path: str, **kwargs
+    ) -> AsyncIterator[bytes]:
+        """Send a request and yield the body of the response chunk by chunk,
+        without loading it in memory. Raises an exception if the response
+        status is an error. Not retried, as part of the body may already have
+        been consumed."""
+        client = await self._get_client()
+        async with client.stream(
+            method, self.api_uri + relative_path, **kwargs
+        ) as response:
+            if not response.is_success:
+                await response.aread()
+                raise Exception(
+                    f"Request failed with status {response.status_code}: "
+                    f"{response.text}"
+                )
+            async for chunk in response.aiter_bytes():
+                yield chunk
+
+
+async def _close_client(client: httpx.AsyncClient, loop) -> None:
+    """Close a client, in the event loop it was created in if that loop runs
+    in another thread."""
+    if loop.is_running() and loop is not asyncio.get_running_loop():
+        # The loop runs in another thread, where the connections belong
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        return
+    try:
+        await client.aclose()
+    except RuntimeError as e:
+        # The transports of a closed loop cannot be closed properly anymore,
+        # their sockets are closed when they are garbage collected
+        logger.debug(f"Closed the client of a closed event loop: {e}")
@@ -78,6 +78,29 @@ def get_environment_variable_int(
     return int(get_environment_variable(key, optional, default))
 
 
+def get_environment_variable_float(
+    key: str, optional: bool = False, default=None
+) -> float | None:
+    """Loads an environment variable
+
+    Args:
+        key (str): key of the variable
+        optional (bool, optional):
+            whether an exception shall be raised if not available.
+            Defaults to False.
+        default (_type_, optional):
+            Defaul value if optional is True.
+            Defaults to None.
+
+    Returns:
+        float | None: the value or None
+
+    Raises:
+        EnvironmentalVariableNotFoundError: if not optional but key not found
+    """
+    return float(get_environment_variable(key, optional, default))
+
+
 def get_environment_variable_bool(
     key: str, optional: bool = False, default=None
 ) -> bool | None:
@@ -0,0 +1,35 @@
+import asyncio
+
+import httpx
+
+from sindit.util.client_api import AsyncClientAPI
+
+
+class FakeAsyncClient:
+    def __init__(self, clients, **kwargs):
+        self.closed = False
+        clients.append(self)
+
+    async def request(self, method, url, **kwargs):
+        return url
+
+    async def aclose(self):
+        self.closed = True
+        # Like the transports of a client whose event loop is closed
+        raise RuntimeError("Event loop is closed")
+
+
+class TestAsyncClientAPI:
+    def test_close_client_of_previous_loop(self, monkeypatch):
+        clients = []
+        monkeypatch.setattr(
+            httpx, "AsyncClient", lambda **kwargs: FakeAsyncClient(clients, **kwargs)
+        )
+        client_api = AsyncClientAPI("http://graphdb:7200")
+
+        assert asyncio.run(client_api.get("/a")) == "http://graphdb:7200/a"
+        assert asyncio.run(client_api.get("/b")) == "http://graphdb:7200/b"
+
+        assert len(clients) == 2
+        assert clients[0].closed
+        assert not clients[1].closed
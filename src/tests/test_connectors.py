@@ -1,8 +1,32 @@
+import asyncio
+import json
+import threading
+import time
 import pytest
+from contextlib import ExitStack
+from types import SimpleNamespace
 
 
-from sindit.connectors.connector_influxdb import InfluxDBConnector
+from datetime import datetime, timedelta, timezone
+from influxdb_client.client.flux_table import FluxRecord, FluxTable
+
+from sindit.connectors.connector_influxdb import (
+    InfluxDBConnector,
+    history_window,
+    iterate_in_thread,
+    parse_flux_time,
+    record_batches,
+)
+from sindit.connectors import connector_mqtt
 from sindit.connectors.connector_mqtt import MQTTConnector
+import psycopg2
+import psycopg2.pool
+from psycopg2 import sql
+
+from sindit.connectors.connector_postgresql import PostgreSQLConnector
+from sindit.connectors.property_influxdb import InfluxDBProperty
+from sindit.connectors.property_postgresql import PostgreSQLProperty
+from sindit.connectors.property_mqtt import MQTTProperty
 
 
 @pytest.mark.gitlab_exempt(reason="not working in gitlab ci/cd pipeline")
@@ -29,6 +53,108 @@ class TestMQTTConnector:
     # I tried to use paho mqtt FakeBroker but it is not working
 
 
+class RecordingProperty:
+    def __init__(self, uri, topic):
+        self.uri = uri
+        self.topic = topic
+        self.topics = []
+
+    def attach(self, connector):
+        pass
+
+    def cleanup(self):
+        pass
+
+    def update_value(self, connector, topic=None, **kwargs):
+        self.topics.append(topic)
+
+
+class TestMQTTTopicIndex:
+    def setup_method(self):
+        # The client is not connected, messages are fed to _on_message
+        self.mqtt = MQTTConnector()
+
+    def _receive(self, topic, payload="1"):
+        msg = SimpleNamespace(topic=topic, payload=payload.encode("utf-8"))
+        self.mqtt._on_message(None, None, msg)
+
+    def test_notify_subscribed_properties_only(self):
+        exact = RecordingProperty("urn:exact", "plant/line1/temperature")
+        level = RecordingProperty("urn:level", "plant/+/temperature")
+        multi = RecordingProperty("urn:multi", "plant/#")
+        other = RecordingProperty("urn:other", "other/temperature")
+        for property in (exact, level, multi, other):
+            self.mqtt.attach(property)
+
+        self._receive("plant/line1/temperature")
+        self._receive("plant/line2/pressure")
+
+        assert exact.topics == ["plant/line1/temperature"]
+        assert level.topics == ["plant/line1/temperature"]
+        assert multi.topics == ["plant/line1/temperature", "plant/line2/pressure"]
+        assert other.topics == []
+
+    def test_detach(self):
+        first = RecordingProperty("urn:first", "plant/temperature")
+        second = RecordingProperty("urn:second", "plant/temperature")
+        self.mqtt.attach(first)
+        self.mqtt.attach(second)
+
+        self.mqtt.detach(first)
+        self._receive("plant/temperature")
+
+        assert first.topics == []
+        assert second.topics == ["plant/temperature"]
+
+        self.mqtt.detach(second)
+        assert self.mqtt.get_properties_by_topic("plant/temperature") == []
+        assert self.mqtt._topic_index == {}
+
+    def test_wildcard_keeps_latest_message(self, monkeypatch):
+        property = MQTTProperty("urn:temperature", "plant/+", "t", kg_connector=None)
+        values = []
+        monkeypatch.setattr(
+            property, "update_property_value_to_kg", lambda *args: values.append(args)
+        )
+        now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.mqtt.messages["plant/a"] = {"timestamp": now, "payload": '{"t": 1}'}
+        self.mqtt.messages["plant/b"] = {
+            "timestamp": now + timedelta(seconds=1),
+            "payload": '{"t": 2}',
+        }
+
+        # The workers of the two topics finish in the reverse order
+        property.update_value(self.mqtt, topic="plant/b")
+        property.update_value(self.mqtt, topic="plant/a")
+
+        assert property.value == 2
+        assert property.timestamp == now + timedelta(seconds=1)
+        assert values == [("urn:temperature", 2, now + timedelta(seconds=1))]
+
+    def test_decode_message_once(self, monkeypatch):
+        calls = []
+
+        def loads(data):
+            calls.append(data)
+            return json.loads(data)
+
+        monkeypatch.setattr(connector_mqtt, "loads", loads)
+        properties = [
+            MQTTProperty(f"urn:{field}", "sensor", field, kg_connector=None)
+            for field in ("temperature", "humidity", "pressure")
+        ]
+        for property in properties:
+            monkeypatch.setattr(
+                property, "update_property_value_to_kg", lambda *args: None
+            )
+            self.mqtt.attach(property)
+
+        self._receive("sensor", '{"temperature": 21, "humidity": 40, "pressure": 1}')
+
+        assert len(calls) == 1
+        assert [property.value for property in properties] == [21, 40, 1]
+
+
 class TestInfluxDBConnector:
     """Test the InfluxDBConnector class."""
 
@@ -59,3 +185,499 @@ class TestInfluxDBConnector:
             self.influx._check_if_bucket_name_is_set()
         self.influx.set_bucket("new_bucket")
         assert self.influx._check_if_bucket_name_is_set()
+
+
+class FakeQueryAPI:
+    """Answers last() queries with one record per field."""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def query(self, query, org=None):
+        self.queries.append(query)
+        tables = []
+        for field, (second, value) in self.records.items():
+            table = FluxTable()
+            table.records.append(
+                FluxRecord(
+                    len(tables),
+                    {
+                        "_field": field,
+                        "_time": datetime.fromtimestamp(second, timezone.utc),
+                        "_value": value,
+                    },
+                )
+            )
+            tables.append(table)
+        return tables
+
+    def query_stream(self, query, org=None):
+        self.queries.append(query)
+        for table in self.query(query, org=org):
+            yield from table.records
+
+
+class TestInfluxDBBatchedPolling:
+    def setup_method(self):
+        self.influx = InfluxDBConnector(bucket="plant")
+        self.query_api = FakeQueryAPI(
+            {"temperature": (10, 21.5), "humidity": (20, 40.0), "pressure": (5, 1.0)}
+        )
+        self.influx.client = SimpleNamespace(query_api=lambda: self.query_api)
+
+    def _property(self, uri, field, measurement="sensor"):
+        property = InfluxDBProperty(uri, field=field, measurement=measurement)
+        property.update_property_value_to_kg = lambda *args: None
+        self.influx.attach(property)
+        return property
+
+    def test_one_query_per_group(self):
+        temperature = self._property("urn:t", "temperature")
+        climate = self._property("urn:c", ["temperature", "humidity"])
+        other = self._property("urn:o", "pressure", measurement="other")
+
+        self.influx.notify()
+
+        assert len(self.query_api.queries) == 2
+        assert "range(start: -30d" in self.query_api.queries[0]
+        assert temperature.value == 21.5
+        assert climate.value == {"temperature": 21.5, "humidity": 40.0}
+        assert climate.timestamp == datetime.fromtimestamp(20, timezone.utc)
+        assert other.value == 1.0
+
+    def test_missing_field(self):
+        missing = self._property("urn:m", "missing")
+
+        self.influx.notify()
+
+        assert missing.value is None
+        assert missing.timestamp is None
+
+
+class TestInfluxDBHistoryWindow:
+    def test_parse_flux_time(self):
+        now = datetime(2024, 1, 8, tzinfo=timezone.utc)
+        assert parse_flux_time("now()", now) == now
+        assert parse_flux_time("-7d", now) == datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert parse_flux_time("-1h30m", now) == datetime(
+            2024, 1, 7, 22, 30, tzinfo=timezone.utc
+        )
+        assert parse_flux_time("2024-01-01T00:00:00Z", now) == datetime(
+            2024, 1, 1, tzinfo=timezone.utc
+        )
+        with pytest.raises(ValueError):
+            parse_flux_time('-1d) |> drop(columns: ["_value"]', now)
+
+    def test_history_window(self):
+        start, stop, every = history_window(
+            "2024-01-01T00:00:00Z", "2024-01-08T00:00:00Z", max_points=1000
+        )
+        assert (stop - start).days == 7
+        assert every == 605
+        assert history_window("-1m", "now()", max_points=1000)[2] == 1
+
+        with pytest.raises(ValueError):
+            history_window("now()", "-1d", max_points=10)
+
+
+class TestInfluxDBStreaming:
+    def setup_method(self):
+        self.influx = InfluxDBConnector(bucket="plant")
+        self.query_api = FakeQueryAPI({f"f{i}": (i, float(i)) for i in range(5)})
+        self.influx.client = SimpleNamespace(query_api=lambda: self.query_api)
+
+    def test_record_batches(self):
+        records = [
+            FluxRecord(table, {"result": "_result", "_field": "f", "_value": i})
+            for table, i in [(0, 1), (0, 2), (0, 3), (1, 4)]
+        ]
+
+        batches = list(record_batches(iter(records), batch_size=2))
+
+        assert batches == [
+            {"_field": ["f", "f"], "_value": [1, 2]},
+            {"_field": ["f"], "_value": [3]},
+            {"_field": ["f"], "_value": [4]},
+        ]
+
+    def test_query_field_dataframes(self):
+        frames = list(
+            self.influx.query_field(
+                measurement="sensor", query_return_type="dataframes"
+            )
+        )
+        assert len(frames) == 5
+        assert list(frames[0].columns) == ["_field", "_time", "_value"]
+        assert "pivot" not in self.query_api.queries[0]
+
+    def test_query_field_csv(self):
+        chunks = list(
+            self.influx.query_field(measurement="sensor", query_return_type="csv")
+        )
+
+        assert chunks[0].splitlines() == [
+            "_field,_time,_value",
+            "f0,1970-01-01T00:00:00+00:00,0.0",
+        ]
+        # Same columns, no header
+        assert chunks[1].splitlines() == ["f1,1970-01-01T00:00:01+00:00,1.0"]
+
+    def test_iterate_in_thread_closes_on_cancel(self):
+        closed = []
+        received = []
+
+        def records():
+            try:
+                for i in range(100):
+                    time.sleep(0.01)
+                    yield i
+            finally:
+                closed.append(True)
+
+        async def stream():
+            async for record in iterate_in_thread(records()):
+                received.append(record)
+
+        async def run():
+            # Like a client disconnecting in the middle of the stream
+            task = asyncio.ensure_future(stream())
+            while len(received) < 2:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert closed == [True]
+
+        asyncio.run(run())
+        assert len(received) < 100
+
+
+def _render(query) -> str:
+    # Composed.as_string() needs a real connection to quote identifiers
+    if isinstance(query, sql.Composed):
+        return "".join(_render(part) for part in query)
+    if isinstance(query, sql.Identifier):
+        return ".".join(f'"{name}"' for name in query.strings)
+    if isinstance(query, sql.SQL):
+        return query.string
+    return query
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, query, params=None):
+        if self.connection.closed or self.connection.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.connection.queries.append((query, params))
+        self.rows = list(self.connection.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.closed = 0
+        self.broken = False
+        self.autocommit = True
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+
+class FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.connections = []
+        self.idle = []
+        self.discarded = 0
+        self.closed = False
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        connection = FakeConnection(self.rows)
+        self.connections.append(connection)
+        return connection
+
+    def putconn(self, connection, close=False):
+        if close:
+            self.discarded += 1
+        else:
+            self.idle.append(connection)
+
+    def closeall(self):
+        self.closed = True
+
+
+class TestPostgreSQLConnector:
+    def setup_method(self):
+        self.postgresql = PostgreSQLConnector(dbname="plant")
+        self.pool = FakePool([(21.5, 40), (20.0, 41)])
+        self.postgresql.pool = self.pool
+
+    def test_query(self):
+        assert self.postgresql.query_one("SELECT 1") == (21.5, 40)
+        assert self.postgresql.query("SELECT 1") == [(21.5, 40), (20.0, 41)]
+        # The connection is returned to the pool and reused
+        assert len(self.pool.connections) == 1
+
+    def test_reconnect(self):
+        self.postgresql.query_one("SELECT 1")
+        # The server closed the idle connection
+        self.pool.connections[0].closed = 2
+
+        assert self.postgresql.query_one("SELECT %s", (1,)) == (21.5, 40)
+        assert self.pool.discarded == 1
+        assert self.pool.connections[-1].queries == [("SELECT %s", (1,))]
+
+    def test_retry_on_broken_connection(self):
+        self.postgresql.query_one("SELECT 1")
+        # The connection drops while it is used
+        self.pool.connections[0].broken = True
+
+        assert self.postgresql.query_one("SELECT 1") == (21.5, 40)
+        assert self.pool.discarded == 1
+        assert len(self.pool.connections) == 2
+
+    def test_pool_exhausted(self, monkeypatch):
+        statuses = []
+        monkeypatch.setattr(
+            self.postgresql, "update_connection_status", statuses.append
+        )
+        self.postgresql.is_connected = True
+        self.postgresql.pool_timeout = 0.01
+        # Stop the update thread after one update
+        stop_event = self.postgresql._stop_event
+        monkeypatch.setattr(stop_event, "wait", lambda timeout: stop_event.set())
+
+        with ExitStack() as stack:
+            for _ in range(self.postgresql.pool_size):
+                stack.enter_context(self.postgresql.get_connection())
+
+            with pytest.raises(psycopg2.pool.PoolError):
+                self.postgresql.query_one("SELECT 1")
+            self.postgresql.update_property()
+
+        # Busy connections do not mean that the server is lost
+        assert statuses == []
+        assert self.postgresql.query_one("SELECT 1") == (21.5, 40)
+
+    def test_start_failure_closes_pool(self, monkeypatch):
+        statuses = []
+        monkeypatch.setattr(
+            self.postgresql, "update_connection_status", statuses.append
+        )
+        monkeypatch.setattr(
+            psycopg2.pool, "ThreadedConnectionPool", lambda *args, **kwargs: self.pool
+        )
+
+        def ping():
+            raise psycopg2.OperationalError("connection refused")
+
+        monkeypatch.setattr(self.postgresql, "ping", ping)
+        self.postgresql.start()
+
+        assert self.pool.closed
+        assert self.postgresql.pool is None
+        assert self.postgresql.thread is None
+        assert statuses == [False]
+
+    def _attach_properties(self):
+        properties = [
+            PostgreSQLProperty(
+                f"urn:{field}",
+                table="sensors",
+                field=field,
+                conditions={"room": 1},
+                order_by="ts",
+            )
+            for field in ("temperature", "humidity")
+        ]
+        for property in properties:
+            property.update_property_value_to_kg = lambda *args: None
+            self.postgresql.attach(property)
+        return properties
+
+    def test_one_query_per_group(self):
+        self.pool.rows = [(21.5, 40, datetime(2024, 1, 1, tzinfo=timezone.utc))]
+        properties = self._attach_properties()
+
+        self.postgresql.notify()
+
+        [(query, params)] = self.pool.connections[0].queries
+        assert _render(query) == (
+            "SELECT temperature, humidity, ts FROM sensors "
+            "WHERE room=%s ORDER BY ts DESC LIMIT 1"
+        )
+        assert params == ("1",)
+        assert [property.value for property in properties] == [21.5, 40]
+        assert properties[0].timestamp == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def test_identifiers_are_quoted(self):
+        self.postgresql.query_latest_row(
+            "public.sensors", ["value; DROP TABLE sensors"], {"room": 1}, "ts"
+        )
+
+        [(query, params)] = self.pool.connections[0].queries
+        assert _render(query) == (
+            'SELECT "value; DROP TABLE sensors", ts FROM public.sensors '
+            "WHERE room=%s ORDER BY ts DESC LIMIT 1"
+        )
+
+    def test_mixed_case_identifiers(self):
+        self.postgresql.query_latest_row(
+            "Public.Sensors", ["Temperature", "Room Temperature"], {"Room": 1}, "TS"
+        )
+
+        [(query, params)] = self.pool.connections[0].queries
+        # Plain names are case-insensitive, other names are quoted
+        assert _render(query) == (
+            'SELECT Temperature, "Room Temperature", TS FROM Public.Sensors '
+            "WHERE Room=%s ORDER BY TS DESC LIMIT 1"
+        )
+
+    def test_notification_with_row(self):
+        self.pool.rows = [(21.5, 40, datetime(2024, 1, 1, tzinfo=timezone.utc))]
+        properties = self._attach_properties()
+        self.postgresql.notify()
+        row = {
+            "room": 1,
+            "temperature": 22.0,
+            "humidity": 45,
+            "ts": "2024-01-02T00:00:00+00:00",
+        }
+
+        self.postgresql.handle_notifications(
+            [
+                json.dumps({"table": "public.sensors", "row": row}),
+                json.dumps({"table": "sensors", "row": {**row, "room": 2}}),
+            ]
+        )
+
+        # The row of the notification is used, without query
+        assert len(self.pool.connections[0].queries) == 1
+        assert [property.value for property in properties] == [22.0, 45]
+        assert properties[0].timestamp == datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+    def test_notification_of_older_row(self):
+        self.pool.rows = [(21.5, 40, datetime(2024, 1, 2, tzinfo=timezone.utc))]
+        properties = self._attach_properties()
+        self.postgresql.notify()
+        # An update of an older row
+        row = {
+            "room": 1,
+            "temperature": 18.0,
+            "humidity": 30,
+            "ts": "2024-01-01T00:00:00+00:00",
+        }
+
+        self.postgresql.handle_notifications(
+            [json.dumps({"table": "sensors", "row": row})]
+        )
+
+        assert len(self.pool.connections[0].queries) == 1
+        assert [property.value for property in properties] == [21.5, 40]
+        assert properties[0].timestamp == datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+    def test_notification_before_first_read(self):
+        self.pool.rows = [(21.5, 40, datetime(2024, 1, 2, tzinfo=timezone.utc))]
+        properties = self._attach_properties()
+        row = {"room": 1, "temperature": 18.0, "humidity": 30, "ts": "2024-01-01"}
+
+        self.postgresql.handle_notifications(
+            [json.dumps({"table": "sensors", "row": row})]
+        )
+
+        # The latest row is queried, as the row may not be the latest one
+        assert len(self.pool.connections[0].queries) == 1
+        assert [property.value for property in properties] == [21.5, 40]
+
+    def test_notification_row_values_normalized(self):
+        self.pool.rows = [(21.5, 40, datetime(2024, 1, 1, tzinfo=timezone.utc))]
+        properties = self._attach_properties()
+        for property in properties:
+            # As read from the knowledge graph
+            property.conditions = {"room": "1", "active": "true"}
+        self.postgresql.notify()
+        row = {
+            "room": 1.0,
+            "active": True,
+            "temperature": 22.0,
+            "humidity": 45,
+            "ts": "2024-01-02T00:00:00+00:00",
+        }
+
+        self.postgresql.handle_notifications(
+            [json.dumps({"table": "sensors", "row": row})]
+        )
+
+        # JSON numbers and booleans match the conditions, without query
+        assert len(self.pool.connections[0].queries) == 1
+        assert [property.value for property in properties] == [22.0, 45]
+
+        # A row without the condition columns cannot be matched
+        del row["active"]
+        self.postgresql.handle_notifications(
+            [json.dumps({"table": "sensors", "row": row})]
+        )
+        assert len(self.pool.connections[0].queries) == 2
+        assert [property.value for property in properties] == [21.5, 40]
+
+    def test_notify_serialized(self):
+        self._attach_properties()
+        # Like the poll loop, in the middle of an update
+        self.postgresql._notify_lock.acquire()
+        # Like the catch-up of the listen thread
+        catch_up = threading.Thread(target=self.postgresql.notify)
+        catch_up.start()
+        catch_up.join(0.1)
+
+        assert catch_up.is_alive()
+        assert self.pool.connections == []
+
+        self.postgresql._notify_lock.release()
+        catch_up.join(1)
+        assert not catch_up.is_alive()
+        assert len(self.pool.connections[0].queries) == 1
+
+    def test_notification_without_row(self):
+        properties = self._attach_properties()
+
+        self.postgresql.handle_notifications(["other_table"])
+        assert self.pool.connections == []
+
+        self.postgresql.handle_notifications(["sensors"])
+        assert len(self.pool.connections[0].queries) == 1
+        assert [property.value for property in properties] == [21.5, 40]
+
+    def test_notification_of_other_rows(self):
+        properties = self._attach_properties()
+        row = {"room": 2, "temperature": 22.0, "humidity": 45, "ts": "2024-01-02"}
+
+        self.postgresql.handle_notifications(
+            [json.dumps({"table": "sensors", "row": row})]
+        )
+
+        assert self.pool.connections == []
+        assert [property.value for property in properties] == [None, None]
+
+    def test_not_started(self):
+        self.postgresql.pool = None
+        with pytest.raises(ConnectionError):
+            self.postgresql.query("SELECT 1")
@@ -0,0 +1,88 @@
+import threading
+
+from sindit.connectors.dispatch_queue import DROP_NEWEST, DispatchQueue
+
+
+class TestDispatchQueue:
+    def setup_method(self):
+        self.handled = []
+        self.release = threading.Event()
+        self.done = threading.Event()
+
+    def _handler(self, key):
+        self.release.wait(5)
+        self.handled.append(key)
+        if key == "last":
+            self.done.set()
+
+    def test_coalesce_while_handling(self):
+        queue = DispatchQueue(self._handler, workers=1)
+        queue.start()
+        try:
+            queue.put("a")
+            # "a" is being handled, then queued once more, then coalesced
+            for _ in range(10):
+                queue.put("a")
+            queue.put("last")
+
+            metrics = queue.get_metrics()
+            assert metrics["coalesced"] >= 9
+            assert metrics["depth"] >= 1
+
+            self.release.set()
+            assert self.done.wait(5)
+        finally:
+            queue.stop()
+
+        assert self.handled.count("a") <= 2
+        metrics = queue.get_metrics()
+        assert metrics["received"] == 12
+        assert metrics["depth"] == 0
+
+    def test_drop_when_full(self):
+        queue = DispatchQueue(self._handler, workers=1, max_size=2)
+        queue.start()
+        try:
+            queue.put("running")
+            # Wait for the worker to take the first key
+            while queue.get_metrics()["running"] == 0:
+                pass
+            assert queue.put("b")
+            assert queue.put("c")
+            assert queue.put("last")
+
+            self.release.set()
+            assert self.done.wait(5)
+        finally:
+            queue.stop()
+
+        # The oldest waiting key was dropped
+        assert self.handled == ["running", "c", "last"]
+        assert queue.get_metrics()["dropped"] == 1
+
+    def test_drop_newest(self):
+        queue = DispatchQueue(self._handler, workers=1, max_size=1, policy=DROP_NEWEST)
+        queue.start()
+        try:
+            queue.put("running")
+            while queue.get_metrics()["running"] == 0:
+                pass
+            assert queue.put("last")
+            assert not queue.put("c")
+
+            self.release.set()
+            assert self.done.wait(5)
+        finally:
+            queue.stop()
+
+        assert self.handled == ["running", "last"]
+
+    def test_without_workers(self):
+        self.release.set()
+        queue = DispatchQueue(self._handler, workers=0)
+        queue.start()
+
+        queue.put("a")
+
+        assert self.handled == ["a"]
+        assert queue.get_metrics()["handled"] == 1
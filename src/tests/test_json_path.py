@@ -0,0 +1,55 @@
+import pytest
+
+from sindit.connectors.json_path import compile_path, loads
+from sindit.connectors.connector_mqtt import MQTTConnector
+from sindit.connectors.property_mqtt import MQTTProperty
+
+PAYLOAD = b"""{
+    "sensors": [{"temperature": 21.5}, {"temperature": 22.0}],
+    "a.b": 1,
+    "meta": {"0": "zero", "a key": "value"}
+}"""
+
+
+class TestJSONPath:
+    def setup_method(self):
+        self.data = loads(PAYLOAD)
+
+    @pytest.mark.parametrize(
+        "expression, expected",
+        [
+            ("sensors/1/temperature", 22.0),
+            ("$.sensors[0].temperature", 21.5),
+            ("sensors[-1].temperature", 22.0),
+            ('data["sensors"][0]["temperature"]', 21.5),
+            ("$['meta']['a key']", "value"),
+            ("meta/0", "zero"),
+            ("a.b", 1),
+            ("sensors[2].temperature", None),
+            ("missing", None),
+        ],
+    )
+    def test_extract(self, expression, expected):
+        assert compile_path(expression)(self.data) == expected
+
+    @pytest.mark.parametrize(
+        "expression", ['float(data["a"])', 'data["a"] * 10', "$..sensors"]
+    )
+    def test_reject_code(self, expression):
+        with pytest.raises(ValueError):
+            compile_path(expression)
+
+    def test_compiled_once(self):
+        assert compile_path("sensors/0") is compile_path("sensors/0")
+
+
+class TestMQTTPropertyExtraction:
+    def test_parse_message_once(self):
+        temperature = MQTTProperty("urn:t", "sensors", "sensors/0/temperature")
+        humidity = MQTTProperty("urn:h", "sensors", "$.meta['a key']")
+        message = {"timestamp": None, "payload": PAYLOAD.decode("utf-8")}
+
+        data = MQTTConnector.decode_message(message)
+        assert temperature._extract_value_from_json(data) == 21.5
+        assert MQTTConnector.decode_message(message) is data
+        assert humidity._extract_value_from_json(data) == "value"
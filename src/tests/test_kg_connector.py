@@ -0,0 +1,197 @@
+import asyncio
+import json
+
+from sindit.connectors.connector import Property
+from sindit.knowledge_graph.graph_model import StreamingProperty
+from sindit.knowledge_graph.kg_connector import (
+    SINDITKGConnector,
+    stored_property_value,
+)
+
+GRAPH_A = "http://sindit.sintef.no/2.0#WorkspaceA"
+GRAPH_B = "http://sindit.sintef.no/2.0#WorkspaceB"
+
+
+class FakeResponse:
+    ok = True
+    is_success = True
+    text = ""
+
+
+class FakeKGService:
+    """Records the queries and yields to the event loop on each of them, so
+    that concurrent requests interleave."""
+
+    def __init__(self, select_results=()):
+        self.queries = []
+        self.select_results = list(select_results)
+        self.on_query = None
+
+    def graph_query(self, query, accept_content):
+        self.queries.append(str(query))
+        if accept_content == "text/csv":
+            return self.select_results.pop(0) if self.select_results else "node\n"
+        return ""
+
+    def graph_update(self, update):
+        self.queries.append(str(update))
+        return FakeResponse()
+
+    async def graph_query_async(self, query, accept_content):
+        self.queries.append(str(query))
+        await asyncio.sleep(0)
+        if self.on_query is not None:
+            self.on_query()
+        if accept_content == "text/csv":
+            return self.select_results.pop(0) if self.select_results else "node\n"
+        return ""
+
+    async def graph_update_async(self, update):
+        self.queries.append(str(update))
+        await asyncio.sleep(0)
+        return FakeResponse()
+
+    async def graph_export_async(self, graph_uri, accept_content):
+        self.queries.append(graph_uri)
+        await asyncio.sleep(0)
+        if self.on_query is not None:
+            self.on_query()
+        for chunk in ("chunk 1\n", "chunk 2\n"):
+            self.queries.append(graph_uri)
+            yield chunk
+
+
+class TestSINDITKGConnectorGraphs:
+    def setup_method(self):
+        self.service = FakeKGService()
+        self.connector = SINDITKGConnector(self.service)
+
+    def test_interleaved_requests_keep_their_graph(self):
+        queries = {}
+
+        async def request(graph_uri, node_uri):
+            # Like get_current_active_user, at the start of each request
+            self.connector.set_graph_uri(graph_uri)
+            start = len(self.service.queries)
+            await self.connector.load_nodes_by_uris_async([node_uri])
+            await self.connector.delete_node_async(node_uri)
+            queries[graph_uri] = [
+                query for query in self.service.queries[start:] if node_uri in query
+            ]
+
+        async def run():
+            await asyncio.gather(
+                request(GRAPH_A, "urn:node_a"), request(GRAPH_B, "urn:node_b")
+            )
+
+        asyncio.run(run())
+
+        assert len(queries[GRAPH_A]) == 2
+        assert all(GRAPH_A in query for query in queries[GRAPH_A])
+        assert all(GRAPH_B in query for query in queries[GRAPH_B])
+        assert not any(GRAPH_B in query for query in queries[GRAPH_A])
+
+    def test_export_stays_on_its_graph(self):
+        # One uri per page, so that each page is a query of its own
+        self.service.select_results = ["node\nurn:a\n", "node\nurn:b\n", "node\n"]
+        self.connector.set_graph_uri(GRAPH_A)
+        # Another request switches the graph in the middle of the export
+        self.service.on_query = lambda: self.connector.set_graph_uri(GRAPH_B)
+
+        async def export(chunks):
+            return [chunk async for chunk in chunks]
+
+        asyncio.run(export(self.connector.iter_all_nodes_async(page_size=1)))
+        # 3 pages of uris, and the nodes of the first 2 pages
+        assert len(self.service.queries) == 5
+        assert all(GRAPH_A in query for query in self.service.queries)
+
+        self.service.queries = []
+        self.connector.set_graph_uri(GRAPH_A)
+        chunks = asyncio.run(export(self.connector.export_graph_async()))
+        assert chunks == ["chunk 1\n", "chunk 2\n"]
+        assert self.service.queries == [GRAPH_A] * 3
+
+
+class TestSaveNodes:
+    def setup_method(self):
+        self.service = FakeKGService()
+        self.connector = SINDITKGConnector(self.service)
+        self.nodes = [
+            StreamingProperty(uri=f"urn:prop{i}", propertyValue=i) for i in range(3)
+        ]
+
+    def _saved_uris(self):
+        return {
+            f"urn:prop{i}"
+            for i in range(3)
+            for query in self.service.queries
+            if "INSERT" in query and f"<urn:prop{i}>" in query
+        }
+
+    def test_chunk_size_zero(self):
+        assert self.connector.save_nodes(self.nodes, chunk_size=0) == []
+        assert self._saved_uris() == {"urn:prop0", "urn:prop1", "urn:prop2"}
+
+    def test_chunk_size_zero_async(self):
+        errors = asyncio.run(self.connector.save_nodes_async(self.nodes, chunk_size=0))
+        assert errors == []
+        assert self._saved_uris() == {"urn:prop0", "urn:prop1", "urn:prop2"}
+
+
+class FakeProperty(Property):
+    def update_value(self, connector, **kwargs):
+        pass
+
+    def attach(self, connector):
+        pass
+
+
+class TestPropertyValueToKG:
+    def setup_method(self):
+        self.service = FakeKGService()
+        self.connector = SINDITKGConnector(self.service)
+        self.property = FakeProperty()
+        self.property.kg_connector = self.connector
+
+    def test_value_converted_to_data_type(self):
+        self.service.select_results = [
+            "node,dataType\nurn:prop,http://www.w3.org/2001/XMLSchema#integer\n"
+        ]
+
+        self.property.update_property_value_to_kg("urn:prop", "21", "2024-01-01")
+        assert self.property.value == 21
+        # The data type is cached
+        self.property.update_property_value_to_kg("urn:prop", 22.0, "2024-01-01")
+        assert self.property.value == 22
+        assert sum("SELECT" in query for query in self.service.queries) == 1
+
+    def test_dict_value_converted_to_data_type(self):
+        self.service.select_results = [
+            "node,dataType\nurn:prop,http://www.w3.org/2001/XMLSchema#float\n"
+        ]
+
+        self.property.update_property_value_to_kg(
+            "urn:prop", {"temperature": "21.5"}, "2024-01-01"
+        )
+        assert self.property.value == {"temperature": 21.5}
+
+
+class TestStoredPropertyValue:
+    def test_dict_value(self):
+        value = stored_property_value(
+            {"temperature": 21.5, "humidity": 40},
+            "http://www.w3.org/2001/XMLSchema#string",
+        )
+
+        # As written to the knowledge graph: JSON, not the repr of the dict
+        assert value == '{"temperature": "21.5", "humidity": "40"}'
+        assert json.loads(value) == {"temperature": "21.5", "humidity": "40"}
+        assert stored_property_value({"a": 1}) == '{"a": 1}'
+
+    def test_scalar_value(self):
+        assert (
+            stored_property_value(21, "http://www.w3.org/2001/XMLSchema#float") == 21.0
+        )
+        assert stored_property_value(21) == 21
+        assert stored_property_value(None, "xsd:string") is None
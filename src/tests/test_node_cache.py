@@ -0,0 +1,66 @@
+from sindit.knowledge_graph.graph_model import AbstractAsset, StreamingProperty
+from sindit.knowledge_graph.node_cache import NodeCache
+
+GRAPH = "http://sindit.sintef.no/2.0#DefaultGraph"
+
+
+def _asset():
+    prop = StreamingProperty(uri="urn:prop", propertyValue=1)
+    return AbstractAsset(uri="urn:asset", assetProperties=[prop])
+
+
+class TestNodeCache:
+    def setup_method(self):
+        self.cache = NodeCache(max_size=2, ttl=60)
+
+    def test_hit_and_miss(self):
+        key = (GRAPH, "urn:asset", 2)
+        assert self.cache.get(key) is None
+
+        self.cache.put(key, _asset(), ["urn:asset", "urn:prop"])
+        node = self.cache.get(key)
+        assert isinstance(node, AbstractAsset)
+        assert str(node.assetProperties[0].uri) == "urn:prop"
+
+        metrics = self.cache.get_metrics()
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 1
+        assert metrics["size"] == 1
+
+    def test_returns_copies(self):
+        key = (GRAPH, "urn:asset", 1)
+        self.cache.put(key, _asset(), [])
+        node = self.cache.get(key)
+        node.assetDescription = "changed"
+
+        assert self.cache.get(key).assetDescription is None
+
+    def test_invalidate_nested_node(self):
+        key = (GRAPH, "urn:asset", 2)
+        self.cache.put(key, _asset(), ["urn:asset", "urn:prop"])
+
+        self.cache.invalidate("http://sindit.sintef.no/2.0#Other", ["urn:prop"])
+        assert self.cache.get(key) is not None
+
+        self.cache.invalidate(GRAPH, ["urn:prop"])
+        assert self.cache.get(key) is None
+
+    def test_skip_put_after_invalidation(self):
+        key = (GRAPH, "urn:asset", 1)
+        generation = self.cache.generation()
+        self.cache.invalidate(GRAPH, ["urn:asset"])
+        self.cache.put(key, _asset(), [], generation=generation)
+
+        assert self.cache.get(key) is None
+
+    def test_lru_eviction_and_ttl(self):
+        for i in range(3):
+            self.cache.put((GRAPH, f"urn:asset{i}", 1), _asset(), [])
+
+        assert self.cache.get((GRAPH, "urn:asset0", 1)) is None
+        assert self.cache.get_metrics()["evictions"] == 1
+
+        self.cache.ttl = -1
+        self.cache.put((GRAPH, "urn:asset", 1), _asset(), [])
+        assert self.cache.get((GRAPH, "urn:asset", 1)) is None
+        assert self.cache.get_metrics()["expirations"] == 1
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from sindit.knowledge_graph.property_value_hub import PropertyValueHub
+
+
+class TestPropertyValueHub:
+    def setup_method(self):
+        self.hub = PropertyValueHub()
+
+    def test_fan_out(self):
+        async def run():
+            first = self.hub.subscribe(["urn:p1"])
+            second = self.hub.subscribe(["urn:p1", "urn:p2"])
+
+            self.hub.publish("urn:p1", 1, "t1")
+            self.hub.publish("urn:p2", 2, "t2")
+            self.hub.publish("urn:p3", 3, "t3")
+
+            assert await first.get(timeout=1) == {"urn:p1": (1, "t1")}
+            assert await second.get(timeout=1) == {
+                "urn:p1": (1, "t1"),
+                "urn:p2": (2, "t2"),
+            }
+            assert await first.get(timeout=0.01) == {}
+
+            first.close()
+            second.close()
+
+        asyncio.run(run())
+
+        metrics = self.hub.get_metrics()
+        assert metrics["published"] == 3
+        assert metrics["delivered"] == 3
+        assert metrics["subscriptions"] == 0
+
+    def test_coalesce_for_slow_consumer(self):
+        async def run():
+            with self.hub.subscribe(["urn:p1"]) as subscription:
+                # Published from another thread, as the connectors do
+                thread = threading.Thread(
+                    target=lambda: [
+                        self.hub.publish("urn:p1", i, f"t{i}") for i in range(10)
+                    ]
+                )
+                thread.start()
+                thread.join()
+
+                assert await subscription.get(timeout=1) == {"urn:p1": (9, "t9")}
+                assert subscription.coalesced == 9
+
+        asyncio.run(run())
+        metrics = self.hub.get_metrics()
+        assert metrics["subscribed_properties"] == 0
+        assert metrics["coalesced"] == 9
+
+    def test_drop_subscription_of_closed_loop(self):
+        async def subscribe():
+            return self.hub.subscribe(["urn:p1"])
+
+        asyncio.run(subscribe())
+        self.hub.publish("urn:p1", 1, "t1")
+
+        assert self.hub.get_metrics()["subscriptions"] == 0
@@ -0,0 +1,82 @@
+from sindit.knowledge_graph.property_value_writer import PropertyValueWriter
+
+
+class FakeKGConnector:
+    def __init__(self, fail: bool = False):
+        self.graph_uri = "http://sindit.sintef.no/2.0#DefaultGraph"
+        self.fail = fail
+        self.calls = []
+
+    def get_graph_uri(self):
+        return self.graph_uri
+
+    def update_property_values(self, values, graph_uri=None):
+        if self.fail:
+            raise Exception("GraphDB unavailable")
+        self.calls.append((graph_uri, dict(values)))
+        return True
+
+
+class TestPropertyValueWriter:
+    def setup_method(self):
+        self.kg = FakeKGConnector()
+        self.writer = PropertyValueWriter(self.kg, flush_interval=60, batch_size=100)
+        # Pretend the background thread is running so submit only queues
+        self.writer.is_running = lambda: True
+
+    def test_coalesce_latest_value(self):
+        """Only the latest value of a property is flushed."""
+        self.writer.submit("urn:p1", 1, "t1")
+        self.writer.submit("urn:p1", 2, "t2")
+        self.writer.submit("urn:p2", 3, "t3")
+
+        assert self.writer.flush() == 2
+        assert len(self.kg.calls) == 1
+        graph_uri, values = self.kg.calls[0]
+        assert graph_uri == self.kg.graph_uri
+        assert values == {"urn:p1": (2, "t2"), "urn:p2": (3, "t3")}
+
+        metrics = self.writer.get_metrics()
+        assert metrics["submitted"] == 3
+        assert metrics["coalesced"] == 1
+        assert metrics["flushed"] == 2
+        assert metrics["pending"] == 0
+
+    def test_one_update_per_graph(self):
+        self.writer.submit("urn:p1", 1, "t1")
+        self.kg.graph_uri = "http://sindit.sintef.no/2.0#Other"
+        self.writer.submit("urn:p1", 2, "t2")
+
+        assert self.writer.flush() == 2
+        assert len(self.kg.calls) == 2
+
+    def test_requeue_on_failure(self):
+        self.kg.fail = True
+        self.writer.submit("urn:p1", 1, "t1")
+
+        assert self.writer.flush() == 0
+        metrics = self.writer.get_metrics()
+        assert metrics["failed_flushes"] == 1
+        assert metrics["pending"] == 1
+
+        self.kg.fail = False
+        assert self.writer.flush() == 1
+        assert self.kg.calls[0][1] == {"urn:p1": (1, "t1")}
+
+    def test_backpressure_flush(self):
+        self.writer.max_pending = 2
+        self.writer.submit("urn:p1", 1, "t1")
+        assert self.kg.calls == []
+        self.writer.submit("urn:p2", 2, "t2")
+
+        assert len(self.kg.calls) == 1
+        assert self.writer.get_metrics()["backpressure_flushes"] == 1
+
+    def test_stop_flushes_synchronously(self):
+        writer = PropertyValueWriter(self.kg, flush_interval=60)
+        writer.start()
+        writer.submit("urn:p1", 1, "t1")
+        writer.stop()
+
+        assert self.kg.calls == [(self.kg.graph_uri, {"urn:p1": (1, "t1")})]
+        assert not writer.is_running()
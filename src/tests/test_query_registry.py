@@ -0,0 +1,88 @@
+import pytest
+
+from sindit.knowledge_graph.query_registry import (
+    Query,
+    QueryRegistry,
+    QueryTemplate,
+    cursor_filter,
+    decode_cursor,
+    encode_cursor,
+    query_registry,
+)
+
+
+class TestQueryTemplate:
+    def test_placeholder_kinds(self):
+        template = QueryTemplate(
+            "test",
+            "SELECT * WHERE { GRAPH <[graph_uri]> { VALUES ?s { [nodes_uri] } "
+            '?s ?p "[term]" } } LIMIT [limit]',
+        )
+        assert template.placeholders == [
+            ("graph_uri", "iri"),
+            ("nodes_uri", "fragment"),
+            ("term", "string"),
+            ("limit", "fragment"),
+        ]
+
+        query = template.render(
+            graph_uri="urn:g", nodes_uri=["urn:a", "urn:b"], term='a"b', limit=10
+        )
+        assert query == (
+            "SELECT * WHERE { GRAPH <urn:g> { VALUES ?s { <urn:a> <urn:b> } "
+            '?s ?p "a\\"b" } } LIMIT 10'
+        )
+
+    def test_invalid_uri(self):
+        template = QueryTemplate("test", "DESCRIBE <[node_uri]>")
+        with pytest.raises(ValueError):
+            template.render(node_uri="urn:a> } DROP ALL #")
+
+    def test_missing_parameter(self):
+        template = QueryTemplate("test", "DESCRIBE <[node_uri]>")
+        with pytest.raises(ValueError):
+            template.render()
+
+
+class TestQueryRegistry:
+    def test_templates_loaded_from_package(self):
+        assert "load_node" in query_registry.templates
+        assert "insert_delete" in query_registry.templates
+
+    def test_render_and_record(self):
+        registry = QueryRegistry()
+        query = registry.render(
+            "get_class_uri_by_uri", graph_uri="urn:g", node_uri="urn:a"
+        )
+        assert isinstance(query, Query)
+        assert query.name == "get_class_uri_by_uri"
+        assert "<urn:a> rdf:type ?class" in query
+
+        registry.record(query, 0.5)
+        registry.record("not rendered by the registry", 1.0)
+        metrics = registry.get_metrics()
+        assert list(metrics.keys()) == ["get_class_uri_by_uri"]
+        assert metrics["get_class_uri_by_uri"]["renders"] == 1
+        assert metrics["get_class_uri_by_uri"]["executions"] == 1
+        assert metrics["get_class_uri_by_uri"]["max_execution_time"] == 0.5
+
+        with pytest.raises(ValueError):
+            registry.render("unknown")
+
+
+class TestCursor:
+    def test_round_trip(self):
+        uri = "http://sindit.sintef.no/2.0#node?a=1"
+        cursor = encode_cursor(uri)
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == uri
+
+    def test_filter(self):
+        assert cursor_filter(None) == ""
+        assert cursor_filter(encode_cursor('urn:a"b')) == (
+            'FILTER(STR(?node) > "urn:a\\"b")'
+        )
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not a cursor!")
@@ -0,0 +1,154 @@
+import time
+from typing import ClassVar
+
+import pytest
+from rdflib import RDFS, XSD, Graph, Literal, URIRef
+
+from sindit.common.semantic_knowledge_graph import rdf_model
+from sindit.common.semantic_knowledge_graph.rdf_model import RDFModel
+from sindit.knowledge_graph.graph_model import (
+    AbstractAsset,
+    Connection,
+    StreamingProperty,
+)
+from sindit.knowledge_graph.kg_connector import NodeURIClassMapping, SINDITKGConnector
+
+
+def _asset(i: int, connection: Connection) -> AbstractAsset:
+    props = [
+        StreamingProperty(
+            uri=f"urn:prop{i}_{j}",
+            propertyName=f"prop{j}",
+            propertyValue=j,
+            streamingTopic="topic",
+            propertyConnection=connection,
+        )
+        for j in range(3)
+    ]
+    return AbstractAsset(uri=f"urn:asset{i}", label=f"asset {i}", assetProperties=props)
+
+
+class PlanNode(RDFModel):
+    CLASS_URI: ClassVar[URIRef] = URIRef("urn:test:PlanNode")
+    mapping: ClassVar[dict] = {"name": URIRef("urn:test:name")}
+
+    name: Literal | str = None
+    size: Literal | int = None
+
+
+class UncachedPlans(dict):
+    """Field plans that are never cached, i.e. computed for each node."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+def _load_nodes_result(count: int) -> tuple[str, list]:
+    # Assets as returned by the CONSTRUCT query of _load_nodes_optimized
+    connection = Connection(uri="urn:conn", type="MQTT", host="localhost")
+    g = Graph()
+    for i in range(count):
+        g += _asset(i, connection).g()
+    return g.serialize(format="turtle"), [f"urn:asset{i}" for i in range(count)]
+
+
+class TestDeserialize:
+    def test_round_trip(self):
+        connection = Connection(uri="urn:conn", type="MQTT", host="localhost")
+        g = _asset(0, connection).g()
+
+        nodes = RDFModel.deserialize(
+            g, None, URIRef("urn:asset0"), None, {}, NodeURIClassMapping
+        )
+        asset = nodes["urn:asset0"]
+
+        assert isinstance(asset, AbstractAsset)
+        assert asset.label == "asset 0"
+        assert sorted(str(p.uri) for p in asset.assetProperties) == [
+            "urn:prop0_0",
+            "urn:prop0_1",
+            "urn:prop0_2",
+        ]
+        prop = nodes["urn:prop0_1"]
+        assert prop.propertyValue == 1
+        # The shared connection is deserialized once
+        assert prop.propertyConnection is nodes["urn:prop0_2"].propertyConnection
+        assert prop.propertyConnection.host == "localhost"
+
+    def test_field_plan_is_cached(self):
+        plan = RDFModel._field_plan(AbstractAsset)
+        assert RDFModel._field_plan(AbstractAsset) is plan
+
+        fields = {field[0]: field for fields in plan.values() for field in fields}
+        assert fields["assetProperties"][2] is True
+        assert fields["label"][2] is False
+
+    def test_field_plan_is_recomputed_when_mapping_grows(self):
+        plan = RDFModel._field_plan(PlanNode)
+        assert RDFModel._field_plan(PlanNode) is plan
+        assert set(plan) == {URIRef("urn:test:name"), RDFS.label}
+
+        # Instantiating the class adds the label to its mapping
+        PlanNode(uri="urn:node", name="node")
+        label_plan = RDFModel._field_plan(PlanNode)
+        assert label_plan is not plan
+        assert label_plan == plan
+        assert RDFModel._field_plan(PlanNode) is label_plan
+
+        PlanNode.mapping["size"] = URIRef("urn:test:size")
+        size_plan = RDFModel._field_plan(PlanNode)
+        assert size_plan[URIRef("urn:test:size")][0][0] == "size"
+        assert RDFModel._field_plan(PlanNode) is size_plan
+
+    @pytest.mark.slow
+    def test_benchmark_load_nodes(self, monkeypatch):
+        """Deserialize 1,000 assets with 3 properties and a shared connection
+        each (4,001 nodes), with and without the cached field plans. Run with
+        ``-s`` to see the timings."""
+        query_result, node_uris = _load_nodes_result(1000)
+        kg_connector = SINDITKGConnector(None)
+
+        def load_nodes():
+            start = time.perf_counter()
+            nodes = kg_connector._deserialize_nodes(
+                query_result, node_uris, created_individuals={}
+            )
+            return [node.model_dump() for node in nodes], time.perf_counter() - start
+
+        monkeypatch.setattr(rdf_model, "_field_plans", UncachedPlans())
+        uncached_nodes, uncached_time = load_nodes()
+        monkeypatch.setattr(rdf_model, "_field_plans", {})
+        nodes, cached_time = load_nodes()
+
+        print(
+            f"\n_deserialize_nodes of {len(nodes)} assets: "
+            f"{uncached_time:.2f}s without cached field plans, "
+            f"{cached_time:.2f}s with ({uncached_time / cached_time:.1f}x)"
+        )
+        assert len(nodes) == 1000
+        assert nodes == uncached_nodes
+        assert cached_time < uncached_time
+
+
+class TestSerialize:
+    def test_ntriples(self):
+        connection = Connection(
+            uri="urn:conn", type="MQTT", host="localhost", label='a "b"\nc'
+        )
+        asset = _asset(0, connection)
+
+        triples = asset.triples()
+        assert len(triples) == len(set(triples))
+
+        g = Graph()
+        g.parse(data=asset.ntriples(), format="nt")
+        assert set(g) == set(asset.g())
+        assert set(g) == set(triples)
+
+    def test_to_rdf_term(self):
+        node = StreamingProperty(uri="urn:prop")
+
+        # Static, so also callable on a node
+        assert node.to_rdf_term(True) == RDFModel.to_rdf_term(True)
+        assert RDFModel.to_rdf_term(True).datatype == XSD.boolean
+        assert node.reverse_to_type("21", "xsd:integer") == 21
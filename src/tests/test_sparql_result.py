@@ -0,0 +1,53 @@
+import json
+
+from sindit.common.semantic_knowledge_graph.sparql_result import SPARQLResult
+
+CSV_RESULT = (
+    "unit,symbol,code\r\n"
+    'http://qudt.org/vocab/unit/M,m,"MTR, metre"\r\n'
+    "http://qudt.org/vocab/unit/SEC,,SEC\r\n"
+)
+
+
+class TestSPARQLResult:
+    def test_csv_rows(self):
+        result = SPARQLResult(CSV_RESULT)
+        assert result.variables == ["unit", "symbol", "code"]
+        assert list(result) == [
+            ("http://qudt.org/vocab/unit/M", "m", "MTR, metre"),
+            ("http://qudt.org/vocab/unit/SEC", None, "SEC"),
+        ]
+        assert result.column("code") == ["MTR, metre", "SEC"]
+        assert result.column("missing") == []
+
+    def test_dicts_drop_none(self):
+        rows = list(SPARQLResult(CSV_RESULT).dicts(drop_none=True))
+        assert rows[1] == {"unit": "http://qudt.org/vocab/unit/SEC", "code": "SEC"}
+
+    def test_json_rows(self):
+        query_result = json.dumps(
+            {
+                "head": {"vars": ["node", "class"]},
+                "results": {
+                    "bindings": [
+                        {
+                            "node": {"type": "uri", "value": "urn:a"},
+                            "class": {"type": "uri", "value": "urn:A"},
+                        },
+                        {"node": {"type": "uri", "value": "urn:b"}},
+                    ]
+                },
+            }
+        )
+        result = SPARQLResult(query_result, "application/sparql-results+json")
+        assert list(result.dicts()) == [
+            {"node": "urn:a", "class": "urn:A"},
+            {"node": "urn:b", "class": None},
+        ]
+
+    def test_empty_result(self):
+        assert list(SPARQLResult("")) == []
+        assert SPARQLResult("node\r\n").column("node") == []
+        df = SPARQLResult(CSV_RESULT).to_dataframe()
+        assert list(df.columns) == ["unit", "symbol", "code"]
+        assert len(df) == 2